@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 
 
 class normal_landmarks(BaseModel):
@@ -19,6 +19,7 @@ class single_frame_details(BaseModel):
     pose_landmarks        :   List[special_landmarks]
     left_hand_landmarks   :   List[normal_landmarks]
     right_hand_landmarks  :   List[normal_landmarks]
+    timestamp             :   Optional[float] = None   # capture time in seconds, for time-aware resampling
 
 class frame_data(BaseModel):
     frame_data : List[single_frame_details]
\ No newline at end of file
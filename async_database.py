@@ -0,0 +1,87 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from sqlalchemy.engine import make_url
+
+from database import (database_url, engine_options, pool_sizes, async_database_url, db_async_mode, SessionLocal,
+                      db_pool_size, db_max_overflow)
+
+
+# Threads for the thread-pool mode; more would only wait for pool connections
+db_threads = int(os.environ.get("DB_THREADS", str(db_pool_size + db_max_overflow)))
+
+
+class DatabaseSession:
+    """
+    One request's database session. Query code is written once against the
+    ordinary sync Session API and handed to run(), which executes it without
+    blocking the event loop: through AsyncSession.run_sync() on an async
+    driver, or on a worker thread otherwise.
+    """
+
+    def __init__(self, database):
+        self.database = database
+        self._session = None
+
+    async def run(self, fn, *args):
+        """Await fn(session, *args)."""
+        if self.database.async_sessions is not None:
+            if self._session is None:
+                self._session = self.database.async_sessions()
+            return await self._session.run_sync(fn, *args)
+
+        if self._session is None:
+            self._session = SessionLocal(expire_on_commit=False)
+        return await self.database.run_in_thread(fn, self._session, *args)
+
+    async def close(self):
+        if self._session is None:
+            return
+        if self.database.async_sessions is not None:
+            await self._session.close()
+        else:
+            await self.database.run_in_thread(self._session.close)
+        self._session = None
+
+
+class Database:
+    def __init__(self, mode : str = db_async_mode, url : str = database_url, threads : int = db_threads):
+        self.async_engine = None
+        self.async_sessions = None
+        self._executor = None
+
+        async_url = async_database_url(url) if mode != "thread" else None
+        if mode == "async" and async_url is None:
+            raise RuntimeError(f"DB_ASYNC_MODE=async needs an async driver for {make_url(url).get_backend_name()}")
+
+        if async_url is not None:
+            from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+            # Its share of the worker's connection budget; the sync engine has the rest
+            self.async_engine = create_async_engine(async_url, **engine_options(url, pool_sizes(url, mode)[1]))
+            self.async_sessions = async_sessionmaker(self.async_engine, autoflush=False, expire_on_commit=False)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix="db")
+
+    @property
+    def mode(self) -> str:
+        return "async" if self.async_sessions is not None else "thread"
+
+    async def run_in_thread(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    @asynccontextmanager
+    async def session(self):
+        session = DatabaseSession(self)
+        try:
+            yield session
+        finally:
+            await session.close()
+
+    async def dispose(self):
+        if self.async_engine is not None:
+            await self.async_engine.dispose()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
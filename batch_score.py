@@ -0,0 +1,227 @@
+"""
+Score a directory or manifest of videos offline.
+
+    python batch_score.py VIDEOS [--output predictions.csv] [--format csv|parquet] [--workers N]
+                          [--batch-size 256] [--landmarks-dir DIR] [--retry-failed]
+
+VIDEOS is a directory (searched recursively for video files) or a manifest:
+a text file with one path per line, or a CSV file with a `path` column.
+
+Frames are sampled and run through Holistic in a pool of worker processes,
+exactly as for uploads (see predictions.extract_video_keypoints), and the
+resulting sequences are scored by the model in batches of --batch-size.
+Results are appended after every batch; re-running the same command skips
+videos that already have a result, so an interrupted run resumes where it
+stopped. With parquet, --output is a directory of part files.
+"""
+import argparse
+import asyncio
+import csv
+import os
+import time
+
+import numpy as np
+
+import predictions
+from holistic_pool import HolisticPool
+from predictions import classes, required_frames, frame_height, frame_width, prepare_sequence, video_min_hand_ratio
+from gating import check_window, no_sign
+
+
+video_extensions = {".mp4", ".mov", ".avi", ".mkv", ".webm", ".m4v"}
+
+result_columns = ("path", "status", "prediction", "confidence", "error", "landmarks_path")
+
+
+def find_videos(source : str) -> list:
+    if os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            paths.extend(os.path.join(root, name) for name in files if os.path.splitext(name)[1].lower() in video_extensions)
+        return sorted(paths)
+
+    with open(source, newline="") as f:
+        if source.lower().endswith(".csv"):
+            return [row["path"] for row in csv.DictReader(f) if row.get("path")]
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+class CsvResults:
+    def __init__(self, path : str):
+        self.path = path
+
+    def completed(self) -> dict:
+        """{path: status} of the results already written."""
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, newline="") as f:
+            return {row["path"]: row["status"] for row in csv.DictReader(f)}
+
+    def write(self, rows : list):
+        is_new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        with open(self.path, "a", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=result_columns)
+            if is_new:
+                writer.writeheader()
+            writer.writerows(rows)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class ParquetResults:
+    def __init__(self, directory : str):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Parquet output needs pyarrow (pip install pyarrow)")
+        self.pa = pa
+        self.pq = pq
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _parts(self) -> list:
+        return sorted(name for name in os.listdir(self.directory) if name.startswith("part-") and name.endswith(".parquet"))
+
+    def completed(self) -> dict:
+        done = {}
+        for name in self._parts():
+            table = self.pq.read_table(os.path.join(self.directory, name), columns=["path", "status"])
+            done.update(zip(table.column("path").to_pylist(), table.column("status").to_pylist()))
+        return done
+
+    def write(self, rows : list):
+        table = self.pa.Table.from_pylist(rows, schema=self.pa.schema([
+            ("path", self.pa.string()),
+            ("status", self.pa.string()),
+            ("prediction", self.pa.string()),
+            ("confidence", self.pa.float32()),
+            ("error", self.pa.string()),
+            ("landmarks_path", self.pa.string()),
+        ]))
+        path = os.path.join(self.directory, f"part-{len(self._parts()):05d}.parquet")
+        self.pq.write_table(table, f"{path}.tmp")
+        os.replace(f"{path}.tmp", path)
+
+
+def landmarks_file(landmarks_dir : str, video_path : str) -> str:
+    name = os.path.splitdrive(os.path.abspath(video_path))[1].strip(os.sep).replace(os.sep, "__")
+    return os.path.join(landmarks_dir, f"{name}.npy")
+
+
+class BatchScorer:
+    def __init__(self, results, workers : int, batch_size : int, landmarks_dir : str = None):
+        self.results = results
+        self.batch_size = max(1, batch_size)
+        self.landmarks_dir = landmarks_dir
+        self.pool = HolisticPool(size=workers, max_queue=workers * 4)
+        self.in_flight = asyncio.Semaphore(workers * 2)
+        self.scored = 0
+        self.failed = 0
+
+    async def extract(self, path : str):
+        async with self.in_flight:
+            try:
+                sequence = await self.pool.extract_video(path, required_frames, frame_height, frame_width, video_min_hand_ratio)
+                return path, prepare_sequence(sequence).keypoints, sequence.presence, None
+            except Exception as e:
+                return path, None, None, f"{type(e).__name__}: {e}"
+
+    def score(self, batch : list) -> list:
+        """
+        Run one large batch through the model and build its result rows (on a
+        worker thread). Sequences the gate rejects are not sent to the model.
+        """
+        scored = [check_window(keypoints, presence) is None for _, keypoints, presence in batch]
+        probabilities = iter([])
+        if any(scored):
+            probabilities = iter(predictions.backend.predict(np.stack([keypoints for (_, keypoints, _), keep in zip(batch, scored) if keep])))
+
+        rows = []
+        for (path, keypoints, _), keep in zip(batch, scored):
+            landmarks_path = ""
+            if self.landmarks_dir:
+                landmarks_path = landmarks_file(self.landmarks_dir, path)
+                np.save(landmarks_path, keypoints)
+            prediction, confidence = no_sign, None
+            if keep:
+                probs = next(probabilities)
+                best = int(np.argmax(probs))
+                prediction, confidence = classes[best], float(probs[best])
+            rows.append({"path": path, "status": "done", "prediction": prediction, "confidence": confidence,
+                         "error": "", "landmarks_path": landmarks_path})
+        return rows
+
+    async def flush(self, batch : list, errors : list):
+        rows = await asyncio.to_thread(self.score, batch) if batch else []
+        rows.extend(errors)
+        if rows:
+            self.results.write(rows)
+        self.scored += len(batch)
+        self.failed += len(errors)
+
+    async def run(self, paths : list):
+        if self.landmarks_dir:
+            os.makedirs(self.landmarks_dir, exist_ok=True)
+
+        self.pool.start()
+        start = time.perf_counter()
+        try:
+            batch, errors = [], []
+            for task in asyncio.as_completed([self.extract(path) for path in paths]):
+                path, keypoints, presence, error = await task
+                if error is None:
+                    batch.append((path, keypoints, presence))
+                else:
+                    errors.append({"path": path, "status": "failed", "prediction": "", "confidence": None,
+                                   "error": error, "landmarks_path": ""})
+
+                if len(batch) + len(errors) >= self.batch_size:
+                    await self.flush(batch, errors)
+                    batch, errors = [], []
+                    elapsed = time.perf_counter() - start
+                    done = self.scored + self.failed
+                    print(f"{done}/{len(paths)} videos, {done / elapsed:.1f}/s, {self.failed} failed")
+
+            await self.flush(batch, errors)
+        finally:
+            self.pool.stop()
+
+
+def pending_videos(paths : list, completed : dict, retry_failed : bool = False) -> list:
+    """The paths without a result yet, plus those that failed when `retry_failed`."""
+    todo = []
+    for path in paths:
+        status = completed.get(path)
+        if status is None or (status == "failed" and retry_failed):
+            todo.append(path)
+    return todo
+
+
+def main(args):
+    paths = find_videos(args.videos)
+    results = ParquetResults(args.output) if args.format == "parquet" else CsvResults(args.output)
+
+    todo = pending_videos(paths, results.completed(), args.retry_failed)
+    print(f"{len(paths)} videos, {len(paths) - len(todo)} already scored, {len(todo)} to go")
+    if not todo:
+        return
+
+    predictions.load_model()
+    predictions.inference_engine.stop()
+
+    scorer = BatchScorer(results, args.workers, args.batch_size, args.landmarks_dir)
+    asyncio.run(scorer.run(todo))
+    print(f"Finished : {scorer.scored} scored, {scorer.failed} failed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a directory or manifest of videos offline.")
+    parser.add_argument("videos", help="Directory of videos, or a manifest (.txt with one path per line, .csv with a path column)")
+    parser.add_argument("--output", default="predictions.csv", help="CSV file, or directory of part files for parquet")
+    parser.add_argument("--format", choices=("csv", "parquet"), default="csv")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Holistic worker processes")
+    parser.add_argument("--batch-size", type=int, default=256, help="Videos per model call and per checkpoint")
+    parser.add_argument("--landmarks-dir", help="Also save each video's (30, 1662) keypoints as .npy here")
+    parser.add_argument("--retry-failed", action="store_true", help="Score videos that failed in an earlier run again")
+    main(parser.parse_args())
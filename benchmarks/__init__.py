@@ -0,0 +1,9 @@
+"""
+Benchmarks for the prediction and storage paths. Run them from the repository root:
+
+    python -m benchmarks.micro --output micro.json
+    python -m benchmarks.load --url http://localhost:8000 --concurrency 16 --duration 30 --output load.json
+
+Both write a JSON report with p50/p95/p99 latencies, throughput and peak RSS,
+so runs can be compared over time.
+"""
@@ -0,0 +1,212 @@
+"""
+Load driver for a running server: keeps `concurrency` requests in flight
+against /predict, /predict-video and /all_records for a fixed duration or
+request count, then reports latencies per endpoint.
+
+    python -m benchmarks.load --url http://localhost:8000 [--concurrency 16] [--duration 30]
+                              [--requests N] [--mix predict=8,predict-video=1,all_records=1]
+                              [--binary] [--video clip.mp4] [--server-pid PID] [--output load.json]
+
+/predict bodies come from a pool of `--payloads` synthetic sequences; once
+the pool has been cycled through, repeats are answered by the server's
+prediction cache, so size it to the hit rate you want to model.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+from benchmarks.stats import summarize, build_report, write_report
+from benchmarks.synthetic import synthetic_frame_dict, write_synthetic_video
+
+
+def parse_mix(text : str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - {"predict", "predict-video", "all_records"}
+    if unknown:
+        raise SystemExit(f"Unknown endpoints in --mix : {', '.join(sorted(unknown))}")
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+async def build_predict_payloads(count : int, length : int, binary : bool, seed : int) -> list:
+    """(body, content type) pairs for /predict, as JSON or as the packed landmark format."""
+    import json
+    from BaseModels import frame_data
+    from predictions import frame_data_to_keypoints
+    from wire_format import encode_landmark_payload, landmark_content_types
+
+    payloads = []
+    for i in range(count):
+        body = synthetic_frame_dict(length, seed=seed + i)
+        if binary:
+            keypoints = await frame_data_to_keypoints(frame_data.model_validate(body))
+            payloads.append((encode_landmark_payload(keypoints), landmark_content_types[0]))
+        else:
+            payloads.append((json.dumps(body).encode(), "application/json"))
+    return payloads
+
+
+class RssSampler:
+    """Polls the resident set size of a server process and keeps the peak."""
+
+    def __init__(self, pid : int, interval : float = 0.2):
+        import psutil
+
+        self.process = psutil.Process(pid)
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                rss = self.process.memory_info().rss
+                for child in self.process.children(recursive=True):
+                    rss += child.memory_info().rss
+            except Exception:
+                return
+            self.peak = max(self.peak, rss)
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> int:
+        self._stop.set()
+        self._thread.join()
+        return self.peak
+
+
+class LoadDriver:
+    def __init__(self, url : str, mix : dict, predict_payloads : list, video : bytes, records_limit : int, seed : int):
+        self.url = url.rstrip("/")
+        self.endpoints = list(mix)
+        weights = np.array([mix[name] for name in self.endpoints])
+        self.weights = weights / weights.sum()
+        self.predict_payloads = predict_payloads
+        self.video = video
+        self.records_limit = records_limit
+        self.rng = np.random.default_rng(seed)
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.errors = Counter()
+        self._sent = 0
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        # requests sessions are not thread-safe, so each executor thread gets its own
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _request(self, endpoint : str, index : int) -> int:
+        session = self._session()
+        if endpoint == "predict":
+            body, content_type = self.predict_payloads[index % len(self.predict_payloads)]
+            response = session.post(f"{self.url}/predict", data=body, headers={"Content-Type": content_type})
+        elif endpoint == "predict-video":
+            response = session.post(f"{self.url}/predict-video", files={"video": ("bench.mp4", self.video, "video/mp4")})
+        else:
+            response = session.get(f"{self.url}/all_records", params={"limit": self.records_limit, "summary": "true"})
+        # Read the whole body so streamed responses are timed to their last byte
+        response.content
+        return response.status_code
+
+    async def _worker(self, executor, deadline : float, max_requests : int):
+        loop = asyncio.get_running_loop()
+        while time.monotonic() < deadline and (max_requests is None or self._sent < max_requests):
+            index = self._sent
+            self._sent += 1
+            endpoint = self.endpoints[self.rng.choice(len(self.endpoints), p=self.weights)]
+
+            start = time.perf_counter()
+            try:
+                status = await loop.run_in_executor(executor, self._request, endpoint, index)
+            except requests.RequestException as e:
+                self.errors[endpoint] += 1
+                self.statuses[endpoint][type(e).__name__] += 1
+                continue
+
+            self.statuses[endpoint][str(status)] += 1
+            if 200 <= status < 300:
+                self.latencies[endpoint].append(time.perf_counter() - start)
+            else:
+                self.errors[endpoint] += 1
+
+    async def run(self, concurrency : int, duration : float, max_requests : int = None) -> dict:
+        deadline = time.monotonic() + duration
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            start = time.perf_counter()
+            await asyncio.gather(*(self._worker(executor, deadline, max_requests) for _ in range(concurrency)))
+            elapsed = time.perf_counter() - start
+
+        results = {}
+        for endpoint in self.endpoints:
+            results[endpoint] = summarize(self.latencies[endpoint], elapsed, self.errors[endpoint])
+            results[endpoint]["status_codes"] = dict(self.statuses[endpoint])
+        results["total"] = summarize(
+            [latency for latencies in self.latencies.values() for latency in latencies],
+            elapsed,
+            sum(self.errors.values()),
+        )
+        return results
+
+
+async def run(args) -> dict:
+    mix = parse_mix(args.mix)
+
+    predict_payloads = []
+    if "predict" in mix:
+        predict_payloads = await build_predict_payloads(args.payloads, args.length, args.binary, args.seed)
+
+    video = b""
+    if "predict-video" in mix:
+        video_path = args.video or write_synthetic_video(os.path.join(tempfile.mkdtemp(prefix="slr-bench-"), "bench.mp4"), seed=args.seed)
+        with open(video_path, "rb") as f:
+            video = f.read()
+
+    driver = LoadDriver(args.url, mix, predict_payloads, video, args.records_limit, args.seed)
+    sampler = RssSampler(args.server_pid) if args.server_pid else None
+    if sampler is None:
+        return await driver.run(args.concurrency, args.duration, args.requests)
+
+    sampler.start()
+    try:
+        results = await driver.run(args.concurrency, args.duration, args.requests)
+    finally:
+        peak = sampler.stop()
+    results["server_peak_rss_bytes"] = peak
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test a running server.")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=16, help="Requests kept in flight")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run for")
+    parser.add_argument("--requests", type=int, help="Stop after this many requests, even before --duration")
+    parser.add_argument("--mix", default="predict=8,predict-video=1,all_records=1", help="Relative weight of each endpoint")
+    parser.add_argument("--payloads", type=int, default=256, help="Distinct /predict bodies")
+    parser.add_argument("--length", type=int, default=30, help="Frames per /predict body")
+    parser.add_argument("--binary", action="store_true", help="Send /predict bodies in the packed landmark format")
+    parser.add_argument("--video", help="Clip for /predict-video; a synthetic one is generated when omitted")
+    parser.add_argument("--records-limit", type=int, default=100, help="Page size for /all_records")
+    parser.add_argument("--server-pid", type=int, help="Also report the peak RSS of this server process and its children")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    write_report(build_report("load", vars(args), results), args.output)
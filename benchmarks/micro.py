@@ -0,0 +1,154 @@
+"""
+Microbenchmarks for the in-process prediction and storage paths, run against
+a throwaway SQLite database unless DATABASE_URL is already set.
+
+    python -m benchmarks.micro [--iterations 200] [--length 30] [--empty-hand-ratio 0.3]
+                               [--empty-face-ratio 0.1] [--storage-mode packed|rows] [--batch-size 1]
+                               [--skip-model] [--video] [--output micro.json]
+
+Every iteration gets its own synthetic sequence, so the prediction cache does
+not turn model benchmarks into cache lookups.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime
+
+# database.py reads this at import time
+_bench_dir = tempfile.mkdtemp(prefix="slr-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_bench_dir, 'bench.db')}")
+
+import numpy as np
+
+from benchmarks.stats import summarize, build_report, write_report
+from benchmarks.synthetic import synthetic_frame_data, write_synthetic_video
+
+
+async def measure(fn, inputs) -> dict:
+    """Await fn(item) for every item, timing each call."""
+    latencies = []
+    start = time.perf_counter()
+    for item in inputs:
+        call_start = time.perf_counter()
+        await fn(item)
+        latencies.append(time.perf_counter() - call_start)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+async def bench_extract_keypoints(sequences) -> dict:
+    from predictions import extract_keypoints
+
+    frames = [frame for sequence in sequences for frame in sequence.frame_data]
+    return await measure(extract_keypoints, frames)
+
+
+async def bench_predict_sign_from_video(sequences) -> dict:
+    from predictions import predict_sign_from_video
+
+    return await measure(predict_sign_from_video, sequences)
+
+
+async def bench_save_data_to_db(sequences, storage_mode : str, batch_size : int):
+    from database import SessionLocal
+    from persistence import save_data_to_db
+    from landmarks import KeypointSequence
+
+    items = [(KeypointSequence.from_frame_data(sequence), "benchmark", datetime.utcnow()) for sequence in sequences]
+    batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+
+    with SessionLocal() as db:
+        async def save(batch):
+            save_data_to_db(db, batch, storage_mode)
+
+        return await measure(save, batches)
+
+
+async def bench_get_single_record(iterations : int, seed : int) -> dict:
+    import models
+    from database import SessionLocal
+    from main import get_single_record, database
+
+    with SessionLocal() as db:
+        ids = [record_id for record_id, in db.query(models.FrameData.id).all()]
+    if not ids:
+        return summarize([], 0)
+    chosen = np.random.default_rng(seed).choice(ids, size=iterations).tolist()
+
+    async with database.session() as db:
+        async def fetch(record_id):
+            await get_single_record(record_id, db)
+
+        return await measure(fetch, chosen)
+
+
+async def bench_process_uploaded_video(iterations : int, seed : int) -> dict:
+    from predictions import holistic_pool, process_uploaded_video
+
+    video_path = write_synthetic_video(os.path.join(_bench_dir, "bench.mp4"), seed=seed)
+    holistic_pool.start()
+    try:
+        # The first call waits for the workers to build their graphs
+        await process_uploaded_video(video_path)
+        return await measure(lambda _: process_uploaded_video(video_path), range(iterations))
+    finally:
+        holistic_pool.stop()
+
+
+async def run(args) -> dict:
+    import models
+    from database import engine
+    from landmark_storage import add_packed_columns
+
+    models.Base.metadata.create_all(bind=engine)
+    add_packed_columns(engine)
+
+    sequences = [
+        synthetic_frame_data(args.length, args.empty_hand_ratio, args.empty_face_ratio, seed=args.seed + i)
+        for i in range(args.iterations)
+    ]
+
+    results = {}
+    results["extract_keypoints"] = await bench_extract_keypoints(sequences)
+
+    if not args.skip_model:
+        from predictions import load_model, inference_engine
+
+        start = time.perf_counter()
+        load_model()
+        results["model_load_s"] = round(time.perf_counter() - start, 3)
+        try:
+            results["predict_sign_from_video"] = await bench_predict_sign_from_video(sequences)
+        finally:
+            inference_engine.stop()
+
+    results["save_data_to_db"] = await bench_save_data_to_db(sequences, args.storage_mode, args.batch_size)
+    results["get_single_record"] = await bench_get_single_record(args.iterations, args.seed)
+
+    if args.video:
+        results["process_uploaded_video"] = await bench_process_uploaded_video(args.video_iterations, args.seed)
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Microbenchmarks for the prediction and storage paths.")
+    parser.add_argument("--iterations", type=int, default=200, help="Synthetic sequences per benchmark")
+    parser.add_argument("--length", type=int, default=30, help="Frames per synthetic sequence")
+    parser.add_argument("--empty-hand-ratio", type=float, default=0.3, help="Probability that a hand is missing from a frame")
+    parser.add_argument("--empty-face-ratio", type=float, default=0.1, help="Probability that the face is missing from a frame")
+    parser.add_argument("--storage-mode", choices=("packed", "rows"), default="packed", help="Landmark storage mode for save_data_to_db")
+    parser.add_argument("--batch-size", type=int, default=1, help="Sequences per save_data_to_db call")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-model", action="store_true", help="Skip the benchmarks that need TensorFlow and the model file")
+    parser.add_argument("--video", action="store_true", help="Also benchmark process_uploaded_video on a synthetic clip (needs MediaPipe)")
+    parser.add_argument("--video-iterations", type=int, default=10)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    from database import engine
+    config = {**vars(args), "database_url": engine.url.render_as_string(hide_password=True)}
+    write_report(build_report("micro", config, results), args.output)
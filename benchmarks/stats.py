@@ -0,0 +1,73 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+
+import numpy as np
+
+
+def summarize(latencies, elapsed : float, errors : int = 0) -> dict:
+    """Latency percentiles in milliseconds and throughput for a list of per-call durations in seconds."""
+    latencies_ms = np.asarray(latencies, dtype=np.float64) * 1000
+    summary = {
+        "count": int(len(latencies_ms)),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_per_s": round(len(latencies_ms) / elapsed, 2) if elapsed > 0 else None,
+    }
+    if len(latencies_ms):
+        p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+        summary.update({
+            "p50_ms": round(float(p50), 3),
+            "p95_ms": round(float(p95), 3),
+            "p99_ms": round(float(p99), 3),
+            "mean_ms": round(float(latencies_ms.mean()), 3),
+            "max_ms": round(float(latencies_ms.max()), 3),
+        })
+    return summary
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of this process."""
+    try:
+        import resource
+    except ImportError:
+        # Windows: the peak working set is the closest equivalent
+        import psutil
+        return int(psutil.Process().memory_info().peak_wset)
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return int(peak if sys.platform == "darwin" else peak * 1024)
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_report(kind : str, config : dict, results : dict) -> dict:
+    return {
+        "kind": kind,
+        "timestamp": datetime.utcnow().isoformat(),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": config,
+        "results": results,
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+
+
+def write_report(report : dict, path : str = None):
+    """Print the report, and also write it to `path` when one is given."""
+    text = json.dumps(report, indent=2)
+    print(text)
+    if path:
+        with open(path, "w") as f:
+            f.write(text + "\n")
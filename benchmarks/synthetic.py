@@ -0,0 +1,69 @@
+import numpy as np
+
+from BaseModels import frame_data
+
+
+def _points(rng : np.random.Generator, count : int, with_visibility : bool = False) -> list:
+    values = rng.random((count, 4 if with_visibility else 3))
+    names = ("x", "y", "z", "visibility") if with_visibility else ("x", "y", "z")
+    return [dict(zip(names, point)) for point in values.tolist()]
+
+
+def synthetic_frame(frame_id : int, rng : np.random.Generator, empty_hand_ratio : float = 0.3,
+                    empty_face_ratio : float = 0.1, empty_pose_ratio : float = 0.0) -> dict:
+    """
+    One single_frame_details-shaped dict with random coordinates. Each hand
+    is left empty with probability `empty_hand_ratio`, the face and the pose
+    with their own ratios, like frames where MediaPipe finds nothing.
+    """
+    return {
+        "frame_id": frame_id,
+        "pose_landmarks": [] if rng.random() < empty_pose_ratio else _points(rng, 33, with_visibility=True),
+        "face_landmarks": [] if rng.random() < empty_face_ratio else _points(rng, 468),
+        "left_hand_landmarks": [] if rng.random() < empty_hand_ratio else _points(rng, 21),
+        "right_hand_landmarks": [] if rng.random() < empty_hand_ratio else _points(rng, 21),
+    }
+
+
+def synthetic_frame_dict(length : int = 30, empty_hand_ratio : float = 0.3, empty_face_ratio : float = 0.1,
+                         empty_pose_ratio : float = 0.0, seed : int = None) -> dict:
+    """A /predict JSON body with `length` random frames."""
+    rng = np.random.default_rng(seed)
+    return {"frame_data": [
+        synthetic_frame(frame_id, rng, empty_hand_ratio, empty_face_ratio, empty_pose_ratio)
+        for frame_id in range(length)
+    ]}
+
+
+def synthetic_frame_data(length : int = 30, empty_hand_ratio : float = 0.3, empty_face_ratio : float = 0.1,
+                         empty_pose_ratio : float = 0.0, seed : int = None) -> frame_data:
+    return frame_data.model_validate(synthetic_frame_dict(length, empty_hand_ratio, empty_face_ratio, empty_pose_ratio, seed))
+
+
+def write_synthetic_video(path : str, frames : int = 60, width : int = 640, height : int = 480, fps : float = 30.0,
+                          seed : int = None) -> str:
+    """
+    Write a short clip of moving coloured blobs. It has no real signer in it,
+    so it exercises decoding and the Holistic graph rather than recognition.
+    """
+    import cv2
+
+    rng = np.random.default_rng(seed)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError(f"Could not open a video writer for {path}")
+
+    centers = rng.random((3, 2)) * (width, height)
+    velocities = (rng.random((3, 2)) - 0.5) * 20
+    colours = rng.integers(0, 256, (3, 3)).tolist()
+    try:
+        for _ in range(frames):
+            frame = np.full((height, width, 3), 40, dtype=np.uint8)
+            centers = (centers + velocities) % (width, height)
+            for (x, y), colour in zip(centers, colours):
+                cv2.circle(frame, (int(x), int(y)), min(width, height) // 8, colour, -1)
+            writer.write(frame)
+    finally:
+        writer.release()
+
+    return path
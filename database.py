@@ -1,10 +1,87 @@
+import importlib
+import os
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-database_url = ""
+# Set DATABASE_URL to point at another database, e.g. SQLite for the benchmarks
+database_url = os.environ.get("DATABASE_URL", "")
 
-engine =create_engine(url=database_url, echo=False)
+# "packed" stores each sequence as one float32 blob on frame_data,
+# "rows" keeps the original one-row-per-landmark tables.
+landmark_storage_mode = os.environ.get("LANDMARK_STORAGE_MODE", "packed")
+
+# Connection pool, per worker process: size, extra connections allowed under
+# load, and the age (seconds) after which a connection is replaced. Size and
+# overflow are the worker's whole budget: when the request path has an async
+# engine (see async_database.py), it is split between that and this engine.
+db_pool_size = int(os.environ.get("DB_POOL_SIZE", "5"))
+db_max_overflow = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+db_pool_recycle = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+db_pool_timeout = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+db_pool_pre_ping = os.environ.get("DB_POOL_PRE_PING", "1") == "1"
+# Of DB_POOL_SIZE, the connections this engine keeps for the background
+# workers (persistence, retention, jobs) when the async engine takes the rest;
+# the overflow is split in the same proportion
+db_background_pool_size = int(os.environ.get("DB_BACKGROUND_POOL_SIZE", "2"))
+
+# "auto" uses an async driver when one is installed for the database (asyncpg
+# for PostgreSQL, aiosqlite for SQLite) and otherwise runs ordinary sessions
+# in a bounded thread pool; "async" and "thread" force one or the other.
+db_async_mode = os.environ.get("DB_ASYNC_MODE", "auto")
+
+_async_drivers = {
+    "postgresql": ("postgresql+asyncpg", "asyncpg"),
+    "sqlite": ("sqlite+aiosqlite", "aiosqlite"),
+}
+
+
+def async_database_url(url : str):
+    """`url` rewritten for its async driver, or None when there is no installed driver for it."""
+    parsed = make_url(url)
+    driver = _async_drivers.get(parsed.get_backend_name())
+    if driver is None:
+        return None
+
+    drivername, module = driver
+    try:
+        importlib.import_module(module)
+    except ImportError:
+        return None
+    return parsed.set(drivername=drivername).render_as_string(hide_password=False)
+
+
+def pool_sizes(url : str = database_url, mode : str = db_async_mode) -> tuple:
+    """
+    (pool_size, max_overflow) of the sync engine and of the async engine, or
+    None for the latter when the request path runs sync sessions in threads.
+    Together they stay within DB_POOL_SIZE + DB_MAX_OVERFLOW (each keeps at
+    least one connection).
+    """
+    if mode == "thread" or async_database_url(url) is None:
+        return (db_pool_size, db_max_overflow), None
+
+    background = min(max(1, db_background_pool_size), max(1, db_pool_size - 1))
+    background_overflow = db_max_overflow * background // max(1, db_pool_size)
+    return (background, background_overflow), (max(1, db_pool_size - background), db_max_overflow - background_overflow)
+
+
+def engine_options(url : str, sizes : tuple = None) -> dict:
+    # SQLite's default pools take no sizing options
+    if url.startswith("sqlite"):
+        return {}
+    pool_size, max_overflow = sizes or (db_pool_size, db_max_overflow)
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_recycle": db_pool_recycle,
+        "pool_timeout": db_pool_timeout,
+        "pool_pre_ping": db_pool_pre_ping,
+    }
+
+
+engine =create_engine(url=database_url, echo=False, **engine_options(database_url, pool_sizes()[0]))
 
 SessionLocal = sessionmaker(bind=engine, autoflush=False)
 
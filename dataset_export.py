@@ -0,0 +1,279 @@
+"""
+Export stored sequences to sharded arrays for training.
+
+    python dataset_export.py [--output-dir exports] [--format npy|npz|parquet] [--shard-size 512]
+                             [--chunk-size 256] [--full]
+
+Each run appends shards holding the records stored since the watermark of
+the previous run, kept in <output-dir>/manifest.json; --full starts over.
+With the default npy format every shard is a set of plain .npy files:
+
+    shard-00000.keypoints.npy    (N, 30, 1662) float32
+    shard-00000.labels.npy       (N,) unicode
+    shard-00000.ids.npy          (N,) int64
+    shard-00000.timestamps.npy   (N,) datetime64[us]
+
+so a training job can np.load(path, mmap_mode="r") them without reading
+them into memory. npz bundles the same arrays in one (not mmap-able) file;
+parquet needs pyarrow and stores one row per record.
+
+Records without decodable keypoints (legacy records whose landmark rows are
+gone, or with no frames) are left out rather than exported as zeros under
+their label; their ids are listed under "skipped_ids" in the manifest.
+"""
+import argparse
+import json
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import select, or_, and_
+from sqlalchemy.orm import Session
+
+import models
+from landmark_storage import unpack_keypoints, load_row_keypoints, storage_dtype
+from landmarks import num_keypoints
+from locks import FileLock
+from predictions import required_frames as sequence_length
+from resampling import resample_sequence
+
+
+export_dir = os.environ.get("EXPORT_DIR", "exports")
+export_shard_size = int(os.environ.get("EXPORT_SHARD_SIZE", "512"))
+export_chunk_size = int(os.environ.get("EXPORT_CHUNK_SIZE", "256"))
+# Only records older than this are exported. Predictions are committed in
+# batches some time after their timestamp is taken, so a newer record could
+# still be followed by one with an earlier timestamp that the watermark
+# would then skip for good.
+export_safety_lag = float(os.environ.get("EXPORT_SAFETY_LAG", "60"))
+
+export_formats = ("npy", "npz", "parquet")
+
+manifest_name = "manifest.json"
+
+# Held during an export, so server workers and the CLI never export into the same directory at once
+lock_name = ".export.lock"
+
+
+class ExportInProgress(RuntimeError):
+    pass
+
+
+def read_manifest(output_dir : str) -> dict:
+    try:
+        with open(os.path.join(output_dir, manifest_name)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"format": None, "sequence_length": sequence_length, "num_keypoints": num_keypoints,
+                "watermark": None, "shards": [], "skipped_ids": []}
+
+
+def write_manifest(output_dir : str, manifest : dict):
+    path = os.path.join(output_dir, manifest_name)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+
+def stream_records(db : Session, watermark : dict, until : datetime, chunk_size : int):
+    """
+    Yield lists of (id, timestamp, label, blob, dtype, shape) rows after the
+    watermark, in (timestamp, id) order. The query runs on a server-side
+    cursor and returns plain rows, so memory stays bounded by `chunk_size`
+    however large the table is.
+    """
+    table = models.FrameData
+    query = (
+        select(table.id, table.timestamp, table.prediction_label, table.keypoints, table.keypoints_dtype, table.keypoints_shape)
+        .where(table.timestamp.is_not(None), table.timestamp < until, table.compacted_at.is_(None))
+        .order_by(table.timestamp, table.id)
+    )
+    if watermark:
+        timestamp = datetime.fromisoformat(watermark["timestamp"])
+        query = query.where(or_(
+            table.timestamp > timestamp,
+            and_(table.timestamp == timestamp, table.id > watermark["id"]),
+        ))
+
+    result = db.execute(query.execution_options(stream_results=True, yield_per=chunk_size))
+    for rows in result.partitions():
+        yield rows
+
+
+def chunk_arrays(db : Session, rows, out : np.ndarray) -> list:
+    """
+    Decode one chunk of rows into the preallocated `out` slice, one after the
+    other, and return the rows written; rows without decodable keypoints are
+    left out. Legacy row-per-landmark records are rebuilt with one set-based
+    load per chunk. Sequences of another length are resampled to
+    sequence_length.
+    """
+    legacy = load_row_keypoints(db, [row.id for row in rows if row.keypoints is None])
+    kept = []
+    for row in rows:
+        if row.keypoints is not None:
+            keypoints = unpack_keypoints(row.keypoints, row.keypoints_dtype, row.keypoints_shape)
+        else:
+            keypoints = legacy.get(row.id)
+
+        if keypoints is None or len(keypoints) == 0:
+            continue
+        if keypoints.shape == (sequence_length, num_keypoints):
+            out[len(kept)] = keypoints
+        else:
+            resample_sequence(keypoints, sequence_length, out=out[len(kept)])
+        kept.append(row)
+    return kept
+
+
+def manifest_files(manifest : dict) -> set:
+    return {file_name for shard in manifest["shards"] for file_name in shard["files"]}
+
+
+def write_shard(output_dir : str, name : str, fmt : str, arrays : dict) -> list:
+    """Write one shard atomically (temporary names, then rename) and return its file names."""
+    files = []
+    if fmt == "npy":
+        for key, array in arrays.items():
+            file_name = f"{name}.{key}.npy"
+            with open(os.path.join(output_dir, f"{file_name}.tmp"), "wb") as f:
+                np.save(f, array)
+            files.append(file_name)
+    elif fmt == "npz":
+        file_name = f"{name}.npz"
+        with open(os.path.join(output_dir, f"{file_name}.tmp"), "wb") as f:
+            np.savez(f, **arrays)
+        files.append(file_name)
+    else:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+
+        keypoints = arrays["keypoints"]
+        flat = pa.array(keypoints.reshape(-1), type=pa.float32())
+        table = pa.table({
+            "id": arrays["ids"],
+            "timestamp": arrays["timestamps"],
+            "label": arrays["labels"],
+            "keypoints": pa.FixedSizeListArray.from_arrays(flat, keypoints.shape[1] * keypoints.shape[2]),
+        })
+        file_name = f"{name}.parquet"
+        pq.write_table(table, os.path.join(output_dir, f"{file_name}.tmp"))
+        files.append(file_name)
+
+    for file_name in files:
+        path = os.path.join(output_dir, file_name)
+        os.replace(f"{path}.tmp", path)
+    return files
+
+
+def export_dataset(session_factory, output_dir : str = export_dir, fmt : str = "npy", shard_size : int = export_shard_size,
+                   chunk_size : int = export_chunk_size, full : bool = False) -> dict:
+    """
+    Append shards for every record stored since the manifest's watermark.
+    The manifest is rewritten after each shard, so an interrupted export
+    resumes after the last complete shard. Returns a summary of the run.
+    """
+    if fmt not in export_formats:
+        raise ValueError(f"Unknown export format : {fmt}")
+    shard_size = max(1, shard_size)
+
+    os.makedirs(output_dir, exist_ok=True)
+    lock = FileLock(os.path.join(output_dir, lock_name))
+    if not lock.acquire():
+        raise ExportInProgress(f"An export into {output_dir} is already running")
+    try:
+        manifest = read_manifest(output_dir)
+        if full:
+            manifest = {**manifest, "watermark": None, "shards": [], "skipped_ids": []}
+        manifest.setdefault("skipped_ids", [])
+        skipped_before = len(manifest["skipped_ids"])
+        if manifest["shards"] and manifest["format"] != fmt:
+            raise ValueError(f"{output_dir} holds {manifest['format']} shards; export with that format or --full")
+        manifest["format"] = fmt
+
+        until = datetime.utcnow() - timedelta(seconds=export_safety_lag)
+        keypoints = np.empty((shard_size, sequence_length, num_keypoints), dtype=storage_dtype)
+        ids = np.empty(shard_size, dtype=np.int64)
+        timestamps = np.empty(shard_size, dtype="datetime64[us]")
+        labels = []
+        filled = 0
+        exported = 0
+        skipped = []
+        new_shards = []
+
+        def flush():
+            nonlocal filled, labels, skipped
+            if filled:
+                name = f"shard-{len(manifest['shards']):05d}"
+                files = write_shard(output_dir, name, fmt, {
+                    "keypoints": keypoints[:filled],
+                    "labels": np.array(labels),
+                    "ids": ids[:filled],
+                    "timestamps": timestamps[:filled],
+                })
+                manifest["shards"].append({
+                    "name": name,
+                    "files": files,
+                    "records": filled,
+                    "first_timestamp": str(timestamps[0]),
+                    "last_timestamp": str(timestamps[filled - 1]),
+                    "created_at": datetime.utcnow().isoformat(),
+                })
+                new_shards.append(name)
+            manifest["skipped_ids"].extend(skipped)
+            manifest["watermark"] = {"timestamp": last_timestamp.isoformat(), "id": last_id}
+            write_manifest(output_dir, manifest)
+            filled = 0
+            labels = []
+            skipped = []
+
+        with session_factory() as db:
+            for rows in stream_records(db, manifest["watermark"], until, chunk_size):
+                offset = 0
+                while offset < len(rows):
+                    take = rows[offset:offset + shard_size - filled]
+                    kept = chunk_arrays(db, take, keypoints[filled:filled + len(take)])
+                    kept_ids = {row.id for row in kept}
+                    skipped.extend(row.id for row in take if row.id not in kept_ids)
+                    ids[filled:filled + len(kept)] = [row.id for row in kept]
+                    timestamps[filled:filled + len(kept)] = [row.timestamp for row in kept]
+                    labels.extend(row.prediction_label for row in kept)
+                    filled += len(kept)
+                    exported += len(kept)
+                    offset += len(take)
+                    last_timestamp, last_id = take[-1].timestamp, take[-1].id
+
+                    if filled == shard_size:
+                        flush()
+
+            if filled or skipped:
+                flush()
+
+        return {
+            "output_dir": output_dir,
+            "format": fmt,
+            "records": exported,
+            "skipped": len(manifest["skipped_ids"]) - skipped_before,
+            "new_shards": new_shards,
+            "total_shards": len(manifest["shards"]),
+            "watermark": manifest["watermark"],
+        }
+    finally:
+        lock.release()
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Export stored sequences to sharded arrays.")
+    parser.add_argument("--output-dir", default=export_dir)
+    parser.add_argument("--format", choices=export_formats, default="npy")
+    parser.add_argument("--shard-size", type=int, default=export_shard_size, help="Records per shard")
+    parser.add_argument("--chunk-size", type=int, default=export_chunk_size, help="Rows fetched from the cursor at a time")
+    parser.add_argument("--full", action="store_true", help="Ignore the watermark and rewrite every shard from the start")
+    args = parser.parse_args()
+
+    print(json.dumps(export_dataset(SessionLocal, args.output_dir, args.format, args.shard_size, args.chunk_size, args.full), indent=2))
@@ -0,0 +1,132 @@
+"""
+Convert the Keras model to TFLite and report accuracy drift on stored records.
+
+    python export_model.py [--quantization none|dynamic|int8] [--output model.tflite]
+                           [--eval-records 500] [--calibration-records 200] [--select-tf-ops]
+
+Stored records are compared twice: the converted model against the Keras model
+(label agreement and probability error), and both against the label that was
+saved with each record.
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+from database import SessionLocal
+from inference_backends import TFLiteBackend, default_tflite_path
+from landmarks import num_keypoints
+from predictions import model_path, required_frames, classes
+from records import load_records_page, load_page_keypoints
+
+
+def stored_sequences(limit : int):
+    """Up to `limit` stored (required_frames, num_keypoints) sequences and their saved labels."""
+    sequences = []
+    labels = []
+    cursor = 0
+    with SessionLocal() as db:
+        while len(sequences) < limit:
+            records = load_records_page(db, cursor, min(200, limit - len(sequences)))
+            if not records:
+                break
+            cursor = records[-1].id
+
+            keypoints = load_page_keypoints(db, records)
+            for record in records:
+                sequence = keypoints.get(record.id)
+                if sequence is not None and sequence.shape == (required_frames, num_keypoints):
+                    sequences.append(sequence)
+                    labels.append(record.prediction_label)
+
+    if not sequences:
+        return np.zeros((0, required_frames, num_keypoints), dtype=np.float32), labels
+    return np.stack(sequences).astype(np.float32), labels
+
+
+def convert(model, quantization : str, calibration : np.ndarray, select_tf_ops : bool) -> bytes:
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if select_tf_ops:
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS, tf.lite.OpsSet.SELECT_TF_OPS]
+
+    if quantization in ("dynamic", "int8"):
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+    if quantization == "int8":
+        if len(calibration) == 0:
+            raise SystemExit("int8 quantization needs stored records for calibration, none were found")
+
+        def representative_dataset():
+            for sequence in calibration:
+                yield [sequence[np.newaxis]]
+
+        converter.representative_dataset = representative_dataset
+
+    return converter.convert()
+
+
+def batched_predict(predict, sequences : np.ndarray, batch_size : int = 32) -> np.ndarray:
+    return np.concatenate([predict(sequences[i:i + batch_size]) for i in range(0, len(sequences), batch_size)])
+
+
+def drift_report(keras_probs : np.ndarray, tflite_probs : np.ndarray, labels) -> dict:
+    keras_labels = np.array(classes)[keras_probs.argmax(axis=1)]
+    tflite_labels = np.array(classes)[tflite_probs.argmax(axis=1)]
+    stored_labels = np.array(labels)
+    diff = np.abs(keras_probs - tflite_probs)
+    return {
+        "records": len(labels),
+        "label_agreement": float(np.mean(keras_labels == tflite_labels)),
+        "max_abs_prob_diff": float(diff.max()),
+        "mean_abs_prob_diff": float(diff.mean()),
+        "stored_label_agreement": {
+            "keras": float(np.mean(keras_labels == stored_labels)),
+            "tflite": float(np.mean(tflite_labels == stored_labels)),
+        },
+    }
+
+
+def export(output : str, quantization : str, eval_records : int, calibration_records : int, select_tf_ops : bool) -> dict:
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(model_path)
+    sequences, labels = stored_sequences(max(eval_records, calibration_records))
+
+    content = convert(model, quantization, sequences[:calibration_records], select_tf_ops)
+    with open(output, "wb") as f:
+        f.write(content)
+
+    report = {
+        "output": output,
+        "quantization": quantization,
+        "source_size_bytes": os.path.getsize(model_path),
+        "size_bytes": len(content),
+    }
+
+    evaluation = sequences[:eval_records]
+    if len(evaluation):
+        keras_probs = batched_predict(lambda batch: model(batch, training=False).numpy(), evaluation)
+        tflite_probs = batched_predict(TFLiteBackend(model_content=content).predict, evaluation)
+        report["drift"] = drift_report(keras_probs, tflite_probs, labels[:eval_records])
+    else:
+        report["drift"] = None
+        print("No stored records found, skipping the drift report")
+
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert the Keras model to TFLite and report accuracy drift.")
+    parser.add_argument("--output", default=default_tflite_path(model_path), help="Where to write the .tflite file")
+    parser.add_argument("--quantization", choices=("none", "dynamic", "int8"), default="none",
+                        help="Post-training quantization: dynamic-range weights, or int8 calibrated on stored records")
+    parser.add_argument("--eval-records", type=int, default=500, help="Stored records used for the drift report")
+    parser.add_argument("--calibration-records", type=int, default=200, help="Stored records used to calibrate int8")
+    parser.add_argument("--select-tf-ops", action="store_true",
+                        help="Allow TensorFlow ops the TFLite builtins lack (needs the full TF interpreter at runtime)")
+    args = parser.parse_args()
+
+    print(json.dumps(export(args.output, args.quantization, args.eval_records, args.calibration_records, args.select_tf_ops), indent=2))
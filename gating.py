@@ -0,0 +1,85 @@
+import math
+import os
+
+import numpy as np
+
+from landmarks import parts, pose_slice, left_hand_slice, right_hand_slice
+from metrics import Counter, Histogram
+
+
+# Windows in which fewer than this fraction of frames show a hand are answered
+# with no_sign instead of running the model; 0 disables the check
+gate_min_hand_ratio = float(os.environ.get("GATE_MIN_HAND_RATIO", "0.2"))
+# Minimum motion energy (see motion_energy) of a window; 0 disables the check.
+# slr_window_motion in /metrics shows the values seen, to pick a threshold.
+gate_min_motion = float(os.environ.get("GATE_MIN_MOTION", "0"))
+# Stop running Holistic over an uploaded video as soon as too few of its
+# sampled frames are left to reach gate_min_hand_ratio
+gate_video_early_stop = os.environ.get("GATE_VIDEO_EARLY_STOP", "1") == "1"
+
+no_sign = "no sign"
+
+gate_reasons = ("no_hands", "no_motion")
+
+gated_total = Counter("slr_gated_windows_total", "Windows answered as no sign without running the model", ("reason",),
+                      initial_labels=[(reason,) for reason in gate_reasons])
+window_motion = Histogram("slr_window_motion", "Motion energy of windows with enough hands",
+                          buckets=(0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1))
+
+# Columns of the hands in a presence mask (see landmarks.parts)
+hand_columns = [column for column, (name, _, _) in enumerate(parts) if name.endswith("hand_landmarks")]
+
+# (slice, values per landmark) of the channels that move when signing
+_motion_parts = ((pose_slice, 4), (left_hand_slice, 3), (right_hand_slice, 3))
+
+
+def hand_presence(presence : np.ndarray) -> np.ndarray:
+    """Per frame of a (frames, 4) presence mask, whether either hand was detected."""
+    return presence[:, hand_columns].any(axis=1)
+
+
+def min_hand_frames(count : int, min_hand_ratio : float = gate_min_hand_ratio) -> int:
+    """Frames out of `count` that must show a hand to pass the gate."""
+    return math.ceil(min_hand_ratio * count - 1e-9) if min_hand_ratio > 0 else 0
+
+
+def motion_energy(keypoints : np.ndarray) -> float:
+    """
+    Mean x/y displacement of a landmark between consecutive frames, in image
+    coordinates, for the pose and each hand over the frames where the part
+    was detected on both sides; the largest of the three.
+    """
+    if len(keypoints) < 2:
+        return 0.0
+
+    energy = 0.0
+    for part_slice, stride in _motion_parts:
+        part = keypoints[:, part_slice]
+        present = part.any(axis=1)
+        both = present[1:] & present[:-1]
+        if not both.any():
+            continue
+        xy = part.reshape(len(part), -1, stride)[:, :, :2]
+        steps = np.linalg.norm(xy[1:][both] - xy[:-1][both], axis=2)
+        energy = max(energy, float(steps.mean()))
+    return energy
+
+
+def check_window(keypoints : np.ndarray, presence : np.ndarray, min_hand_ratio : float = gate_min_hand_ratio,
+                 min_motion : float = gate_min_motion):
+    """
+    Cheap pre-check of a (frames, num_keypoints) window before inference.
+    `presence` is the part mask of the frames as they were detected, before
+    resampling: gaps bridged by resampling don't count as hands, the same
+    measure the early stop of video uploads uses. Returns the reason it is
+    not a sign ("no_hands" or "no_motion"), or None when it should go to the
+    model.
+    """
+    if hand_presence(presence).sum() < min_hand_frames(len(presence), min_hand_ratio):
+        return "no_hands"
+
+    energy = motion_energy(keypoints)
+    window_motion.observe(energy)
+    if energy < min_motion:
+        return "no_motion"
+    return None
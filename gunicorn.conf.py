@@ -0,0 +1,86 @@
+"""
+Production serving: gunicorn managing uvicorn workers.
+
+    gunicorn -c gunicorn.conf.py main:app
+
+The app is imported once in the parent before the workers are forked, and a
+TFLite model (INFERENCE_BACKEND=tflite) is read into memory there too, so its
+pages are shared copy-on-write by every worker. The Keras backend cannot be
+shared this way (TensorFlow must not be initialised before a fork) and is
+loaded by each worker's lifespan instead.
+
+The cores are divided between the workers: unless they are set explicitly,
+the TensorFlow/TFLite/BLAS thread counts and the Holistic pool size of each
+worker are derived from SERVING_WORKERS, so the workers don't oversubscribe
+the machine.
+
+State that must be seen by every worker is not kept in process memory: job
+status is in the jobs table, exports hold a lock file in their directory and
+retention runs under a database lock (see jobs.py and locks.py). Metrics are
+published by every worker to a directory made here for each server (unless
+METRICS_DIR is set), and /metrics on any worker reports the sum, so the
+server is one scrape target. The in-memory caches remain per worker.
+
+Without preloading (SERVING_PRELOAD=0) each worker creates the schema in its
+lifespan; createTable() holds a database lock, so they take turns.
+"""
+import os
+import shutil
+import tempfile
+
+
+cpu_count = os.cpu_count() or 1
+
+workers = int(os.environ.get("SERVING_WORKERS", os.environ.get("WEB_CONCURRENCY", str(max(1, cpu_count // 4)))))
+threads_per_worker = int(os.environ.get("SERVING_THREADS_PER_WORKER", str(max(1, cpu_count // workers))))
+
+# Inherited by the workers; read by TensorFlow, the BLAS libraries and this app at import
+for name in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "TF_NUM_INTRAOP_THREADS", "INFERENCE_THREADS"):
+    os.environ.setdefault(name, str(threads_per_worker))
+os.environ.setdefault("TF_NUM_INTEROP_THREADS", "1")
+os.environ.setdefault("HOLISTIC_POOL_SIZE", str(threads_per_worker))
+
+# Before the app (and metrics.py) is imported; a fresh directory per server,
+# so nothing is summed from an earlier run
+created_metrics_dir = None
+if not os.environ.get("METRICS_DIR"):
+    created_metrics_dir = os.environ["METRICS_DIR"] = tempfile.mkdtemp(prefix="slr-metrics-")
+
+bind = os.environ.get("BIND", f"0.0.0.0:{os.environ.get('PORT', '8000')}")
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.environ.get("SERVING_PRELOAD", "1") == "1"
+# Model loading happens in the background of each worker's lifespan, so the
+# default boot timeout is enough; this covers requests such as video uploads
+timeout = int(os.environ.get("SERVING_TIMEOUT", "120"))
+graceful_timeout = int(os.environ.get("SERVING_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+# Restart workers now and then to bound slow memory growth, staggered by the jitter
+max_requests = int(os.environ.get("SERVING_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+accesslog = "-"
+
+
+def when_ready(server):
+    """Runs once in the parent, after the app is preloaded and before any worker is forked."""
+    if not preload_app:
+        return
+
+    from main import createTable, schema_ready_env
+    from predictions import preload_model
+
+    # Once here rather than racing in every worker's lifespan; the workers,
+    # forked after this, inherit the flag and skip it
+    createTable()
+    os.environ[schema_ready_env] = "1"
+    preload_model()
+
+
+def post_fork(server, worker):
+    # Connections opened by the parent must not be shared with the children
+    from database import engine
+    engine.dispose(close=False)
+
+
+def on_exit(server):
+    if created_metrics_dir:
+        shutil.rmtree(created_metrics_dir, ignore_errors=True)
@@ -0,0 +1,265 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from landmarks import KeypointSequence, fill_frame
+from video_sampling import sample_frame_indices, read_sampled_frames, prepare_frame
+from metrics import stage_seconds, errors_total
+from gating import min_hand_frames, hand_columns
+
+
+holistic_pool_size = int(os.environ.get("HOLISTIC_POOL_SIZE", str(os.cpu_count() or 1)))
+holistic_max_jobs_per_worker = int(os.environ.get("HOLISTIC_MAX_JOBS_PER_WORKER", "200"))
+holistic_max_queue = int(os.environ.get("HOLISTIC_MAX_QUEUE", "64"))
+holistic_health_timeout = float(os.environ.get("HOLISTIC_HEALTH_TIMEOUT", "30"))
+# Seconds between health checks run by monitor(); 0 disables them
+holistic_health_interval = float(os.environ.get("HOLISTIC_HEALTH_INTERVAL", "60"))
+
+
+class HolisticPoolBusy(Exception):
+    pass
+
+
+# ---- worker process side -------------------------------------------------
+
+_holistic = None
+
+
+def _init_worker():
+    """Build the worker's Holistic graph once, when the process starts."""
+    global _holistic
+    import cv2
+    import mediapipe as mp
+
+    # OpenCV's own thread pool would only compete with the other workers
+    cv2.setNumThreads(1)
+    _holistic = mp.solutions.holistic.Holistic( # type: ignore
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5
+    )
+
+
+def _ping():
+    return os.getpid()
+
+
+def _process_frame(frame, row : np.ndarray, presence : np.ndarray, max_height : int, max_width : int) -> float:
+    """Run one BGR frame through the worker's Holistic instance into the zeroed `row`; returns the seconds it took."""
+    start = time.perf_counter()
+    results = _holistic.process(prepare_frame(frame, max_height, max_width))
+    fill_frame(results, row, presence)
+    return time.perf_counter() - start
+
+
+def extract_video_keypoints(video_path : str, count : int, max_height : int, max_width : int, min_hand_ratio : float = 0):
+    """
+    Sample up to `count` frames from a video and run them through the worker's
+    warm Holistic instance. Returns one keypoint row and presence mask row per
+    frame actually read, fewer than `count` for short videos, and the stage
+    timings, which the parent records.
+
+    With `min_hand_ratio`, processing stops as soon as too few sampled frames
+    are left to show a hand in that fraction of them, and an all-zero
+    sequence (nothing detected) is returned instead.
+    """
+    import cv2
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError("Could not open video file")
+
+    sequence = KeypointSequence.empty(count)
+    keypoints, presence = sequence.keypoints, sequence.presence
+    timings = {"video_decode": [0.0], "holistic_frame": []}
+    read = 0
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        frame_indices = sample_frame_indices(total_frames, fps, count)
+        needed = min_hand_frames(len(frame_indices), min_hand_ratio)
+        processed = 0
+        hands = 0
+
+        frames = read_sampled_frames(cap, frame_indices)
+        while True:
+            start = time.perf_counter()
+            item = next(frames, None)
+            timings["video_decode"][0] += time.perf_counter() - start
+            if item is None:
+                break
+
+            slot, frame = item
+            timings["holistic_frame"].append(_process_frame(frame, keypoints[slot], presence[slot], max_height, max_width))
+            read = slot + 1
+
+            processed += 1
+            # Counted on the mask before resampling, as check_window() counts them
+            hands += int(presence[slot, hand_columns].any())
+            if hands + len(frame_indices) - processed < needed:
+                keypoints[:] = 0
+                presence[:] = False
+                return keypoints, presence, timings
+    finally:
+        cap.release()
+
+    if read == 0:
+        raise ValueError("Could not read any frames from the video")
+    return keypoints[:read], presence[:read], timings
+
+
+def _record_timings(timings : dict):
+    for stage, durations in timings.items():
+        for duration in durations:
+            stage_seconds.observe(duration, stage)
+
+
+# ---- parent process side -------------------------------------------------
+
+class HolisticPool:
+    """
+    Long-lived worker processes, each owning a warm MediaPipe Holistic graph.
+
+    The pool is recycled as a whole once it has run `max_jobs_per_worker` jobs
+    per worker: a fresh set of processes takes new work while the old ones
+    finish what they have and exit, which bounds native memory growth.
+    At most `max_queue` jobs may be pending before callers get HolisticPoolBusy.
+    """
+
+    def __init__(self, size : int = holistic_pool_size, max_jobs_per_worker : int = holistic_max_jobs_per_worker,
+                 max_queue : int = holistic_max_queue):
+        self.size = max(1, size)
+        self.max_jobs_per_worker = max(1, max_jobs_per_worker)
+        self.max_queue = max(1, max_queue)
+        self._executor = None
+        self._jobs = 0
+        self._pending = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+        # When a job last finished, or the queue last became non-empty
+        self._last_progress = time.monotonic()
+        # Result of the latest health_check(), None before the first
+        self.last_health = None
+
+    @property
+    def queue_depth(self) -> int:
+        return self._pending
+
+    def _new_executor(self):
+        self._generation += 1
+        self._jobs = 0
+        executor = ProcessPoolExecutor(
+            max_workers=self.size,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+        # Spawn and warm every worker up front instead of on the first uploads
+        for _ in range(self.size):
+            executor.submit(_ping)
+        return executor
+
+    def start(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._new_executor()
+
+    def stop(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _acquire_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._new_executor()
+            elif self._jobs >= self.size * self.max_jobs_per_worker:
+                print(f"Holistic pool : recycling generation {self._generation} after {self._jobs} jobs")
+                self._executor.shutdown(wait=False)
+                self._executor = self._new_executor()
+            self._jobs += 1
+            return self._executor
+
+    def _reset(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        # Queued jobs are left alone: a broken pool has already failed them
+        executor.shutdown(wait=False)
+
+    async def submit(self, fn, *args):
+        if self._pending >= self.max_queue:
+            raise HolisticPoolBusy(f"Holistic pool is busy ({self._pending} jobs pending)")
+
+        if self._pending == 0:
+            self._last_progress = time.monotonic()
+        self._pending += 1
+        executor = self._acquire_executor()
+        try:
+            return await asyncio.wrap_future(executor.submit(fn, *args))
+        except BrokenProcessPool:
+            print("Holistic pool : a worker died, restarting the pool")
+            errors_total.inc("holistic")
+            self._reset(executor)
+            raise
+        finally:
+            self._pending -= 1
+            self._last_progress = time.monotonic()
+
+    async def extract_video(self, video_path : str, count : int, max_height : int, max_width : int,
+                            min_hand_ratio : float = 0) -> KeypointSequence:
+        keypoints, presence, timings = await self.submit(extract_video_keypoints, video_path, count, max_height, max_width, min_hand_ratio)
+        _record_timings(timings)
+        return KeypointSequence(keypoints, presence)
+
+    @staticmethod
+    def _worker_processes(executor) -> list:
+        # ProcessPoolExecutor keeps its worker handles in _processes ({pid: Process})
+        return list((getattr(executor, "_processes", None) or {}).values())
+
+    async def health_check(self, timeout : float = holistic_health_timeout) -> dict:
+        """
+        Check the pool without queueing anything behind the uploads. It is dead
+        when a worker process has exited, and hung when jobs have been pending
+        for `timeout` seconds without any of them finishing; a pool that is only
+        busy is healthy. A dead pool is replaced. A hung one has its workers
+        terminated first, which fails its queued jobs with BrokenProcessPool
+        instead of leaving them waiting.
+        """
+        with self._lock:
+            executor = self._executor
+
+        problem = None
+        if executor is not None:
+            processes = self._worker_processes(executor)
+            if getattr(executor, "_broken", False) or any(not process.is_alive() for process in processes):
+                problem = "a worker died"
+            elif self._pending and time.monotonic() - self._last_progress > timeout:
+                problem = f"no job finished in {timeout:g} seconds"
+                for process in processes:
+                    if process.is_alive():
+                        process.terminate()
+
+        if problem is not None:
+            print(f"Holistic pool : health check failed ({problem}), restarting the pool")
+            errors_total.inc("holistic")
+            self._reset(executor)
+            self.start()
+            self.last_health = {"healthy": False, "generation": self._generation, "pending": self._pending}
+            return self.last_health
+
+        self.last_health = {"healthy": True, "generation": self._generation, "pending": self._pending}
+        return self.last_health
+
+    async def monitor(self, interval : float = holistic_health_interval, timeout : float = holistic_health_timeout):
+        """Run health_check() every `interval` seconds until cancelled."""
+        if interval <= 0:
+            return
+        while True:
+            await asyncio.sleep(interval)
+            await self.health_check(timeout)
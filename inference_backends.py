@@ -0,0 +1,169 @@
+import os
+
+import numpy as np
+
+from inference_engine import max_batch_size
+
+
+# "keras" runs the .h5 model through a tf.function with a fixed input signature,
+# "tflite" runs a converted model (see export_model.py) in the TFLite interpreter.
+inference_backend = os.environ.get("INFERENCE_BACKEND", "keras")
+tflite_model_path = os.environ.get("TFLITE_MODEL_PATH", "")
+# Threads one model call may use (TFLite interpreter threads, TensorFlow
+# intra-op threads); 0 leaves the choice to the runtime
+inference_threads = int(os.environ.get("INFERENCE_THREADS", "0"))
+
+
+def batch_buckets(max_size : int = max_batch_size) -> tuple:
+    """Powers of two below `max_size`, then `max_size`: the batch sizes a TFLite interpreter is allocated for."""
+    buckets = []
+    size = 1
+    while size < max_size:
+        buckets.append(size)
+        size *= 2
+    buckets.append(max(1, max_size))
+    return tuple(buckets)
+
+
+class InferenceBackend:
+    """Maps a (batch, frames, keypoints) float32 array to (batch, classes) probabilities."""
+
+    name = "base"
+
+    def predict(self, batch : np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def warmup(self, sequence_length : int, num_features : int):
+        self.predict(np.zeros((1, sequence_length, num_features), dtype=np.float32))
+
+
+class KerasBackend(InferenceBackend):
+    """
+    Calls the Keras model directly inside a tf.function traced once for
+    (None, frames, keypoints), avoiding the per-call setup of model.predict().
+    """
+
+    name = "keras"
+
+    def __init__(self, model_path : str, sequence_length : int, num_features : int, num_threads : int = inference_threads):
+        import tensorflow as tf
+
+        if num_threads:
+            # Must happen before TensorFlow creates its thread pools
+            tf.config.threading.set_intra_op_parallelism_threads(num_threads)
+            tf.config.threading.set_inter_op_parallelism_threads(1)
+
+        self._tf = tf
+        self.model = tf.keras.models.load_model(model_path)
+        self._call = tf.function(
+            lambda inputs: self.model(inputs, training=False),
+            input_signature=[tf.TensorSpec(shape=(None, sequence_length, num_features), dtype=tf.float32)],
+        )
+
+    def predict(self, batch : np.ndarray) -> np.ndarray:
+        return self._call(self._tf.convert_to_tensor(batch, dtype=self._tf.float32)).numpy()
+
+
+def _tflite_interpreter_class():
+    try:
+        from tflite_runtime.interpreter import Interpreter # type: ignore
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+class TFLiteBackend(InferenceBackend):
+    """
+    Runs a .tflite model, float or quantized. Batches are padded up to the
+    next of `buckets` and the padding sliced off the output, so the input
+    tensor is only resized (and the interpreter re-allocated) when the bucket
+    changes; larger batches run in chunks of the largest bucket. int8
+    inputs/outputs are (de)quantized here.
+    Not thread-safe: use it from a single thread, like the inference engine's.
+    """
+
+    name = "tflite"
+
+    def __init__(self, model_path : str = None, model_content : bytes = None, num_threads : int = inference_threads,
+                 buckets : tuple = None):
+        Interpreter = _tflite_interpreter_class()
+        self.interpreter = Interpreter(
+            model_path=model_path,
+            model_content=model_content,
+            num_threads=num_threads or None,
+        )
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self._input["shape"][0])
+        self.buckets = buckets or batch_buckets()
+        self._padded = None
+
+    def _resize(self, size : int, shape : tuple):
+        self.interpreter.resize_tensor_input(self._input["index"], [size, *shape])
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = size
+        self._padded = None
+
+    def predict(self, batch : np.ndarray) -> np.ndarray:
+        count = batch.shape[0]
+        largest = self.buckets[-1]
+        if count > largest:
+            return np.concatenate([self.predict(batch[start:start + largest]) for start in range(0, count, largest)])
+
+        size = next(bucket for bucket in self.buckets if bucket >= count)
+        if size != self._batch_size:
+            self._resize(size, batch.shape[1:])
+        if count < size:
+            if self._padded is None or self._padded.shape[1:] != batch.shape[1:]:
+                self._padded = np.zeros((size, *batch.shape[1:]), dtype=np.float32)
+            # Rows past `count` keep whatever they held; their outputs are dropped
+            self._padded[:count] = batch
+            batch = self._padded
+
+        input_dtype = self._input["dtype"]
+        if input_dtype != np.float32:
+            scale, zero_point = self._input["quantization"]
+            info = np.iinfo(input_dtype)
+            batch = np.clip(np.round(batch / scale + zero_point), info.min, info.max).astype(input_dtype)
+
+        self.interpreter.set_tensor(self._input["index"], np.ascontiguousarray(batch))
+        self.interpreter.invoke()
+        output = self.interpreter.get_tensor(self._output["index"])
+
+        if output.dtype != np.float32:
+            scale, zero_point = self._output["quantization"]
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output[:count]
+
+
+def default_tflite_path(model_path : str) -> str:
+    return tflite_model_path or os.path.splitext(model_path)[0] + ".tflite"
+
+
+def read_model_content(model_path : str, kind : str = inference_backend):
+    """
+    The model file's bytes, for backends that can be built from memory (TFLite),
+    else None. Read in a server's parent process before it forks, the bytes are
+    shared copy-on-write by every worker instead of each loading its own copy.
+    TensorFlow itself must not be initialised before a fork, so the Keras
+    backend is always loaded in the worker.
+    """
+    if kind != "tflite":
+        return None
+    with open(default_tflite_path(model_path), "rb") as f:
+        return f.read()
+
+
+def load_backend(model_path : str, sequence_length : int, num_features : int, kind : str = inference_backend,
+                 model_content : bytes = None) -> InferenceBackend:
+    if kind == "keras":
+        return KerasBackend(model_path, sequence_length, num_features)
+    if kind == "tflite":
+        if model_content is not None:
+            return TFLiteBackend(model_content=model_content)
+        return TFLiteBackend(model_path=default_tflite_path(model_path))
+    raise ValueError(f"Unknown inference backend : {kind}")
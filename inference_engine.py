@@ -0,0 +1,145 @@
+import asyncio
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from metrics import stage_seconds, inference_batch_size, errors_total
+
+
+max_batch_size = int(os.environ.get("INFERENCE_MAX_BATCH_SIZE", "32"))
+max_wait_ms = float(os.environ.get("INFERENCE_MAX_WAIT_MS", "5"))
+
+
+class EngineStopped(RuntimeError):
+    pass
+
+
+def _set_result(future: asyncio.Future, result):
+    if not future.done():
+        future.set_result(result)
+
+
+def _set_exception(future: asyncio.Future, exc: BaseException):
+    if not future.done():
+        future.set_exception(exc)
+
+
+class InferenceEngine:
+    """
+    Dynamic micro-batching in front of the model.
+
+    Requests submitted from the event loop are queued and picked up by a
+    dedicated worker thread, which merges everything that arrives within
+    `max_wait_ms` (up to `max_batch_size` sequences) into a single forward
+    pass and hands each caller back its own row of the output.
+    """
+
+    def __init__(self, predict_fn, max_batch_size: int = max_batch_size, max_wait_ms: float = max_wait_ms):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopping = False
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def start(self):
+        with self._lock:
+            self._stopping = False
+            self._start_thread()
+
+    def _start_thread(self):
+        # Called with self._lock held
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="inference-engine", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """
+        Stop the worker thread after the batch in progress. Requests still
+        queued behind it fail with EngineStopped rather than wait forever.
+        """
+        with self._lock:
+            self._stopping = True
+            if self._thread is None:
+                return
+            self._queue.put(None)
+            thread, self._thread = self._thread, None
+        thread.join(timeout=timeout)
+        self._fail_pending(EngineStopped("Inference engine is shutting down"))
+        if thread.is_alive():
+            # Still in a batch; its stop sentinel went with the rest of the queue
+            self._queue.put(None)
+
+    def _fail_pending(self, exc: BaseException):
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is None:
+                continue
+            _, future, loop = item
+            try:
+                loop.call_soon_threadsafe(_set_exception, future, exc)
+            except RuntimeError:
+                # Its event loop is already closed; nobody is waiting
+                pass
+
+    async def submit(self, inputs: np.ndarray) -> np.ndarray:
+        """Queue one input sequence and wait for its model output. Raises EngineStopped after stop()."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        # Under the lock, so nothing is queued after stop() has drained the queue
+        with self._lock:
+            if self._stopping:
+                raise EngineStopped("Inference engine is shutting down")
+            self._start_thread()
+            self._queue.put((inputs, future, loop))
+        return await future
+
+    def _run(self):
+        running = True
+        while running:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    running = False
+                    break
+                batch.append(item)
+
+            self._process(batch)
+
+    def _process(self, batch):
+        inference_batch_size.observe(len(batch))
+        start = time.perf_counter()
+        try:
+            outputs = self.predict_fn(np.stack([inputs for inputs, _, _ in batch]))
+        except Exception as e:
+            errors_total.inc("inference")
+            print(f"Inference engine : batch of {len(batch)} failed : {e}")
+            for _, future, loop in batch:
+                loop.call_soon_threadsafe(_set_exception, future, e)
+            return
+        stage_seconds.observe(time.perf_counter() - start, "inference")
+
+        for (_, future, loop), output in zip(batch, outputs):
+            loop.call_soon_threadsafe(_set_result, future, output)
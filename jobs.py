@@ -0,0 +1,245 @@
+import asyncio
+import copy
+import json
+import os
+import time
+import uuid
+
+from sqlalchemy import delete, update
+
+import models
+
+
+job_ttl = float(os.environ.get("JOB_TTL_SECONDS", "3600"))
+max_jobs = int(os.environ.get("MAX_JOBS", "1000"))
+# Seconds between checks of a job that runs in another process
+job_poll_interval = float(os.environ.get("JOB_POLL_INTERVAL", "0.5"))
+# Queued or running jobs not updated for this long were left behind by a
+# worker that died or was killed, and are marked failed
+job_stuck_after = float(os.environ.get("JOB_STUCK_SECONDS", "900"))
+
+finished_statuses = ("done", "failed")
+unfinished_statuses = ("queued", "running")
+
+interrupted_message = "The server was restarted before the job finished; submit it again"
+
+
+class Job:
+    def __init__(self, job_id : str = None):
+        self.id = job_id or uuid.uuid4().hex
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.status_code = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.version = 0
+        self._changed = asyncio.Event()
+
+    @classmethod
+    def from_record(cls, record : models.JobRecord):
+        job = cls(record.id)
+        job.copy_record(record)
+        return job
+
+    def copy_record(self, record : models.JobRecord):
+        self.status = record.status
+        self.result = json.loads(record.result) if record.result is not None else None
+        self.error = record.error
+        self.status_code = record.status_code
+        self.created_at = record.created_at
+        self.updated_at = record.updated_at
+        self.version = record.version
+
+    def to_record(self) -> models.JobRecord:
+        return models.JobRecord(
+            id=self.id,
+            status=self.status,
+            result=json.dumps(self.result) if self.result is not None else None,
+            error=self.error,
+            status_code=self.status_code,
+            version=self.version,
+            created_at=self.created_at,
+            updated_at=self.updated_at,
+        )
+
+    @property
+    def finished(self) -> bool:
+        return self.status in finished_statuses
+
+    def to_dict(self) -> dict:
+        message = {"job_id": self.id, "status": self.status}
+        if self.result is not None:
+            message["result"] = self.result
+        if self.error is not None:
+            message["error"] = self.error
+            message["status_code"] = self.status_code
+        return message
+
+
+class JobStore:
+    """
+    Registry of background jobs. A job runs in the worker that accepted it
+    and is dropped `job_ttl` seconds after it finishes.
+
+    With a `session_factory`, every state change is also written to the jobs
+    table, so any server process can answer for any job: jobs of other
+    processes are read from the table and followed by polling it. Without
+    one, jobs only exist in the memory of their process.
+    """
+
+    def __init__(self, ttl : float = job_ttl, max_jobs : int = max_jobs, session_factory=None,
+                 poll_interval : float = job_poll_interval, stuck_after : float = job_stuck_after):
+        self.ttl = ttl
+        self.max_jobs = max_jobs
+        self.session_factory = session_factory
+        self.poll_interval = max(0.05, poll_interval)
+        self.stuck_after = stuck_after
+        self._jobs = {}
+        self._tasks = set()
+
+    def __len__(self):
+        return len(self._jobs)
+
+    async def get(self, job_id : str):
+        job = self._jobs.get(job_id)
+        if job is not None or self.session_factory is None:
+            return job
+        return await asyncio.to_thread(self._load, job_id)
+
+    def _load(self, job_id : str):
+        with self.session_factory() as db:
+            record = db.get(models.JobRecord, job_id)
+            return Job.from_record(record) if record is not None else None
+
+    def _save(self, job : Job, prune_before : float = None):
+        with self.session_factory() as db:
+            db.merge(job.to_record())
+            if prune_before is not None:
+                db.execute(delete(models.JobRecord).where(
+                    models.JobRecord.updated_at < prune_before,
+                    models.JobRecord.status.in_(finished_statuses),
+                ))
+                self._expire_stuck(db)
+            db.commit()
+
+    def _expire_stuck(self, db) -> int:
+        now = time.time()
+        result = db.execute(
+            update(models.JobRecord)
+            .where(models.JobRecord.updated_at < now - self.stuck_after, models.JobRecord.status.in_(unfinished_statuses))
+            .values(status="failed", error=interrupted_message, status_code=503, updated_at=now,
+                    version=models.JobRecord.version + 1)
+        )
+        return result.rowcount
+
+    async def expire_stuck(self) -> int:
+        """Fail the jobs of other, dead processes left queued or running; returns how many. Run at startup."""
+        if self.session_factory is None:
+            return 0
+
+        def expire():
+            with self.session_factory() as db:
+                count = self._expire_stuck(db)
+                db.commit()
+                return count
+
+        try:
+            return await asyncio.to_thread(expire)
+        except Exception as e:
+            print(f"Error expiring stuck jobs : {e}")
+            return 0
+
+    async def _store(self, job : Job, prune_before : float = None):
+        if self.session_factory is None:
+            return
+        try:
+            await asyncio.to_thread(self._save, job, prune_before)
+        except Exception as e:
+            # The job itself goes on; only other processes lose sight of it
+            print(f"Error saving job {job.id} : {e}")
+
+    def prune(self) -> float:
+        cutoff = time.time() - self.ttl
+        for job_id in [job.id for job in self._jobs.values() if job.finished and job.updated_at < cutoff]:
+            del self._jobs[job_id]
+        return cutoff
+
+    async def _update(self, job : Job, status : str, result=None, error=None, status_code=None):
+        # Stored before it is applied, so a finished job is never missing from the table
+        changed = copy.copy(job)
+        changed.status = status
+        changed.result = result
+        changed.error = error
+        changed.status_code = status_code
+        changed.updated_at = time.time()
+        changed.version = job.version + 1
+        await self._store(changed)
+
+        job.copy_record(changed.to_record())
+        job._changed.set()
+        job._changed = asyncio.Event()
+
+    async def submit(self, work, on_error) -> Job:
+        """
+        Start `work()` (a coroutine function) as a background task and return
+        its Job, once it is visible to every process. `on_error(exc)` maps a
+        failure to a (status_code, message) pair.
+        """
+        cutoff = self.prune()
+        if len(self._jobs) >= self.max_jobs:
+            raise RuntimeError(f"Too many jobs in progress ({len(self._jobs)})")
+
+        job = Job()
+        self._jobs[job.id] = job
+        await self._store(job, prune_before=cutoff)
+
+        async def run():
+            try:
+                await self._update(job, "running")
+                result = await work()
+            except asyncio.CancelledError:
+                # Shutting down: recorded, so nobody waits for it forever
+                await self._update(job, "failed", error=interrupted_message, status_code=503)
+                raise
+            except Exception as e:
+                status_code, message = on_error(e)
+                await self._update(job, "failed", error=message, status_code=status_code)
+            else:
+                await self._update(job, "done", result=result)
+
+        task = asyncio.create_task(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def shutdown(self, timeout : float = 10.0):
+        """Cancel the jobs still in progress in this process; each is marked failed on its way out."""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+
+    async def wait_for_change(self, job : Job, since_version : int, timeout : float) -> bool:
+        """Wait until the job moves past `since_version`; False if `timeout` elapsed first."""
+        if job.version > since_version:
+            return True
+
+        if self._jobs.get(job.id) is not job:
+            # Another process runs it: poll the table and refresh our copy
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                await asyncio.sleep(min(self.poll_interval, max(0.0, deadline - time.monotonic())))
+                fresh = await asyncio.to_thread(self._load, job.id)
+                if fresh is not None and fresh.version > since_version:
+                    job.copy_record(fresh.to_record())
+                    return True
+            return False
+
+        changed = job._changed
+        try:
+            await asyncio.wait_for(changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
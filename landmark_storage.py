@@ -0,0 +1,155 @@
+from collections import defaultdict
+
+import numpy as np
+from sqlalchemy import inspect, select, text, delete
+from sqlalchemy.orm import Session
+
+import models
+from landmarks import num_keypoints, pose_slice, face_slice, left_hand_slice, right_hand_slice
+
+
+storage_dtype = np.dtype("<f4")
+
+packed_columns = ("keypoints", "keypoints_dtype", "keypoints_shape")
+
+# (landmark table, slice of the keypoint row, value columns)
+landmark_tables = (
+    (models.PoseLandmark, pose_slice, ("x", "y", "z", "visibility")),
+    (models.FaceLandmark, face_slice, ("x", "y", "z")),
+    (models.LeftHandLandmark, left_hand_slice, ("x", "y", "z")),
+    (models.RightHandLandmark, right_hand_slice, ("x", "y", "z")),
+)
+
+
+def pack_keypoints(keypoints : np.ndarray) -> dict:
+    """Column values for storing a keypoint sequence as a single packed blob."""
+    keypoints = np.ascontiguousarray(keypoints, dtype=storage_dtype)
+    return {
+        "keypoints": keypoints.tobytes(),
+        "keypoints_dtype": storage_dtype.str,
+        "keypoints_shape": ",".join(str(dim) for dim in keypoints.shape),
+    }
+
+
+def unpack_keypoints(blob : bytes, dtype : str, shape : str) -> np.ndarray:
+    dims = tuple(int(dim) for dim in shape.split(","))
+    return np.frombuffer(blob, dtype=np.dtype(dtype)).reshape(dims)
+
+
+def record_keypoints(record : models.FrameData):
+    """Keypoints of a packed record, or None for a row-per-landmark record."""
+    if record.keypoints is None:
+        return None
+    return unpack_keypoints(record.keypoints, record.keypoints_dtype, record.keypoints_shape)
+
+
+def load_row_keypoints(db : Session, frame_data_ids) -> dict:
+    """
+    Rebuild keypoint arrays for row-per-landmark records with one query per
+    table (frames + 4 landmark tables) for the whole batch of ids.
+    Returns {frame_data_id: (frames, num_keypoints) float32 array}.
+    """
+    frame_data_ids = list(frame_data_ids)
+    if not frame_data_ids:
+        return {}
+
+    frame_rows = db.execute(
+        select(models.SingleFrameDetails.id, models.SingleFrameDetails.frame_data_id)
+        .where(models.SingleFrameDetails.frame_data_id.in_(frame_data_ids))
+        .order_by(models.SingleFrameDetails.frame_data_id, models.SingleFrameDetails.frame_id, models.SingleFrameDetails.id)
+    ).all()
+
+    # frame row id -> (record id, position of the frame inside its sequence)
+    positions = {}
+    counts = defaultdict(int)
+    for frame_row_id, record_id in frame_rows:
+        positions[frame_row_id] = (record_id, counts[record_id])
+        counts[record_id] += 1
+
+    arrays = {record_id: np.zeros((count, num_keypoints), dtype=storage_dtype) for record_id, count in counts.items()}
+
+    for table, part_slice, value_columns in landmark_tables:
+        rows = db.execute(
+            select(table.frame_id, *(getattr(table, column) for column in value_columns))
+            .join(models.SingleFrameDetails, table.frame_id == models.SingleFrameDetails.id)
+            .where(models.SingleFrameDetails.frame_data_id.in_(frame_data_ids))
+            .order_by(table.frame_id, table.id)
+        ).all()
+        if not rows:
+            continue
+
+        values = np.array(rows, dtype=np.float64)
+        frame_ids = values[:, 0].astype(np.int64)
+        points = np.nan_to_num(values[:, 1:]).astype(storage_dtype)
+        width = part_slice.stop - part_slice.start
+
+        starts = np.flatnonzero(np.r_[True, frame_ids[1:] != frame_ids[:-1]])
+        ends = np.r_[starts[1:], len(frame_ids)]
+        for start, end in zip(starts, ends):
+            record_id, position = positions[int(frame_ids[start])]
+            flat = points[start:end].reshape(-1)[:width]
+            arrays[record_id][position, part_slice.start:part_slice.start + len(flat)] = flat
+
+    return arrays
+
+
+def drop_legacy_rows(db : Session, frame_data_ids):
+    """Delete the frame and landmark rows of row-per-landmark records, keeping the records themselves."""
+    frame_ids = select(models.SingleFrameDetails.id).where(models.SingleFrameDetails.frame_data_id.in_(frame_data_ids))
+    for table, _, _ in landmark_tables:
+        db.execute(delete(table).where(table.frame_id.in_(frame_ids)))
+    db.execute(delete(models.SingleFrameDetails).where(models.SingleFrameDetails.frame_data_id.in_(frame_data_ids)))
+
+
+def add_packed_columns(engine):
+    """Add the packed keypoint and compaction columns to an existing frame_data table if they are missing."""
+    inspector = inspect(engine)
+    if not inspector.has_table(models.FrameData.__tablename__):
+        return
+
+    existing = {column["name"] for column in inspector.get_columns(models.FrameData.__tablename__)}
+    table = models.FrameData.__table__
+    with engine.begin() as conn:
+        for name in packed_columns + ("compacted_at",):
+            if name not in existing:
+                column_type = table.c[name].type.compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {name} {column_type}"))
+
+
+def missing_indexes(engine) -> list:
+    """
+    The model indexes that tables created by an older version lack
+    (create_all only indexes the tables it creates).
+    """
+    inspector = inspect(engine)
+    missing = []
+    for table in models.Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        missing.extend(index for index in table.indexes if index.name not in existing)
+    return missing
+
+
+def add_missing_indexes(engine) -> list:
+    """
+    Create the indexes missing_indexes() reports. On PostgreSQL they are built
+    CONCURRENTLY, so writes carry on meanwhile; a build that fails there
+    leaves an invalid index that must be dropped before running this again.
+    Returns the names of the indexes created.
+    """
+    created = []
+    for index in missing_indexes(engine):
+        if engine.dialect.name == "postgresql":
+            # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+            options = index.dialect_options["postgresql"]
+            options["concurrently"] = True
+            try:
+                with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                    index.create(bind=conn)
+            finally:
+                options["concurrently"] = False
+        else:
+            index.create(bind=engine)
+        created.append(index.name)
+    return created
@@ -0,0 +1,109 @@
+import numpy as np
+from BaseModels import frame_data
+
+
+# Flat keypoint layout shared by the model input, the binary wire format and
+# packed storage: pose (33 x 4) + face (468 x 3) + left hand (21 x 3) + right hand (21 x 3)
+num_keypoints = 33*4 + 468*3 + 21*3 + 21*3
+
+pose_slice = slice(0, 33*4)
+face_slice = slice(pose_slice.stop, pose_slice.stop + 468*3)
+left_hand_slice = slice(face_slice.stop, face_slice.stop + 21*3)
+right_hand_slice = slice(left_hand_slice.stop, left_hand_slice.stop + 21*3)
+
+# Parts in keypoint row order: (name, slice, value names per landmark). The
+# columns of a presence mask follow the same order.
+parts = (
+    ("pose_landmarks", pose_slice, ("x", "y", "z", "visibility")),
+    ("face_landmarks", face_slice, ("x", "y", "z")),
+    ("left_hand_landmarks", left_hand_slice, ("x", "y", "z")),
+    ("right_hand_landmarks", right_hand_slice, ("x", "y", "z")),
+)
+part_slices = tuple(part_slice for _, part_slice, _ in parts)
+
+
+def part_presence(keypoints : np.ndarray) -> np.ndarray:
+    """(frames, 4) mask of the parts detected in each frame, for arrays without one; zero-filled parts count as missing."""
+    presence = np.empty((len(keypoints), len(parts)), dtype=bool)
+    for column, part_slice in enumerate(part_slices):
+        keypoints[:, part_slice].any(axis=1, out=presence[:, column])
+    return presence
+
+
+class KeypointSequence:
+    """
+    The internal form of a landmark sequence: a (frames, num_keypoints)
+    float32 array in extract_keypoints layout, a (frames, 4) mask of the parts
+    detected in each frame (pose, face, left hand, right hand) and, when the
+    client sent them, the frames' capture times.
+
+    Holistic workers and the JSON decoder fill it in place, resampling
+    produces the mask of its output frames, and the rows storage mode only
+    writes landmark rows for the parts the mask marks.
+    """
+
+    __slots__ = ("keypoints", "presence", "timestamps")
+
+    def __init__(self, keypoints : np.ndarray, presence : np.ndarray = None, timestamps=None):
+        self.keypoints = keypoints
+        self.presence = part_presence(keypoints) if presence is None else presence
+        self.timestamps = timestamps
+
+    @classmethod
+    def empty(cls, frames : int):
+        return cls(np.zeros((frames, num_keypoints), dtype=np.float32), np.zeros((frames, len(parts)), dtype=bool))
+
+    def __len__(self):
+        return len(self.keypoints)
+
+    @classmethod
+    def from_frame_data(cls, results : frame_data):
+        """One pass over the request models, straight into a preallocated array."""
+        sequence = cls.empty(len(results.frame_data))
+        for frame, row, presence in zip(results.frame_data, sequence.keypoints, sequence.presence):
+            fill_frame(frame, row, presence)
+
+        timestamps = [frame.timestamp for frame in results.frame_data]
+        if all(timestamp is not None for timestamp in timestamps):
+            sequence.timestamps = timestamps
+        return sequence
+
+
+def fill_frame(frame, row : np.ndarray, presence : np.ndarray):
+    """
+    Write one frame into a zeroed keypoint row and its presence mask row:
+    a single_frame_details model, or a Holistic result, which carries the
+    parts under the same names.
+    """
+    for column, (name, part_slice, value_names) in enumerate(parts):
+        landmarks = getattr(frame, name)
+        if not landmarks:
+            continue
+        # Holistic results wrap the points in a landmark list
+        landmarks = getattr(landmarks, "landmark", landmarks)
+        values = [getattr(landmark, value_name) for landmark in landmarks for value_name in value_names]
+        width = min(len(values), part_slice.stop - part_slice.start)
+        row[part_slice.start:part_slice.start + width] = values[:width]
+        presence[column] = True
+
+
+def _points(part : np.ndarray, names):
+    return [dict(zip(names, values)) for values in part.reshape(-1, len(names)).tolist()]
+
+
+def keypoints_to_frames(keypoints : np.ndarray, presence : np.ndarray = None) -> list:
+    """
+    Turn a (frames, num_keypoints) array into the JSON frame list used by the
+    record endpoints. Without a presence mask, zero-filled parts are treated
+    as not detected, mirroring extract_keypoints.
+    """
+    if presence is None:
+        presence = part_presence(keypoints)
+
+    frames = []
+    for frame_id, (row, present) in enumerate(zip(keypoints, presence.tolist())):
+        frame = {"frame_id": frame_id}
+        for (name, part_slice, value_names), detected in zip(parts, present):
+            frame[name] = _points(row[part_slice], value_names) if detected else []
+        frames.append(frame)
+    return frames
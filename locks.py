@@ -0,0 +1,100 @@
+import hashlib
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import text
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """
+    Exclusive lock on a file, shared by every process (and thread) on this
+    host, held until release() or process exit. acquire() does not wait
+    unless asked to.
+    """
+
+    def __init__(self, path : str):
+        self.path = path
+        self._file = None
+
+    def acquire(self, wait : bool = False) -> bool:
+        if self._file is not None:
+            return False
+        f = open(self.path, "a+")
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                f.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                        break
+                    except OSError:
+                        if not wait:
+                            raise
+                        time.sleep(0.1)
+        except OSError:
+            f.close()
+            return False
+        self._file = f
+        return True
+
+    def release(self):
+        if self._file is None:
+            return
+        f, self._file = self._file, None
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            f.close()
+
+
+def _lock_key(name : str, url : str) -> int:
+    digest = hashlib.sha1(f"{name}:{url}".encode()).digest()
+    return int.from_bytes(digest[:8], "big", signed=True)
+
+
+@contextmanager
+def database_lock(engine, name : str, wait : bool = False):
+    """
+    Yield True to at most one process per database at a time, False to the
+    others, without waiting (with `wait`, the others block until it is free
+    and then get True): a PostgreSQL advisory lock, which covers every host,
+    or otherwise a lock file in the temporary directory of this host.
+    """
+    url = engine.url.render_as_string(hide_password=True)
+    key = _lock_key(name, url)
+
+    if engine.dialect.name == "postgresql":
+        # Autocommit, so the connection holding the lock is not left idle in a transaction
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            if wait:
+                conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": key})
+                acquired = True
+            else:
+                acquired = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": key}).scalar()
+            try:
+                yield bool(acquired)
+            finally:
+                if acquired:
+                    conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+        return
+
+    lock = FileLock(os.path.join(tempfile.gettempdir(), f"slr-{name}-{key & 0xffffffff:08x}.lock"))
+    acquired = lock.acquire(wait)
+    try:
+        yield acquired
+    finally:
+        lock.release()
@@ -1,42 +1,165 @@
-from fastapi import FastAPI, Depends, File, UploadFile, HTTPException, BackgroundTasks
-from starlette.responses import FileResponse
+from fastapi import FastAPI, Depends, File, UploadFile, HTTPException, Request, Query, WebSocket
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+from starlette.responses import FileResponse, StreamingResponse, JSONResponse, Response, PlainTextResponse
 from typing import Annotated
-from datetime import datetime
-import tempfile
+from contextlib import asynccontextmanager
+import asyncio
+import json
 import os
 import time
-from database import engine, SessionLocal
+from datetime import datetime, timedelta
+from database import engine, SessionLocal, landmark_storage_mode
+from async_database import Database, DatabaseSession
 import models
-from sqlalchemy.orm import Session
-from BaseModels import frame_data
-
-from predictions import predict_sign_from_video, process_uploaded_video
+from BaseModels import frame_data, single_frame_details
+import numpy as np
+
+from predictions import predict_sign_from_keypoints, extract_keypoints, extract_video_keypoints, inference_engine, holistic_pool, required_frames, prediction_cache, video_cache, load_model, model_ready, ModelNotReady, prepare_sequence
+from inference_engine import EngineStopped
+from prediction_cache import new_file_hasher
+from landmarks import num_keypoints, KeypointSequence
+from streaming import RecognitionSession, recognition_stride
+from holistic_pool import HolisticPoolBusy
+from landmark_storage import add_packed_columns, missing_indexes
+from persistence import PersistenceWorker, PersistenceQueueFull
+from records import load_page, load_record, delete_record as delete_record_by_id, serialize_record, page_limit
+from wire_format import is_landmark_payload, decode_landmark_payload
+from gating import no_sign
+from uploads import save_chunks_to_temp, upload_file_chunks, UploadTooLarge, max_upload_size, upload_chunk_size
+from jobs import JobStore
+from metrics import CallbackMetric, MetricsPublisher, stage_seconds, request_seconds, errors_total, render as render_metrics, content_type as metrics_content_type
+from dataset_export import export_dataset, read_manifest, manifest_files, export_dir, export_formats, export_shard_size, ExportInProgress
+from profiling import stack_sampler, profiling_enabled, profile_interval_ms, profile_max_duration
+from retention import RetentionWorker
+from locks import database_lock
+from prediction_stats import load_stats
 
 from fastapi.staticfiles import StaticFiles
 
 
-app = FastAPI()
+# Set by gunicorn.conf.py once the parent has created the tables, so the
+# forked workers skip it
+schema_ready_env = "SLR_SCHEMA_READY"
+
+
+def createTable():
+    # Workers that were not preloaded (SERVING_PRELOAD=0) all get here at
+    # once; they take turns, and the later ones find the schema in place
+    with database_lock(engine, "schema", wait=True):
+        models.Base.metadata.create_all(bind=engine)
+        add_packed_columns(engine)
+    # Building them can take long on a large table, so that is left to a one-off command
+    missing = missing_indexes(engine)
+    if missing:
+        print(f"Missing indexes : {', '.join(index.name for index in missing)}; "
+              "create them with python migrate_landmarks.py --create-indexes")
+
+
+def resetTables():
+    models.Base.metadata.drop_all(bind = engine)
+    createTable()
+    
+
+persistence_worker = PersistenceWorker(SessionLocal, landmark_storage_mode)
+
+retention_worker = RetentionWorker(SessionLocal)
+# Shares this worker's metrics with the others under gunicorn (METRICS_DIR)
+metrics_publisher = MetricsPublisher()
+
+# Job state lives in the jobs table, so any worker can answer for any job
+job_store = JobStore(session_factory=SessionLocal)
+
+# Request-path database access; see async_database.py
+database = Database()
+
+
+CallbackMetric("slr_queue_depth", "Items waiting in each work queue", lambda: {
+    ("inference",): inference_engine.queue_depth,
+    ("persistence",): persistence_worker.queue_depth,
+    ("holistic",): holistic_pool.queue_depth,
+}, ("queue",))
+CallbackMetric("slr_persisted_predictions_total", "Predictions written to or dropped by the persistence worker", lambda: {
+    ("saved",): persistence_worker.saved,
+    ("failed",): persistence_worker.failed,
+}, ("result",), type="counter")
+CallbackMetric("slr_cache_events_total", "Prediction and video cache lookups by outcome", lambda: {
+    (name, event): value
+    for name, cache in (("predictions", prediction_cache), ("videos", video_cache))
+    for event, value in cache.stats().items() if event not in ("entries", "inflight")
+}, ("cache", "event"), type="counter")
+CallbackMetric("slr_model_ready", "1 once the model is loaded and warmed up", lambda: int(model_ready()))
+
+
+def log_model_load(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Model loading failed : {task.exception()}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if os.environ.get(schema_ready_env) != "1":
+        createTable()
+    await job_store.expire_stuck()
+    persistence_worker.start()
+    retention_worker.start()
+    metrics_publisher.start()
+    holistic_pool.start()
+
+    # The model loads and warms up in the background: /healthz answers at once,
+    # /readyz and the prediction endpoints only once the model can serve
+    app.state.model_task = asyncio.create_task(asyncio.to_thread(load_model))
+    app.state.model_task.add_done_callback(log_model_load)
+    # A dead or hung Holistic pool is restarted, and fails /readyz until it answers again
+    holistic_monitor = asyncio.create_task(holistic_pool.monitor())
+    try:
+        yield
+    finally:
+        holistic_monitor.cancel()
+        await job_store.shutdown()
+        holistic_pool.stop()
+        inference_engine.stop()
+        persistence_worker.stop()
+        retention_worker.stop()
+        metrics_publisher.stop()
+        await database.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
 
 from fastapi.staticfiles import StaticFiles
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template, not raw path, to keep the series count bounded
+        route = request.scope.get("route")
+        request_seconds.observe(time.perf_counter() - start, request.method, getattr(route, "path", "unmatched"), status)
+        if status >= 500:
+            errors_total.inc("http")
 
-def createTable():
-    models.Base.metadata.create_all(bind=engine)
-    
 
-createTable()
+@app.exception_handler(ModelNotReady)
+@app.exception_handler(EngineStopped)
+async def model_not_ready(request: Request, e: Exception):
+    return JSONResponse(status_code=503, content={"detail": str(e)}, headers={"Retry-After": "5"})
 
-def get_db():
-    db = SessionLocal()
-    try:
+
+async def get_db():
+    # Queries go through `await db.run(fn, ...)` so they never block the event loop
+    async with database.session() as db:
         yield db
-    finally:
-        db.close()
 
-db_dependency = Annotated[Session, Depends(get_db)]
+db_dependency = Annotated[DatabaseSession, Depends(get_db)]
 
 
 @app.get("/")
@@ -51,170 +174,170 @@ def features():
 def about():
     return FileResponse("static\\about.html")
 
-
-def save_data_to_db(db: Session, data: frame_data, prediction : str):
+@app.get("/healthz")
+def healthz():
+    """Liveness: the process is up and serving requests."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+def readyz():
+    """Readiness: the model is loaded and warmed up and the Holistic pool passed its last health check."""
+    health = holistic_pool.last_health
+    if model_ready():
+        if health is not None and not health["healthy"]:
+            return JSONResponse(status_code=503, content={"status": "holistic pool restarting"})
+        return {"status": "ready"}
+
+    task = app.state.model_task
+    if task.done() and not task.cancelled() and task.exception() is not None:
+        status = f"model failed to load : {task.exception()}"
+    else:
+        status = "model loading"
+    return JSONResponse(status_code=503, content={"status": status})
+
+
+async def save_prediction(sequence: KeypointSequence, prediction : str):
     try:
-        start_time = datetime.utcnow()
-        print(f"Saving to db... Started : {start_time}")
-        
-        frame_data_db = models.FrameData(prediction_label = prediction, timestamp = datetime.utcnow())
-
-        for frame in data.frame_data:
-            frame_db = models.SingleFrameDetails(
-                frame_id=frame.frame_id
-            )
-
-            # Add face landmarks
-            frame_db.face_landmarks = [
-                models.FaceLandmark(x=lm.x, y=lm.y, z=lm.z) for lm in frame.face_landmarks
-            ]
-
-            # Add pose landmarks
-            frame_db.pose_landmarks = [
-                models.PoseLandmark(x=lm.x, y=lm.y, z=lm.z, visibility=lm.visibility) for lm in frame.pose_landmarks
-            ]
-
-            # Add left hand landmarks
-            frame_db.left_hand_landmarks = [
-                models.LeftHandLandmark(x=lm.x, y=lm.y, z=lm.z) for lm in frame.left_hand_landmarks
-            ]
-
-            # Add right hand landmarks
-            frame_db.right_hand_landmarks = [
-                models.RightHandLandmark(x=lm.x, y=lm.y, z=lm.z) for lm in frame.right_hand_landmarks
-            ]
-
-            # Add frame to parent
-            frame_data_db.frames.append(frame_db)
-        
-        db.add(frame_data_db)
-        db.commit()
-        db.refresh(frame_data_db)
-
-        end_time = datetime.utcnow()
-        print(f"Saved Data to Database... End Time : {end_time}, Time Taken : {end_time - start_time}")
+        await persistence_worker.submit(sequence, prediction)
+    except PersistenceQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
 
-    except Exception as e:
-        db.rollback()
-        print(f"Error saving data to database in background: {e}")
 
 @app.post("/predict")
-async def predict(db : db_dependency, background_tasks : BackgroundTasks, data : frame_data):
-
-    start_time = datetime.utcnow()
-    print("Data Arrived : ", start_time)
+async def predict(request : Request):
+    """
+    Accepts either the JSON frame_data body or, with an application/x-landmarks
+    content type, the packed float32 format described in wire_format.py.
+    """
+    body = await request.body()
+    try:
+        if is_landmark_payload(request.headers.get("content-type", "")):
+            with stage_seconds.time("parse"):
+                sequence = KeypointSequence(decode_landmark_payload(body))
+        else:
+            with stage_seconds.time("parse"):
+                data = frame_data.model_validate_json(body)
+            with stage_seconds.time("keypoints"):
+                sequence = KeypointSequence.from_frame_data(data)
+
+        # Any number of frames is accepted and resampled to the model's length
+        with stage_seconds.time("resample"):
+            prepared = prepare_sequence(sequence)
+
+        prediction = await predict_sign_from_keypoints(prepared.keypoints, sequence.presence)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Idle windows are not worth keeping
+    if prediction != no_sign:
+        await save_prediction(prepared, prediction)
 
-    prediction = await predict_sign_from_video(data)
+    response = { "prediction" : f"Resnet Model Predicted : {prediction}"}
 
-    curr_time = datetime.utcnow()
-    print("Data Arrived from Prediction : ", curr_time, "\nTime taken for Prediction : ", curr_time - start_time)
+    return response
 
-    background_tasks.add_task(save_data_to_db, db=db, data=data, prediction=prediction)
+async def predict_window(window: np.ndarray):
+    sequence = KeypointSequence(window)
+    return await predict_sign_from_keypoints(prepare_sequence(sequence).keypoints, sequence.presence)
 
-    end_time = datetime.utcnow()
-    print("Data Sending to frontend: ", end_time, "\nTime Taken for Process :", end_time - start_time)
+async def parse_json_frame(text: str) -> np.ndarray:
+    return await extract_keypoints(single_frame_details.model_validate_json(text))
 
-    response = { "prediction" : f"Resnet Model Predicted : {prediction}"}
-    time.sleep(10)
 
-    return response
+@app.websocket("/ws/recognize")
+async def recognize(websocket: WebSocket, stride: int = recognition_stride):
+    """
+    Continuous recognition: send frames one message at a time and receive a
+    prediction over the latest required_frames frames every `stride` frames.
+    """
+    session = RecognitionSession(
+        websocket,
+        predict_fn=predict_window,
+        json_frame_fn=parse_json_frame,
+        length=required_frames,
+        width=num_keypoints,
+        stride=stride,
+    )
+    await session.run()
 
 @app.get("/all_records")
-async def all_records(db : db_dependency):
-    records = db.query(models.FrameData).all()
-    message = []
-    for record in records:
-        id = record.id
-        result = await get_single_record(id, db)
-        message.append(result)
-    return message
+async def all_records(db : db_dependency, cursor : int = 0, limit : int = Query(default=100, ge=1, le=1000), summary : bool = False):
+    """
+    Streams one keyset page of records as NDJSON, one record per line.
+    Pass the X-Next-Cursor response header back as `cursor` to fetch the next
+    page; the header is absent on the last page. `summary=true` skips landmarks;
+    pages with landmarks hold at most RECORDS_MAX_PAGE_WITH_KEYPOINTS records.
+    """
+    limit = page_limit(limit, summary)
+    records, keypoints = await db.run(load_page, cursor, limit, summary)
+
+    headers = {"X-Next-Cursor": str(records[-1].id)} if len(records) == limit else {}
+
+    def lines():
+        for record in records:
+            yield json.dumps(serialize_record(record, keypoints.get(record.id), summary)) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers=headers)
 
 
 async def get_single_record(id, db : db_dependency):
-    record = db.query(models.FrameData).filter(models.FrameData.id == id).first()
-    frames = db.query(models.SingleFrameDetails).filter(models.SingleFrameDetails.frame_data_id == record.id).all() if record else None
-    face_landmarks = [db.query(models.FaceLandmark).filter(models.FaceLandmark.frame_id == frame.id).all() for frame in frames] if frames else None
-    pose_landmarks = [db.query(models.PoseLandmark).filter(models.PoseLandmark.frame_id == frame.id).all() for frame in frames] if frames else None
-    left_hand_landmarks = [db.query(models.LeftHandLandmark).filter(models.LeftHandLandmark.frame_id == frame.id).all() for frame in frames] if frames else None
-    right_hand_landmarks = [db.query(models.RightHandLandmark).filter(models.RightHandLandmark.frame_id == frame.id).all() for frame in frames] if frames else None
-
-    frame_data = []
-    if frames:
-        for i, frame in enumerate(frames):
-            face_landmarks_data = []
-            pose_landmarks_data = []
-            left_hand_landmarks_data = []
-            right_hand_landmarks_data  = []
-
-            # FACE
-            if face_landmarks:
-                for landmark in face_landmarks[i]:  # Get the list of landmarks for this frame
-                    face_landmarks_data.append({
-                        "x": landmark.x,
-                        "y": landmark.y,
-                        "z": landmark.z
-                    })
-
-            # POSE
-            if pose_landmarks:
-                for landmark in pose_landmarks[i]:
-                    pose_landmarks_data.append({
-                        "x": landmark.x,
-                        "y": landmark.y,
-                        "z": landmark.z,
-                        "visibility": landmark.visibility  # Also fix typo: `visilibility` → `visibility`
-                    })
-
-            # LEFT HAND
-            if left_hand_landmarks:
-                for landmark in left_hand_landmarks[i]:
-                    left_hand_landmarks_data.append({
-                        "x": landmark.x,
-                        "y": landmark.y,
-                        "z": landmark.z
-                    })
-
-            # RIGHT HAND
-            if right_hand_landmarks:
-                for landmark in right_hand_landmarks[i]:
-                    right_hand_landmarks_data.append({
-                        "x": landmark.x,
-                        "y": landmark.y,
-                        "z": landmark.z
-                    })
-
-            frame_data.append({
-                "frame_id": frame.frame_id,
-                "face_landmarks": face_landmarks_data,
-                "pose_landmarks": pose_landmarks_data,
-                "left_hand_landmarks": left_hand_landmarks_data,
-                "right_hand_landmarks": right_hand_landmarks_data
-            })
-
-
-    message = {}
-    if record:
-        message = {
-            "id" : record.id,
-            "prediction_label" : record.prediction_label,
-            "timestamp" : record.timestamp,
-            "frames" : frame_data
-        }
-
-    return message if len(message) != 0 else {"message" : f"No record found with id : {id}"}
+    record, keypoints = await db.run(load_record, id)
+    if not record:
+        return {"message" : f"No record found with id : {id}"}
+
+    return await asyncio.to_thread(serialize_record, record, keypoints)
 
 @app.get("/record")
 async def get_record(id: int, db: db_dependency):
-    return get_single_record(id, db)
+    return await get_single_record(id, db)
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus text exposition of the metrics, summed over every server worker when METRICS_DIR is set."""
+    return Response(render_metrics(), media_type=metrics_content_type)
+
+
+def require_profiling():
+    if not profiling_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+@app.post("/debug/profiling/start")
+def start_profiling(interval_ms: float = profile_interval_ms, duration: float = profile_max_duration):
+    """Start the sampling profiler; it stops by itself after `duration` seconds."""
+    require_profiling()
+    stack_sampler.start(interval_ms, duration)
+    return stack_sampler.status()
+
+@app.post("/debug/profiling/stop")
+def stop_profiling():
+    require_profiling()
+    stack_sampler.stop()
+    return stack_sampler.status()
+
+@app.get("/debug/profiling")
+def get_profile():
+    """Collapsed stacks collected so far, ready for flamegraph.pl or speedscope."""
+    require_profiling()
+    return PlainTextResponse(stack_sampler.collapsed(), headers={"X-Profile-Samples": str(stack_sampler.samples)})
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return {"predictions" : prediction_cache.stats(), "videos" : video_cache.stats()}
+
+@app.get("/stats")
+async def stats(db: db_dependency, hours: int = Query(default=24, ge=1, le=24 * 366), label: str = None):
+    """Predictions per label and hour over the last `hours` hours, from the precomputed aggregates."""
+    since = datetime.utcnow() - timedelta(hours=hours)
+    hourly, totals = await db.run(load_stats, since, label)
+    return {"since" : since.isoformat(), "totals" : totals, "hours" : hourly}
 
 @app.get("/delete_record")
 async def delete_record(db: db_dependency, id : int):
     try:
-        query = db.query(models.FrameData).filter(models.FrameData.id == id).first()
-        if not query:
+        if not await db.run(delete_record_by_id, id):
             return {'message' : f"No record found with id : {id}"}
-        db.delete(query)
-        db.commit()
       
         return {"message" : "Record deleted"}
     
@@ -224,19 +347,61 @@ async def delete_record(db: db_dependency, id : int):
 @app.get("/reset")
 async def reset_db(db : db_dependency):
     try:
-        models.Base.metadata.drop_all(bind = engine)
-
-        createTable()
+        await asyncio.to_thread(resetTables)
 
         return {"message" : "Database reset successfully"}
     except Exception as e:
         return {"message" : str(e)}
     
 
+async def predict_uploaded_file(temp_file_path: str, file_hash: str = None) -> dict:
+    """
+    Run a saved upload through Holistic, the model and persistence.
+    The temporary file is handed over to extract_video_keypoints(), which
+    removes it once the Holistic pool is done with it.
+    """
+    # Sample frames and extract landmarks in the Holistic worker pool
+    try:
+        sequence = await extract_video_keypoints(temp_file_path, file_hash, remove=True)
+    except HolisticPoolBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    with stage_seconds.time("resample"):
+        prepared = prepare_sequence(sequence)
+
+    # Make prediction
+    prediction = await predict_sign_from_keypoints(prepared.keypoints, sequence.presence)
+    
+    if not prediction:
+        raise HTTPException(status_code=500, detail="Prediction failed.")
+    
+    # Queue for the persistence worker
+    if prediction != no_sign:
+        await save_prediction(prepared, prediction)
+
+    return {"prediction": f"Model Predicted : {prediction}"}
+
+
+def upload_suffix(filename) -> str:
+    return os.path.splitext(filename or "")[1]
+
+
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    # Refuse declared oversized bodies before the multipart parser spools them
+    if request.method == "POST" and request.url.path in ("/predict-video", "/jobs/predict-video"):
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > max_upload_size + upload_chunk_size:
+            return JSONResponse(status_code=413, content={"detail": f"File too large. Maximum size is {max_upload_size // (1024 * 1024)}MB."})
+    return await call_next(request)
+
+
     # Endpoint to handle video file uploads for sign language prediction.
 
 @app.post("/predict-video")
-async def predict_video_upload(db: db_dependency, video: UploadFile = File(...)):
+async def predict_video_upload(video: UploadFile = File(...)):
     """
     Endpoint to handle video file uploads for sign language prediction.
     Processes the video file and returns prediction results.
@@ -246,77 +411,127 @@ async def predict_video_upload(db: db_dependency, video: UploadFile = File(...))
         if not video.content_type.startswith('video/'): # type: ignore
             raise HTTPException(status_code=400, detail="Invalid file type. Please upload a video file.")
         
-        # Validate file size (50MB limit)
-        max_size = 50 * 1024 * 1024  # 50MB
-        contents = await video.read()
-        if len(contents) > max_size:
-            raise HTTPException(status_code=400, detail="File too large. Maximum size is 50MB.")
-        
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(video.filename)[1]) as temp_file: # type: ignore
-            temp_file.write(contents)
-            temp_file_path = temp_file.name
-        
+        # Copy to a temporary file in chunks, aborting once the size limit is crossed
+        hasher = new_file_hasher()
         try:
-            # Process video and extract frame data
-            video_frame_data = await process_uploaded_video(temp_file_path)
-            
-            if not video_frame_data or not video_frame_data.frame_data:
-                raise HTTPException(status_code=400, detail="Could not extract valid frames from video.")
-            
-            # Make prediction
-            prediction = await predict_sign_from_video(video_frame_data)
-            
-            if not prediction:
-                raise HTTPException(status_code=500, detail="Prediction failed.")
-            
-            # Save to database
-            frame_data_db = models.FrameData(
-                prediction_label=prediction, 
-                timestamp=datetime.utcnow()
-            )
-
-            for frame in video_frame_data.frame_data:
-                frame_db = models.SingleFrameDetails(
-                    frame_id=frame.frame_id
-                )
-
-                # Add face landmarks
-                frame_db.face_landmarks = [
-                    models.FaceLandmark(x=lm.x, y=lm.y, z=lm.z) for lm in frame.face_landmarks
-                ]
-
-                # Add pose landmarks
-                frame_db.pose_landmarks = [
-                    models.PoseLandmark(x=lm.x, y=lm.y, z=lm.z, visibility=lm.visibility) for lm in frame.pose_landmarks
-                ]
-
-                # Add left hand landmarks
-                frame_db.left_hand_landmarks = [
-                    models.LeftHandLandmark(x=lm.x, y=lm.y, z=lm.z) for lm in frame.left_hand_landmarks
-                ]
-
-                # Add right hand landmarks
-                frame_db.right_hand_landmarks = [
-                    models.RightHandLandmark(x=lm.x, y=lm.y, z=lm.z) for lm in frame.right_hand_landmarks
-                ]
-
-                # Add frame to parent
-                frame_data_db.frames.append(frame_db)
-            
-            db.add(frame_data_db)
-            db.commit()
-            db.refresh(frame_data_db)
-
-            response = {"prediction": f"Model Predicted : {prediction}"}
-            return response
-            
-        finally:
-            # Clean up temporary file
-            if os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
+            temp_file_path = await save_chunks_to_temp(upload_file_chunks(video), suffix=upload_suffix(video.filename), hasher=hasher)
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        
+        return await predict_uploaded_file(temp_file_path, hasher.hexdigest())
                 
-    except HTTPException:
+    except (HTTPException, ModelNotReady, EngineStopped):
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+def job_error(e: Exception):
+    if isinstance(e, HTTPException):
+        return e.status_code, e.detail
+    if isinstance(e, (ModelNotReady, EngineStopped)):
+        return 503, str(e)
+    if isinstance(e, ExportInProgress):
+        return 409, str(e)
+    if isinstance(e, ValueError):
+        return 400, str(e)
+    return 500, f"Internal server error: {str(e)}"
+
+
+@app.post("/jobs/predict-video", status_code=202)
+async def submit_video_job(request: Request, filename: str = ""):
+    """
+    Asynchronous video prediction. The raw video is the request body (with a
+    video/* content type) and is streamed straight to disk. Returns a job id
+    immediately; poll GET /jobs/{job_id} or follow GET /jobs/{job_id}/events.
+    """
+    if not request.headers.get("content-type", "").startswith("video/"):
+        raise HTTPException(status_code=400, detail="Invalid file type. Please upload a video file.")
+
+    hasher = new_file_hasher()
+    try:
+        temp_file_path = await save_chunks_to_temp(request.stream(), suffix=upload_suffix(filename), hasher=hasher)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    file_hash = hasher.hexdigest()
+    try:
+        job = await job_store.submit(lambda: predict_uploaded_file(temp_file_path, file_hash), on_error=job_error)
+    except RuntimeError as e:
+        os.unlink(temp_file_path)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}",
+        "events_url": f"/jobs/{job.id}/events",
+    }
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No job found with id : {job_id}")
+    return job.to_dict()
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request):
+    """Server-sent events: one `status` event per job state change, ending when the job finishes."""
+    job = await job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No job found with id : {job_id}")
+
+    async def events():
+        while True:
+            version = job.version
+            yield f"event: status\ndata: {json.dumps(job.to_dict())}\n\n"
+            if job.finished:
+                return
+            while not await job_store.wait_for_change(job, version, timeout=15):
+                if await request.is_disconnected():
+                    return
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.post("/export", status_code=202)
+async def start_export(format: str = "npy", shard_size: int = Query(default=export_shard_size, ge=1), full: bool = False):
+    """
+    Export records stored since the last export's watermark to shards in
+    EXPORT_DIR, as a job. Follow it like a video job; the finished job's
+    result lists the new shards, which GET /export/files/{name} serves.
+    """
+    if format not in export_formats:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(export_formats)}")
+
+    try:
+        job = await job_store.submit(
+            lambda: asyncio.to_thread(export_dataset, SessionLocal, export_dir, format, shard_size, full=full),
+            on_error=job_error,
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}",
+        "events_url": f"/jobs/{job.id}/events",
+    }
+
+
+@app.get("/export/manifest")
+async def export_manifest():
+    return read_manifest(export_dir)
+
+
+@app.get("/export/files/{file_name}")
+async def export_file(file_name: str):
+    # Only files listed in the manifest are served, never arbitrary paths
+    if file_name not in manifest_files(read_manifest(export_dir)):
+        raise HTTPException(status_code=404, detail=f"No export file named : {file_name}")
+    return FileResponse(os.path.join(export_dir, file_name), media_type="application/octet-stream", filename=file_name)
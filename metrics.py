@@ -0,0 +1,368 @@
+"""
+Prometheus metrics without the client library.
+
+Each process keeps its own values. When several server workers run (see
+gunicorn.conf.py), METRICS_DIR names a directory they share: every worker
+publishes its values there every METRICS_PUBLISH_INTERVAL seconds, and
+/metrics on any of them adds up the files, so one scrape target covers the
+whole server. Counters and histograms are summed, those of exited workers
+included so they never go backwards; gauges are reported per live worker
+under a "worker" label.
+"""
+import bisect
+import json
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+
+from locks import FileLock
+
+
+# Seconds; spans a sub-millisecond parse up to a multi-second video upload
+default_buckets = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Empty: /metrics reports this process only
+metrics_dir = os.environ.get("METRICS_DIR", "")
+metrics_publish_interval = float(os.environ.get("METRICS_PUBLISH_INTERVAL", "5"))
+
+# Values of the workers that have exited, folded together
+dead_file_name = "_exited.json"
+fold_lock_name = ".fold.lock"
+
+_registry = []
+
+
+def _format_labels(labelnames, values, extra : str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value : float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name : str, documentation : str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels) -> tuple:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labels}")
+        return tuple(str(value) for value in labels)
+
+    def header(self) -> list:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+
+    def snapshot(self) -> dict:
+        """{label values tuple: value} of this process."""
+        raise NotImplementedError
+
+    @staticmethod
+    def merge(values : dict, other : dict):
+        """Add the values of another process into `values`."""
+        for key, value in other.items():
+            values[key] = values.get(key, 0) + value
+
+    def samples(self, values : dict = None) -> list:
+        """Sample lines for `values`, by default this process's snapshot."""
+        values = self.snapshot() if values is None else values
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in sorted(values.items())]
+
+
+class Counter(Metric):
+    """Monotonic counter. Label values are passed positionally, in labelnames order."""
+
+    type = "counter"
+
+    def __init__(self, name : str, documentation : str, labelnames=(), initial_labels=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+        # Pre-create known label sets so they are exported as 0 before the first event
+        for labels in initial_labels:
+            self._values[self._key(labels)] = 0
+        if not self.labelnames:
+            self._values[()] = 0
+
+    def inc(self, *labels, amount : float = 1):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._values)
+
+
+class Histogram(Metric):
+    """Cumulative-bucket histogram, as Prometheus expects it."""
+
+    type = "histogram"
+
+    def __init__(self, name : str, documentation : str, labelnames=(), buckets=default_buckets):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+
+    def observe(self, value : float, *labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {key: [list(counts), total, count] for key, (counts, total, count) in self._values.items()}
+
+    @staticmethod
+    def merge(values : dict, other : dict):
+        for key, (counts, total, count) in other.items():
+            entry = values.get(key)
+            if entry is None:
+                values[key] = [list(counts), total, count]
+            else:
+                entry[0] = [a + b for a, b in zip(entry[0], counts)]
+                entry[1] += total
+                entry[2] += count
+
+    def samples(self, values : dict = None) -> list:
+        values = self.snapshot() if values is None else values
+        lines = []
+        for key, (counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class CallbackMetric(Metric):
+    """
+    Gauge (or counter) read at scrape time from state kept elsewhere, like a
+    queue depth. `fn` returns a number, or for labelled metrics a dict of
+    {label values tuple: number}.
+    """
+
+    def __init__(self, name : str, documentation : str, fn, labelnames=(), type : str = "gauge"):
+        super().__init__(name, documentation, labelnames)
+        self.fn = fn
+        self.type = type
+
+    def snapshot(self) -> dict:
+        try:
+            value = self.fn()
+        except Exception:
+            return {}
+        if not self.labelnames:
+            return {(): value}
+        return {tuple(str(label) for label in key): item for key, item in value.items()}
+
+
+# Files hold {"pid": ..., "metrics": {metric name: [[label values, value], ...]}}
+def _read_snapshot(path : str) -> dict:
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    data["metrics"] = {name: {tuple(key): value for key, value in items} for name, items in data["metrics"].items()}
+    return data
+
+
+def _write_snapshot(path : str, data : dict):
+    data = {**data, "metrics": {name: [[list(key), value] for key, value in values.items()] for name, values in data["metrics"].items()}}
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(data, f)
+    os.replace(f"{path}.tmp", path)
+
+
+def _pid_alive(pid : int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+# Unique per process rather than just the pid, which the OS reuses; a forked
+# worker makes its own on first use
+_process_file = (None, None)
+_publish_lock = threading.Lock()
+
+
+def publish(directory : str = None):
+    """Write this process's values to the shared directory."""
+    global _process_file
+    directory = directory or metrics_dir
+    if not directory:
+        return
+    with _publish_lock:
+        pid = os.getpid()
+        if _process_file[0] != pid:
+            _process_file = (pid, f"{pid}-{secrets.token_hex(4)}.json")
+        _write_snapshot(os.path.join(directory, _process_file[1]),
+                        {"pid": pid, "metrics": {metric.name: metric.snapshot() for metric in _registry}})
+
+
+def collect(directory : str) -> tuple:
+    """
+    Sum the published values in `directory`: returns ({metric name: values}
+    of the summed metrics, {metric name: {pid: values}} of the gauges of live
+    workers). Files of exited workers are folded into one on the way.
+    """
+    metrics = {metric.name: metric for metric in _registry}
+    totals = {}
+    gauges = {}
+
+    def add(name, values):
+        metric = metrics.get(name)
+        if metric is not None:
+            metric.merge(totals.setdefault(name, {}), values)
+
+    lock = FileLock(os.path.join(directory, fold_lock_name))
+    lock.acquire(wait=True)
+    try:
+        dead_path = os.path.join(directory, dead_file_name)
+        exited = _read_snapshot(dead_path) or {"metrics": {}}
+        folded = []
+        for file_name in sorted(os.listdir(directory)):
+            if not file_name.endswith(".json") or file_name == dead_file_name:
+                continue
+            path = os.path.join(directory, file_name)
+            data = _read_snapshot(path)
+            if data is None:
+                continue
+            live = data["pid"] == os.getpid() or _pid_alive(data["pid"])
+            for name, values in data["metrics"].items():
+                metric = metrics.get(name)
+                if metric is None:
+                    continue
+                if metric.type == "gauge":
+                    if live:
+                        gauges.setdefault(name, {})[data["pid"]] = values
+                elif live:
+                    add(name, values)
+                else:
+                    metric.merge(exited["metrics"].setdefault(name, {}), values)
+            if not live:
+                folded.append(path)
+
+        if folded:
+            _write_snapshot(dead_path, exited)
+            for path in folded:
+                os.remove(path)
+    finally:
+        lock.release()
+
+    for name, values in exited["metrics"].items():
+        add(name, values)
+    return totals, gauges
+
+
+def render() -> str:
+    """
+    Every registered metric in the Prometheus text exposition format, summed
+    over the server's workers when METRICS_DIR is set.
+    """
+    if metrics_dir:
+        publish()
+        totals, gauges = collect(metrics_dir)
+
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.header())
+        if not metrics_dir:
+            lines.extend(metric.samples())
+        elif metric.type == "gauge":
+            labelnames = metric.labelnames + ("worker",)
+            for pid, values in sorted(gauges.get(metric.name, {}).items()):
+                lines.extend(
+                    f"{metric.name}{_format_labels(labelnames, key + (pid,))} {_format_value(value)}"
+                    for key, value in sorted(values.items())
+                )
+        else:
+            lines.extend(metric.samples(totals.get(metric.name, {})))
+    return "\n".join(lines) + "\n"
+
+
+class MetricsPublisher:
+    """Publishes this worker's values to METRICS_DIR every `interval` seconds on a background thread."""
+
+    def __init__(self, directory : str = metrics_dir, interval : float = metrics_publish_interval):
+        self.directory = directory
+        self.interval = max(0.5, interval)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if not self.directory or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-publisher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout : float = 5.0):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=timeout)
+        self._thread = None
+        # Final values, folded in once this process has exited
+        self._publish()
+
+    def _publish(self):
+        try:
+            publish(self.directory)
+        except OSError as e:
+            print(f"Error publishing metrics : {e}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._publish()
+            self._stop.wait(self.interval)
+
+
+content_type = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ---- application metrics -------------------------------------------------
+
+# parse, keypoints, resample, inference, holistic_frame, video_decode, db_write
+stage_seconds = Histogram("slr_stage_seconds", "Time spent per pipeline stage", ("stage",))
+request_seconds = Histogram("slr_http_request_seconds", "HTTP request latency by route", ("method", "route", "status"))
+inference_batch_size = Histogram("slr_inference_batch_size", "Sequences per model call",
+                                 buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+errors_total = Counter("slr_errors_total", "Errors by pipeline stage", ("stage",))
@@ -0,0 +1,95 @@
+"""
+Convert row-per-landmark records into packed keypoint blobs.
+
+    python migrate_landmarks.py [--batch-size 100] [--drop-rows] [--dry-run]
+    python migrate_landmarks.py --create-indexes
+
+Records are processed in id order, one transaction per batch, so the tool can
+be stopped and re-run at any point. With --drop-rows the legacy frame and
+landmark rows of each converted record are deleted in the same transaction.
+
+--create-indexes only builds the indexes that tables created by an older
+version lack (concurrently on PostgreSQL, so the server can keep running).
+"""
+import argparse
+from datetime import datetime
+
+from sqlalchemy import select, update
+
+import models
+from database import engine, SessionLocal
+from landmark_storage import add_packed_columns, add_missing_indexes, load_row_keypoints, pack_keypoints, drop_legacy_rows
+
+
+def pending_ids(db, after_id : int, batch_size : int):
+    return db.execute(
+        select(models.FrameData.id)
+        .where(models.FrameData.keypoints.is_(None), models.FrameData.compacted_at.is_(None), models.FrameData.id > after_id)
+        .order_by(models.FrameData.id)
+        .limit(batch_size)
+    ).scalars().all()
+
+
+def migrate(batch_size : int = 100, drop_rows : bool = False, dry_run : bool = False):
+    models.Base.metadata.create_all(bind=engine)
+    add_packed_columns(engine)
+
+    start_time = datetime.utcnow()
+    converted = 0
+    skipped = 0
+    last_id = 0
+
+    while True:
+        with SessionLocal() as db:
+            ids = pending_ids(db, last_id, batch_size)
+            if not ids:
+                break
+            last_id = ids[-1]
+
+            arrays = load_row_keypoints(db, ids)
+            skipped += len(ids) - len(arrays)
+
+            for record_id, keypoints in arrays.items():
+                db.execute(
+                    update(models.FrameData)
+                    .where(models.FrameData.id == record_id)
+                    .values(**pack_keypoints(keypoints))
+                )
+
+            if drop_rows and arrays:
+                drop_legacy_rows(db, list(arrays))
+
+            if dry_run:
+                db.rollback()
+            else:
+                db.commit()
+
+            converted += len(arrays)
+            print(f"Migrated up to id {last_id} : {converted} converted, {skipped} without frames")
+
+    print(f"Migration finished : {converted} records converted, {skipped} skipped, time taken : {datetime.utcnow() - start_time}")
+    return converted
+
+
+def create_indexes():
+    models.Base.metadata.create_all(bind=engine)
+    add_packed_columns(engine)
+
+    start_time = datetime.utcnow()
+    created = add_missing_indexes(engine)
+    print(f"Indexes created : {', '.join(created) or 'none missing'}, time taken : {datetime.utcnow() - start_time}")
+    return created
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert row-per-landmark records into packed keypoint blobs.")
+    parser.add_argument("--batch-size", type=int, default=100, help="Records converted per transaction")
+    parser.add_argument("--drop-rows", action="store_true", help="Delete the legacy landmark rows after conversion")
+    parser.add_argument("--dry-run", action="store_true", help="Roll back every batch instead of committing")
+    parser.add_argument("--create-indexes", action="store_true", help="Only create the indexes missing from older tables")
+    args = parser.parse_args()
+
+    if args.create_indexes:
+        create_indexes()
+    else:
+        migrate(batch_size=args.batch_size, drop_rows=args.drop_rows, dry_run=args.dry_run)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey, DateTime, LargeBinary
 from datetime import datetime
 from sqlalchemy.orm import relationship
 from database import Base
@@ -6,17 +6,47 @@ from database import Base
 class FrameData(Base):
     __tablename__ = "frame_data"
     id = Column(Integer, primary_key=True)
-    prediction_label = Column(String, nullable=False)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    prediction_label = Column(String, nullable=False, index=True)
+    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
+
+    # Packed storage: the whole (frames, num_keypoints) sequence as one blob,
+    # with its dtype/shape header. NULL for records stored one row per landmark.
+    keypoints = Column(LargeBinary, nullable=True)
+    keypoints_dtype = Column(String, nullable=True)
+    keypoints_shape = Column(String, nullable=True)
+    # Set when retention removed the landmarks, keeping the label and timestamp
+    compacted_at = Column(DateTime, nullable=True)
 
     frames = relationship("SingleFrameDetails", back_populates="frame_data", cascade="all, delete-orphan")
 
 
+class PredictionHourlyStats(Base):
+    """Predictions per label and hour, kept up to date as predictions are stored."""
+    __tablename__ = "prediction_hourly_stats"
+    prediction_label = Column(String, primary_key=True)
+    hour = Column(DateTime, primary_key=True, index=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class JobRecord(Base):
+    """State of a background job, shared by every server process (see jobs.py)."""
+    __tablename__ = "jobs"
+    id = Column(String, primary_key=True)
+    status = Column(String, nullable=False)
+    # JSON
+    result = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
+    status_code = Column(Integer, nullable=True)
+    version = Column(Integer, nullable=False, default=0)
+    created_at = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False, index=True)
+
+
 class SingleFrameDetails(Base):
     __tablename__ = "single_frame_details"
     id = Column(Integer, primary_key=True)
     frame_id = Column(Integer, nullable=False)
-    frame_data_id = Column(Integer, ForeignKey("frame_data.id"), nullable=False)
+    frame_data_id = Column(Integer, ForeignKey("frame_data.id"), nullable=False, index=True)
 
     frame_data = relationship("FrameData", back_populates="frames")
     face_landmarks = relationship("FaceLandmark", back_populates="frame", cascade="all, delete-orphan")
@@ -31,7 +61,7 @@ class FaceLandmark(Base):
     x = Column(Float)
     y = Column(Float)
     z = Column(Float)
-    frame_id = Column(Integer, ForeignKey("single_frame_details.id"))
+    frame_id = Column(Integer, ForeignKey("single_frame_details.id"), index=True)
     frame = relationship("SingleFrameDetails", back_populates="face_landmarks")
 
 
@@ -42,7 +72,7 @@ class PoseLandmark(Base):
     y = Column(Float)
     z = Column(Float)
     visibility = Column(Float)
-    frame_id = Column(Integer, ForeignKey("single_frame_details.id"))
+    frame_id = Column(Integer, ForeignKey("single_frame_details.id"), index=True)
     frame = relationship("SingleFrameDetails", back_populates="pose_landmarks")
 
 
@@ -52,7 +82,7 @@ class LeftHandLandmark(Base):
     x = Column(Float)
     y = Column(Float)
     z = Column(Float)
-    frame_id = Column(Integer, ForeignKey("single_frame_details.id"))
+    frame_id = Column(Integer, ForeignKey("single_frame_details.id"), index=True)
     frame = relationship("SingleFrameDetails", back_populates="left_hand_landmarks")
 
 
@@ -62,6 +92,6 @@ class RightHandLandmark(Base):
     x = Column(Float)
     y = Column(Float)
     z = Column(Float)
-    frame_id = Column(Integer, ForeignKey("single_frame_details.id"))
+    frame_id = Column(Integer, ForeignKey("single_frame_details.id"), index=True)
     frame = relationship("SingleFrameDetails", back_populates="right_hand_landmarks")
 
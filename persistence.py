@@ -0,0 +1,203 @@
+import asyncio
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+import models
+from landmark_storage import pack_keypoints, landmark_tables
+from landmarks import KeypointSequence
+from prediction_stats import increment_hourly_stats
+from metrics import stage_seconds, errors_total
+
+
+persistence_queue_size = int(os.environ.get("PERSISTENCE_QUEUE_SIZE", "1000"))
+persistence_batch_size = int(os.environ.get("PERSISTENCE_BATCH_SIZE", "200"))
+persistence_flush_interval = float(os.environ.get("PERSISTENCE_FLUSH_INTERVAL", "0.5"))
+persistence_enqueue_timeout = float(os.environ.get("PERSISTENCE_ENQUEUE_TIMEOUT", "2"))
+
+
+class PersistenceQueueFull(Exception):
+    pass
+
+
+def _landmark_values(sequence : KeypointSequence, frame_row_ids):
+    """Per-table parameter lists for the landmark rows of one sequence, for the parts its mask marks present."""
+    values = {table: [] for table, _, _ in landmark_tables}
+    # landmark_tables follows the part order of the presence mask
+    for row, presence, frame_row_id in zip(sequence.keypoints, sequence.presence.tolist(), frame_row_ids):
+        for (table, part_slice, columns), present in zip(landmark_tables, presence):
+            if not present:
+                continue
+            for point in row[part_slice].reshape(-1, len(columns)).tolist():
+                params = dict(zip(columns, point))
+                params["frame_id"] = frame_row_id
+                values[table].append(params)
+    return values
+
+
+def save_data_to_db(db : Session, items, storage_mode : str):
+    """
+    Write a batch of (KeypointSequence, prediction, timestamp) items in one
+    transaction using Core executemany inserts instead of ORM objects. The
+    hourly aggregates are updated in the same transaction.
+    """
+    if not items:
+        return
+
+    increment_hourly_stats(db, [(prediction, timestamp) for _, prediction, timestamp in items])
+
+    if storage_mode == "packed":
+        db.execute(insert(models.FrameData), [
+            {"prediction_label": prediction, "timestamp": timestamp, **pack_keypoints(sequence.keypoints)}
+            for sequence, prediction, timestamp in items
+        ])
+        db.commit()
+        return
+
+    record_ids = db.execute(
+        insert(models.FrameData).returning(models.FrameData.id, sort_by_parameter_order=True),
+        [{"prediction_label": prediction, "timestamp": timestamp} for _, prediction, timestamp in items]
+    ).scalars().all()
+
+    frame_params = [
+        {"frame_data_id": record_id, "frame_id": frame_id}
+        for (sequence, _, _), record_id in zip(items, record_ids)
+        for frame_id in range(len(sequence))
+    ]
+    frame_row_ids = db.execute(
+        insert(models.SingleFrameDetails).returning(models.SingleFrameDetails.id, sort_by_parameter_order=True),
+        frame_params
+    ).scalars().all()
+
+    landmark_params = {table: [] for table, _, _ in landmark_tables}
+    offset = 0
+    for sequence, _, _ in items:
+        for table, values in _landmark_values(sequence, frame_row_ids[offset:offset + len(sequence)]).items():
+            landmark_params[table].extend(values)
+        offset += len(sequence)
+
+    for table, params in landmark_params.items():
+        if params:
+            db.execute(insert(table), params)
+
+    db.commit()
+
+
+class PersistenceWorker:
+    """
+    Owns its own database sessions and drains a bounded queue of predictions,
+    writing up to `batch_size` of them per transaction at least every
+    `flush_interval` seconds. A full queue pushes back on the request path.
+    """
+
+    def __init__(self, session_factory, storage_mode : str, queue_size : int = persistence_queue_size,
+                 batch_size : int = persistence_batch_size, flush_interval : float = persistence_flush_interval,
+                 enqueue_timeout : float = persistence_enqueue_timeout):
+        self.session_factory = session_factory
+        self.storage_mode = storage_mode
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0.0, flush_interval)
+        self.enqueue_timeout = enqueue_timeout
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._thread = None
+        self._lock = threading.Lock()
+        self.saved = 0
+        self.failed = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="persistence-worker", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout : float = 30.0):
+        """Flush everything already queued, then stop the worker."""
+        with self._lock:
+            if self._thread is None:
+                return
+            thread, self._thread = self._thread, None
+        self._queue.put(None)
+        thread.join(timeout=timeout)
+
+    async def submit(self, sequence : KeypointSequence, prediction : str):
+        item = (sequence, prediction, datetime.utcnow())
+        self.start()
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            try:
+                await asyncio.to_thread(self._queue.put, item, True, self.enqueue_timeout)
+            except queue.Full:
+                raise PersistenceQueueFull(f"Persistence queue is full ({self._queue.maxsize} pending)")
+
+    def _run(self):
+        running = True
+        while running:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    running = False
+                    break
+                batch.append(item)
+
+            self._write(batch)
+
+    def _save(self, batch):
+        """Write `batch` in one transaction; returns the error, or None once it is committed."""
+        with self.session_factory() as db:
+            try:
+                save_data_to_db(db, batch, self.storage_mode)
+                return None
+            except Exception as e:
+                db.rollback()
+                return e
+
+    def _write(self, batch):
+        """
+        Write a batch, retrying it once, since most failures (a dropped
+        connection, a deadlock) are transient. If it fails again, the items
+        are written one at a time, so a single bad record only loses itself.
+        """
+        start = time.perf_counter()
+        error = self._save(batch)
+        if error is not None:
+            errors_total.inc("db_write")
+            print(f"Error saving {len(batch)} predictions to database, retrying : {error}")
+            error = self._save(batch)
+        if error is None:
+            self.saved += len(batch)
+            stage_seconds.observe(time.perf_counter() - start, "db_write")
+            return
+
+        errors_total.inc("db_write")
+        print(f"Error saving {len(batch)} predictions to database again, saving them one at a time : {error}")
+        for item in batch:
+            error = self._save([item])
+            if error is None:
+                self.saved += 1
+            else:
+                self.failed += 1
+                errors_total.inc("db_write")
+                print(f"Error saving a {item[1]} prediction to database : {error}")
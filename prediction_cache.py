@@ -0,0 +1,222 @@
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from landmarks import KeypointSequence
+
+
+prediction_cache_size = int(os.environ.get("PREDICTION_CACHE_SIZE", "1024"))
+video_cache_size = int(os.environ.get("VIDEO_CACHE_SIZE", "128"))
+cache_ttl = float(os.environ.get("CACHE_TTL_SECONDS", "3600"))
+# Directory for the optional on-disk store; empty disables it
+cache_dir = os.environ.get("CACHE_DIR", "")
+disk_cache_size = int(os.environ.get("DISK_CACHE_SIZE", "10000"))
+
+disk_suffixes = (".txt", ".npy", ".npz")
+
+
+def keypoints_key(keypoints : np.ndarray) -> str:
+    """Content hash of a keypoint tensor, including its shape and dtype."""
+    keypoints = np.ascontiguousarray(keypoints)
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"{keypoints.dtype.str}{keypoints.shape}".encode())
+    digest.update(keypoints.data)
+    return digest.hexdigest()
+
+
+def new_file_hasher():
+    return hashlib.blake2b(digest_size=20)
+
+
+class PredictionCache:
+    """
+    Bounded LRU cache with a TTL, keyed by content hash, optionally backed by
+    a directory that survives restarts and is shared by every process on the
+    host. Only labels (str, kept as .txt), arrays (.npy) and keypoint
+    sequences (.npz of the keypoints and mask) are written to the directory,
+    and arrays are loaded without pickle.
+
+    get_or_compute() also coalesces concurrent misses: while a key is being
+    computed, further requests for it wait for that computation instead of
+    starting their own. The computation runs as its own task, so a caller
+    that is cancelled stops waiting without cancelling it for the others.
+    """
+
+    def __init__(self, name : str, max_entries : int, ttl : float = cache_ttl, directory : str = cache_dir,
+                 disk_max_entries : int = disk_cache_size):
+        self.name = name
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.directory = os.path.join(directory, name) if directory else None
+        self.disk_max_entries = disk_max_entries
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._disk_writes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def get(self, key : str):
+        """(True, value) for a live in-memory entry, (False, None) otherwise."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            return False, None
+
+        self._entries.move_to_end(key)
+        return True, value
+
+    def put(self, key : str, value, ttl : float = None):
+        self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _disk_path(self, key : str, suffix : str) -> str:
+        return os.path.join(self.directory, f"{key}{suffix}")
+
+    def _disk_get(self, key : str):
+        for suffix in disk_suffixes:
+            path = self._disk_path(key, suffix)
+            try:
+                remaining = os.stat(path).st_mtime + self.ttl - time.time()
+                if remaining <= 0:
+                    os.unlink(path)
+                    continue
+                if suffix == ".txt":
+                    with open(path, encoding="utf-8") as f:
+                        value = f.read()
+                elif suffix == ".npz":
+                    with np.load(path, allow_pickle=False) as arrays:
+                        value = KeypointSequence(arrays["keypoints"], arrays["presence"])
+                    value.keypoints.setflags(write=False)
+                    value.presence.setflags(write=False)
+                else:
+                    value = np.load(path, allow_pickle=False)
+                    value.setflags(write=False)
+            except (OSError, ValueError, KeyError):
+                continue
+            return True, value, remaining
+        return False, None, 0
+
+    def _disk_put(self, key : str, value):
+        if isinstance(value, str):
+            path = self._disk_path(key, ".txt")
+        elif isinstance(value, np.ndarray):
+            path = self._disk_path(key, ".npy")
+        elif isinstance(value, KeypointSequence):
+            path = self._disk_path(key, ".npz")
+        else:
+            return
+
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                if isinstance(value, str):
+                    f.write(value.encode("utf-8"))
+                elif isinstance(value, KeypointSequence):
+                    np.savez(f, keypoints=value.keypoints, presence=value.presence)
+                else:
+                    np.save(f, value, allow_pickle=False)
+            os.replace(temp_path, path)
+        except (OSError, ValueError) as e:
+            print(f"Cache {self.name} : could not write {path} : {e}")
+            return
+
+        self._disk_writes += 1
+        if self._disk_writes % 100 == 0:
+            self._disk_prune()
+
+    def _disk_prune(self):
+        """Drop the oldest files once the directory holds more than disk_max_entries."""
+        try:
+            entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith(disk_suffixes)]
+        except OSError:
+            return
+        if len(entries) <= self.disk_max_entries:
+            return
+
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.disk_max_entries]:
+            try:
+                os.unlink(entry.path)
+            except OSError:
+                pass
+
+    async def _load(self, key : str, compute):
+        if self.directory:
+            found, value, remaining = await asyncio.to_thread(self._disk_get, key)
+            if found:
+                self.disk_hits += 1
+                self.put(key, value, ttl=remaining)
+                return value
+
+        self.misses += 1
+        value = await compute()
+        self.put(key, value)
+        if self.directory:
+            # Written in the background; the waiters don't need the file
+            asyncio.get_running_loop().run_in_executor(None, self._disk_put, key, value)
+        return value
+
+    def _finished(self, key : str, task : asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Retrieved here too, so asyncio does not warn when every caller has gone
+        if not task.cancelled():
+            task.exception()
+
+    async def get_or_compute(self, key : str, compute, release=None):
+        """
+        Return the cached value for `key`, or await `compute()` once and cache
+        its result. `release()`, when given, is called once `compute` is no
+        longer needed: at once when it will not run, or when the computation
+        it started finishes, even if this caller stopped waiting for it.
+        """
+        found, value = self.get(key)
+        if found:
+            self.hits += 1
+            if release is not None:
+                release()
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            if release is not None:
+                release()
+        else:
+            task = asyncio.ensure_future(self._load(key, compute))
+            self._inflight[key] = task
+            task.add_done_callback(lambda task: self._finished(key, task))
+            if release is not None:
+                task.add_done_callback(lambda task: release())
+        return await asyncio.shield(task)
@@ -0,0 +1,115 @@
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import select, delete, update, insert, or_, and_
+from sqlalchemy.orm import Session
+
+import models
+
+
+stats_table = models.PredictionHourlyStats
+
+
+def hour_bucket(timestamp : datetime) -> datetime:
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def increment_hourly_stats(db : Session, items):
+    """
+    Add a batch of (prediction, timestamp) pairs to the hourly aggregates, in
+    the caller's transaction: one upsert per (label, hour) touched.
+    """
+    counts = Counter((prediction, hour_bucket(timestamp)) for prediction, timestamp in items)
+    if not counts:
+        return
+    params = [{"prediction_label": label, "hour": hour, "count": count} for (label, hour), count in counts.items()]
+
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        statement = upsert(stats_table)
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[stats_table.prediction_label, stats_table.hour],
+            set_={"count": stats_table.count + statement.excluded["count"]},
+        ), params)
+        return
+
+    for values in params:
+        updated = db.execute(
+            update(stats_table)
+            .where(stats_table.prediction_label == values["prediction_label"], stats_table.hour == values["hour"])
+            .values(count=stats_table.count + values["count"])
+        ).rowcount
+        if not updated:
+            db.execute(insert(stats_table), values)
+
+
+def decrement_hourly_stats(db : Session, items):
+    """
+    Take (prediction, timestamp) pairs of deleted records back out of the
+    aggregates, in the caller's transaction; hours that reach zero are removed.
+    """
+    counts = Counter((prediction, hour_bucket(timestamp)) for prediction, timestamp in items if timestamp is not None)
+    for (label, hour), count in counts.items():
+        where = (stats_table.prediction_label == label, stats_table.hour == hour)
+        db.execute(update(stats_table).where(*where).values(count=stats_table.count - count))
+        db.execute(delete(stats_table).where(*where, stats_table.count <= 0))
+
+
+def load_stats(db : Session, since : datetime, label : str = None):
+    """Hourly rows since `since` (oldest first) and the total per label over them."""
+    query = select(stats_table.prediction_label, stats_table.hour, stats_table.count).where(stats_table.hour >= hour_bucket(since))
+    if label is not None:
+        query = query.where(stats_table.prediction_label == label)
+
+    hours = []
+    totals = Counter()
+    for row in db.execute(query.order_by(stats_table.hour, stats_table.prediction_label)):
+        hours.append({"hour": row.hour.isoformat(), "label": row.prediction_label, "count": row.count})
+        totals[row.prediction_label] += row.count
+    return hours, dict(totals)
+
+
+def rebuild_hourly_stats(db : Session, chunk_size : int = 10000) -> int:
+    """
+    Recompute the aggregates from frame_data, e.g. once for records stored
+    before the table existed. Run it while nothing else is writing.
+
+    Retention in delete mode removes the oldest records, so only the hours
+    after the oldest remaining record are fully covered by frame_data and
+    recomputed. Earlier hours keep their counts; the hour of the oldest
+    record may have lost some of its records, so it keeps the larger of the
+    stored and recomputed count per label.
+    """
+    counts = Counter()
+    result = db.execute(
+        select(models.FrameData.prediction_label, models.FrameData.timestamp)
+        .where(models.FrameData.timestamp.is_not(None))
+        .execution_options(stream_results=True, yield_per=chunk_size)
+    )
+    for label, timestamp in result:
+        counts[(label, hour_bucket(timestamp))] += 1
+    records = sum(counts.values())
+    if not records:
+        return 0
+
+    first_hour = min(hour for _, hour in counts)
+    stored = dict(db.execute(
+        select(stats_table.prediction_label, stats_table.count).where(stats_table.hour == first_hour)
+    ).all())
+    for (label, hour), count in counts.items():
+        if hour == first_hour:
+            counts[(label, hour)] = max(count, stored.get(label, 0))
+
+    db.execute(delete(stats_table).where(or_(
+        stats_table.hour > first_hour,
+        and_(stats_table.hour == first_hour, stats_table.prediction_label.in_([label for label, hour in counts if hour == first_hour])),
+    )))
+    db.execute(insert(stats_table), [
+        {"prediction_label": label, "hour": hour, "count": count} for (label, hour), count in counts.items()
+    ])
+    db.commit()
+    return records
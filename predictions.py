@@ -1,130 +1,177 @@
+import os
 import numpy as np
-from tensorflow.keras.models import load_model # type: ignore
-from BaseModels import single_frame_details, frame_data, normal_landmarks, special_landmarks
-import cv2
-import mediapipe as mp
+from BaseModels import single_frame_details, frame_data
+from inference_engine import InferenceEngine
+from inference_backends import load_backend, read_model_content
+from holistic_pool import HolisticPool
+from prediction_cache import PredictionCache, keypoints_key, prediction_cache_size, video_cache_size
+from landmarks import num_keypoints, parts, KeypointSequence, fill_frame
+from metrics import Counter
+from resampling import resample_sequence
+from gating import check_window, gated_total, no_sign, gate_min_hand_ratio, gate_video_early_stop
 
 model_path = "holistic-custom-1024x1024-512-epoch-98.0%-0.1317.h5"
 
-model = load_model(model_path)
-
 required_frames = 30
 frame_height = 1024
 frame_width = 1024
 
 classes = ['before', 'computer', 'cool', 'cousin', 'drink', 'go', 'help', 'inform', 'take', 'thin']
 
+predictions_total = Counter("slr_predictions_total", "Predictions served per class, cache hits included",
+                            ("label",), initial_labels=[(label,) for label in classes])
+
+
+class ModelNotReady(Exception):
+    pass
+
+
+# Set by load_model() from the app lifespan, so importing this module stays cheap
+backend = None
+# Model bytes read by preload_model() in a pre-fork parent process
+_model_content = None
+
+
+def preload_model():
+    """Read the model into memory before forking workers, if the backend can be built from it."""
+    global _model_content
+    _model_content = read_model_content(model_path)
+
+
+def load_model():
+    """
+    Load the inference backend, run one warm-up batch through it and start the
+    inference engine. Blocking: TensorFlow is imported and the graph traced here.
+    """
+    global backend
+    loaded = load_backend(model_path, required_frames, num_keypoints, model_content=_model_content)
+    loaded.warmup(required_frames, num_keypoints)
+    backend = loaded
+    inference_engine.start()
+    print(f"Model loaded and warmed up ({loaded.name} backend)")
+
+
+def model_ready() -> bool:
+    return backend is not None
+
+
+def _predict_batch(batch : np.ndarray) -> np.ndarray:
+    return backend.predict(batch)
+
+
+inference_engine = InferenceEngine(_predict_batch)
+
+holistic_pool = HolisticPool()
+
+# Labels by keypoint tensor hash, and keypoints by uploaded file hash
+prediction_cache = PredictionCache("predictions", prediction_cache_size)
+video_cache = PredictionCache("videos", video_cache_size)
+
+# Uploads stop early once they can no longer pass the hand-presence gate
+video_min_hand_ratio = gate_min_hand_ratio if gate_video_early_stop else 0
+
 
 async def extract_keypoints(results : single_frame_details):
-    pose = np.array([[res.x, res.y, res.z, res.visibility] for res in results.pose_landmarks]).flatten() if len(results.pose_landmarks) != 0 else np.zeros(33*4)
-    face = np.array([[res.x, res.y, res.z] for res in results.face_landmarks]).flatten() if len(results.face_landmarks) !=0 else np.zeros(468*3)
-    lh = np.array([[res.x, res.y, res.z] for res in results.left_hand_landmarks]).flatten() if len(results.left_hand_landmarks) !=0 else np.zeros(21*3)
-    rh = np.array([[res.x, res.y, res.z] for res in results.right_hand_landmarks]).flatten() if len(results.right_hand_landmarks) !=0 else np.zeros(21*3)
-    return np.concatenate([pose, face, lh, rh])
+    row = np.zeros(num_keypoints, dtype=np.float32)
+    fill_frame(results, row, np.zeros(len(parts), dtype=bool))
+    return row
+
 
+async def frame_data_to_keypoints(results : frame_data) -> np.ndarray:
+    return KeypointSequence.from_frame_data(results).keypoints
 
-async def predict_sign_from_video(results : frame_data):
+
+def prepare_sequence(sequence : KeypointSequence) -> KeypointSequence:
+    """
+    Turn any number of frames into the model's input: required_frames frames
+    resampled evenly in time, with short detection gaps filled in, and the
+    mask of the parts present in them.
+    """
+    presence = np.empty((required_frames, len(parts)), dtype=bool)
+    keypoints = resample_sequence(sequence.keypoints, required_frames, sequence.timestamps,
+                                  presence=sequence.presence, out_presence=presence)
+    return KeypointSequence(keypoints, presence)
+
+
+async def predict_sign_from_video(results):
+    """Predict from a whole clip: a KeypointSequence, as process_uploaded_video returns, or a frame_data model."""
     if results is None:
         print("Predict Sign from Video : { Data is None } ")
         return None
-    
-    data = []
-    for result in results.frame_data:
-        data.append( await extract_keypoints(result) )
-
-    data = np.array(data, dtype='float32')
-    print(f"Input Shape Before : {data.shape}")
-    data = np.expand_dims(data, axis=0)
-    print(f"Input Shape After : {data.shape}")
-    pred = model.predict(data)
-    pred = classes[np.argmax(pred)]
-    return  pred
+
+    if not isinstance(results, KeypointSequence):
+        results = KeypointSequence.from_frame_data(results)
+    return await predict_sign_from_keypoints(prepare_sequence(results).keypoints, results.presence)
+
+
+async def predict_sign_from_keypoints(keypoints : np.ndarray, presence : np.ndarray):
+    """
+    Run one (required_frames, num_keypoints) sequence through the shared
+    inference engine, which batches it with any concurrent requests.
+    Identical sequences are answered from the prediction cache, and windows
+    with too few hands or too little motion with no_sign (see gating.py).
+    `presence` is the part mask of the frames before prepare_sequence().
+    """
+    if keypoints.shape != (required_frames, num_keypoints):
+        raise ValueError(f"Expected input of shape {(required_frames, num_keypoints)}, got {keypoints.shape}")
+
+    reason = check_window(keypoints, presence)
+    if reason is not None:
+        gated_total.inc(reason)
+        return no_sign
+
+    async def compute():
+        if backend is None:
+            raise ModelNotReady("Model is still loading")
+        pred = await inference_engine.submit(keypoints)
+        return classes[int(np.argmax(pred))]
+
+    prediction = await prediction_cache.get_or_compute(keypoints_key(keypoints), compute)
+    predictions_total.inc(prediction)
+    return prediction
 
 # Function to process uploaded video and extract MediaPipe landmarks
 
-async def process_uploaded_video(video_path: str) -> frame_data:
+def _remove_file(path : str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+async def extract_video_keypoints(video_path: str, file_hash: str = None, remove : bool = False) -> KeypointSequence:
     """
-    Process an uploaded video file and extract MediaPipe landmarks.
-    Returns frame_data object containing landmark information for 30 frames.
+    Sample required_frames frames from a video and run them through a warm
+    Holistic worker in the pool. Returns the KeypointSequence of the frames
+    read, fewer for short videos, for prepare_sequence(); its presence mask
+    is what the gate counts hands on. With `file_hash`, re-submitted files
+    are answered from the video cache.
+
+    With `remove`, the file is deleted once nothing needs it any more. When
+    concurrent uploads of the same file are coalesced, the shared computation
+    reads this caller's file and deletes it when it finishes, which may be
+    after this caller has gone.
     """
-    # Initialize MediaPipe
-    mp_holistic = mp.solutions.holistic # type: ignore
-    holistic = mp_holistic.Holistic(
-        min_detection_confidence=0.5,
-        min_tracking_confidence=0.5
-    )
-    
-    # Open video file
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        raise ValueError("Could not open video file")
-    
-    # Get video properties
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    
-    # Calculate frame indices to extract (30 evenly spaced frames)
-    if total_frames < required_frames:
-        # If video has fewer frames than required, take all frames and pad with zeros
-        frame_indices = list(range(total_frames))
-    else:
-        # Take evenly spaced frames across the video
-        frame_indices = [int(i * total_frames / required_frames) for i in range(required_frames)]
-    
-    extracted_frames = []
-    current_frame_index = 0
-    
-    while cap.isOpened() and len(extracted_frames) < required_frames:
-        ret, frame = cap.read()
-        if not ret:
-            break
-            
-        if current_frame_index in frame_indices:
-            # Convert BGR to RGB for MediaPipe
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            
-            # Process frame with MediaPipe
-            results = holistic.process(rgb_frame)
-              # Extract landmarks and create frame data
-            frame_landmarks = single_frame_details(
-                frame_id=len(extracted_frames),
-                face_landmarks=[
-                    normal_landmarks(x=lm.x, y=lm.y, z=lm.z)
-                    for lm in (results.face_landmarks.landmark if results.face_landmarks else [])
-                ],
-                pose_landmarks=[
-                    special_landmarks(x=lm.x, y=lm.y, z=lm.z, visibility=lm.visibility)
-                    for lm in (results.pose_landmarks.landmark if results.pose_landmarks else [])
-                ],
-                left_hand_landmarks=[
-                    normal_landmarks(x=lm.x, y=lm.y, z=lm.z)
-                    for lm in (results.left_hand_landmarks.landmark if results.left_hand_landmarks else [])
-                ],
-                right_hand_landmarks=[
-                    normal_landmarks(x=lm.x, y=lm.y, z=lm.z)
-                    for lm in (results.right_hand_landmarks.landmark if results.right_hand_landmarks else [])
-                ]
-            )
-            
-            extracted_frames.append(frame_landmarks)
-        
-        current_frame_index += 1
-    
-    # If we have fewer frames than required, pad with empty frames
-    while len(extracted_frames) < required_frames:
-        empty_frame = single_frame_details(
-            frame_id=len(extracted_frames),
-            face_landmarks=[],
-            pose_landmarks=[],
-            left_hand_landmarks=[],
-            right_hand_landmarks=[]
-        )
-        extracted_frames.append(empty_frame)
-    
-    # Clean up
-    cap.release()
-    holistic.close()
-    
-    # Return frame_data object
-    return frame_data(frame_data=extracted_frames)
+    async def compute():
+        sequence = await holistic_pool.extract_video(video_path, required_frames, frame_height, frame_width, video_min_hand_ratio)
+        # Shared between cache hits, so nobody may modify it in place
+        sequence.keypoints.setflags(write=False)
+        sequence.presence.setflags(write=False)
+        return sequence
 
+    if file_hash is None:
+        try:
+            return await compute()
+        finally:
+            if remove:
+                _remove_file(video_path)
+    release = (lambda: _remove_file(video_path)) if remove else None
+    return await video_cache.get_or_compute(file_hash, compute, release=release)
+
+
+async def process_uploaded_video(video_path: str) -> KeypointSequence:
+    """
+    Process an uploaded video file and extract MediaPipe landmarks.
+    Returns the KeypointSequence of its sampled frames.
+    """
+    return await extract_video_keypoints(video_path)
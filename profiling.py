@@ -0,0 +1,92 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+# The /debug/profiling endpoints answer 404 unless this is set
+profiling_enabled = os.environ.get("PROFILING_ENABLED", "0") == "1"
+profile_interval_ms = float(os.environ.get("PROFILE_INTERVAL_MS", "10"))
+profile_max_duration = float(os.environ.get("PROFILE_MAX_DURATION", "300"))
+
+
+class StackSampler:
+    """
+    Sampling profiler for every thread in the process: the event loop, the
+    inference engine and the persistence worker alike. While running, a
+    background thread records each thread's Python stack every `interval`
+    seconds; nothing is traced between samples, so the overhead stays small
+    enough to switch on in production. Results are collapsed stacks, the
+    input format of flamegraph.pl and speedscope.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stacks = Counter()
+        self.samples = 0
+        self.interval = profile_interval_ms / 1000
+        self.started_at = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval_ms : float = profile_interval_ms, duration : float = profile_max_duration):
+        """Start sampling (clearing earlier samples) for at most `duration` seconds."""
+        with self._lock:
+            if self.running:
+                return
+            self._stacks = Counter()
+            self.samples = 0
+            self.interval = max(1.0, interval_ms) / 1000
+            self.started_at = time.time()
+            self._stop.clear()
+            deadline = time.monotonic() + min(duration, profile_max_duration)
+            self._thread = threading.Thread(target=self._run, args=(deadline,), name="stack-sampler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def _run(self, deadline : float):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                stacks.append(";".join(reversed(stack)))
+
+            with self._lock:
+                self._stacks.update(stacks)
+                self.samples += 1
+
+    def status(self) -> dict:
+        return {
+            "running": self.running,
+            "samples": self.samples,
+            "interval_ms": self.interval * 1000,
+            "started_at": self.started_at,
+        }
+
+    def collapsed(self) -> str:
+        """One `thread;outer;...;inner count` line per distinct stack, most frequent first."""
+        with self._lock:
+            stacks = self._stacks.most_common()
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+
+stack_sampler = StackSampler()
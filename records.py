@@ -0,0 +1,88 @@
+import os
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session, defer
+
+import models
+from landmark_storage import record_keypoints, load_row_keypoints
+from landmarks import keypoints_to_frames
+from prediction_stats import decrement_hourly_stats
+
+
+# Largest page of records served with their landmarks: the whole page's blobs
+# and decoded keypoints (about 200 KB per record) are in memory at once
+max_page_with_keypoints = int(os.environ.get("RECORDS_MAX_PAGE_WITH_KEYPOINTS", "50"))
+
+
+def page_limit(limit : int, summary : bool = False) -> int:
+    """The page size actually served for a requested `limit`."""
+    return limit if summary else min(limit, max(1, max_page_with_keypoints))
+
+
+def load_records_page(db : Session, after_id : int, limit : int, with_keypoints : bool = True):
+    """One keyset page of FrameData rows with id > after_id, in id (and so insertion time) order."""
+    query = (
+        select(models.FrameData)
+        .where(models.FrameData.id > after_id)
+        .order_by(models.FrameData.id)
+        .limit(limit)
+    )
+    if not with_keypoints:
+        query = query.options(defer(models.FrameData.keypoints))
+    return db.execute(query).scalars().all()
+
+
+def load_page_keypoints(db : Session, records) -> dict:
+    """
+    Keypoints for a page of records: packed records decode their blob, legacy
+    records are rebuilt with a fixed number of set-based queries for the page.
+    """
+    keypoints = {}
+    legacy_ids = []
+    for record in records:
+        packed = record_keypoints(record)
+        if packed is None:
+            legacy_ids.append(record.id)
+        else:
+            keypoints[record.id] = packed
+
+    keypoints.update(load_row_keypoints(db, legacy_ids))
+    return keypoints
+
+
+def load_page(db : Session, after_id : int, limit : int, summary : bool = False):
+    """One keyset page of records and, unless `summary`, their keypoints by record id."""
+    records = load_records_page(db, after_id, limit, with_keypoints=not summary)
+    keypoints = {} if summary else load_page_keypoints(db, records)
+    return records, keypoints
+
+
+def load_record(db : Session, record_id : int):
+    """(record, keypoints) for one id, or (None, None) when there is no such record."""
+    record = db.get(models.FrameData, record_id)
+    if record is None:
+        return None, None
+    return record, load_page_keypoints(db, [record]).get(record.id)
+
+
+def delete_record(db : Session, record_id : int) -> bool:
+    """Delete one record and take it out of the hourly aggregates, in one transaction."""
+    record = db.get(models.FrameData, record_id)
+    if record is None:
+        return False
+    decrement_hourly_stats(db, [(record.prediction_label, record.timestamp)])
+    db.delete(record)
+    db.commit()
+    return True
+
+
+def serialize_record(record : models.FrameData, keypoints : np.ndarray = None, summary : bool = False) -> dict:
+    message = {
+        "id" : record.id,
+        "prediction_label" : record.prediction_label,
+        "timestamp" : record.timestamp.isoformat() if record.timestamp else None,
+    }
+    if not summary:
+        message["frames"] = keypoints_to_frames(keypoints) if keypoints is not None else []
+    return message
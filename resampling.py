@@ -0,0 +1,135 @@
+import os
+
+import numpy as np
+
+from landmarks import num_keypoints, pose_slice, part_slices
+
+
+# Interior gaps of at most this many source frames where a part was not
+# detected are interpolated from the frames around them; 0 keeps them zero.
+# Longer gaps, and parts missing at the start or end, stay zero as in training.
+resample_max_gap = int(os.environ.get("RESAMPLE_MAX_GAP", "3"))
+
+# "none" keeps raw MediaPipe image coordinates, which is what the shipped model
+# was trained on. "shoulders" centres x/y on the shoulder midpoint and scales
+# by shoulder width, for models trained on normalized input.
+keypoint_normalization = os.environ.get("KEYPOINT_NORMALIZATION", "none")
+
+# MediaPipe pose landmark indices
+_left_shoulder = 11
+_right_shoulder = 12
+
+
+def source_times(count : int, timestamps=None) -> np.ndarray:
+    """Capture times of the source frames: the given timestamps, or frame indices when there are none."""
+    if timestamps is None:
+        return np.arange(count, dtype=np.float64)
+
+    times = np.asarray(timestamps, dtype=np.float64)
+    if times.shape != (count,):
+        raise ValueError(f"Expected {count} timestamps, got {times.shape[0] if times.ndim else 0}")
+    if np.any(np.diff(times) < 0):
+        raise ValueError("Frame timestamps must not decrease")
+    return times
+
+
+def resample_sequence(keypoints : np.ndarray, length : int, timestamps=None, max_gap : int = resample_max_gap,
+                      normalization : str = keypoint_normalization, out : np.ndarray = None,
+                      presence : np.ndarray = None, out_presence : np.ndarray = None) -> np.ndarray:
+    """
+    Resample a (frames, num_keypoints) sequence of any length to `length`
+    frames evenly spaced in time, writing into `out` (allocated once when not
+    given). The input is never modified, so read-only views work too.
+
+    Each body part is interpolated on its own, between the nearest source
+    frames where it was detected. A part missing for up to `max_gap` source
+    frames is bridged from its neighbours instead of dropping to zero; a
+    target frame that lands on an undetected part otherwise stays zero.
+    `presence` is the sequence's (frames, 4) part mask, when it has one, and
+    `out_presence` receives the (length, 4) mask of the resampled frames.
+    """
+    if keypoints.ndim != 2 or keypoints.shape[1] != num_keypoints:
+        raise ValueError(f"Expected input of shape (frames, {num_keypoints}), got {keypoints.shape}")
+    count = keypoints.shape[0]
+    if count == 0:
+        raise ValueError("Expected at least one frame")
+
+    if out is None:
+        out = np.empty((length, num_keypoints), dtype=np.float32)
+
+    times = source_times(count, timestamps)
+    targets = np.linspace(times[0], times[-1], length)
+
+    # Nearest source frame of each target, used where interpolation is not possible
+    nearest = np.clip(np.searchsorted(times, targets), 0, count - 1)
+    previous = np.clip(nearest - 1, 0, count - 1)
+    nearest = np.where(np.abs(times[previous] - targets) <= np.abs(times[nearest] - targets), previous, nearest)
+
+    for column, part_slice in enumerate(part_slices):
+        part = keypoints[:, part_slice]
+        present = np.flatnonzero(part.any(axis=1) if presence is None else presence[:, column])
+        target_part = out[:, part_slice]
+        if len(present) == 0:
+            target_part[:] = 0
+            if out_presence is not None:
+                out_presence[:, column] = False
+            continue
+
+        present_times = times[present]
+        after = np.searchsorted(present_times, targets, side="right")
+        before_pos = np.clip(after - 1, 0, len(present) - 1)
+        after_pos = np.clip(after, 0, len(present) - 1)
+        before = present[before_pos]
+        later = present[after_pos]
+
+        span = present_times[after_pos] - present_times[before_pos]
+        weight = np.divide(targets - present_times[before_pos], span, out=np.zeros(length), where=span > 0)
+
+        has_before = after > 0
+        exact = has_before & (present_times[before_pos] == targets)
+        bridged = has_before & (after < len(present)) & (later - before - 1 <= max_gap)
+
+        # Otherwise fall back to the nearest source frame, if the part is there
+        present_mask = np.zeros(count, dtype=bool)
+        present_mask[present] = True
+        use_nearest = ~(exact | bridged) & present_mask[nearest]
+
+        first = np.where(use_nearest, nearest, before)
+        second = np.where(use_nearest, nearest, later)
+        weight = np.where(exact | use_nearest, 0.0, weight).astype(np.float32)[:, np.newaxis]
+
+        np.multiply(part[first], 1 - weight, out=target_part)
+        target_part += part[second] * weight
+        filled = exact | bridged | use_nearest
+        target_part[~filled] = 0
+        if out_presence is not None:
+            out_presence[:, column] = filled
+
+    if normalization == "shoulders":
+        normalize_to_shoulders(out)
+    elif normalization != "none":
+        raise ValueError(f"Unknown keypoint normalization : {normalization}")
+
+    return out
+
+
+def normalize_to_shoulders(keypoints : np.ndarray):
+    """
+    In place: centre x/y of every detected landmark on the shoulder midpoint
+    and scale by shoulder width. Frames without a pose are left as they are.
+    """
+    pose = keypoints[:, pose_slice].reshape(len(keypoints), -1, 4)
+    left = pose[:, _left_shoulder, :2]
+    right = pose[:, _right_shoulder, :2]
+    centre = (left + right) / 2
+    scale = np.linalg.norm(left - right, axis=1)
+    frames = np.flatnonzero(pose.any(axis=(1, 2)) & (scale > 1e-6))
+    if len(frames) == 0:
+        return
+
+    for part_slice, stride in zip(part_slices, (4, 3, 3, 3)):
+        part = keypoints[frames, part_slice].reshape(len(frames), -1, stride)
+        detected = part.any(axis=2, keepdims=True)
+        xy = (part[:, :, :2] - centre[frames, np.newaxis]) / scale[frames, np.newaxis, np.newaxis]
+        part[:, :, :2] = np.where(detected, xy, 0)
+        keypoints[frames, part_slice] = part.reshape(len(frames), -1)
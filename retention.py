@@ -0,0 +1,161 @@
+"""
+Retention for stored predictions.
+
+    python retention.py [--days 30] [--mode compact|delete] [--batch-size 500] [--rebuild-stats]
+
+Records older than the retention period either lose their landmarks
+("compact": the packed blob and any row-per-landmark rows are removed, the
+label and timestamp stay) or are deleted outright ("delete"). Work is done
+in small batches, each its own short transaction, so neither writers nor
+vacuum are held up by one huge delete. The hourly aggregates are never
+touched, so /stats still covers the removed records, and --rebuild-stats
+only recomputes the hours that records remain for.
+
+The server runs the same policy in the background every RETENTION_INTERVAL
+seconds when RETENTION_DAYS is set.
+"""
+import argparse
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update, delete
+
+import models
+from landmark_storage import drop_legacy_rows
+from locks import database_lock
+from metrics import Counter, errors_total
+
+
+# 0 keeps everything
+retention_days = float(os.environ.get("RETENTION_DAYS", "0"))
+retention_mode = os.environ.get("RETENTION_MODE", "compact")
+retention_batch_size = int(os.environ.get("RETENTION_BATCH_SIZE", "500"))
+# Seconds between retention runs, and pause between batches within a run
+retention_interval = float(os.environ.get("RETENTION_INTERVAL", "3600"))
+retention_batch_pause = float(os.environ.get("RETENTION_BATCH_PAUSE", "0.1"))
+
+retention_modes = ("compact", "delete")
+
+retention_records_total = Counter("slr_retention_records_total", "Records compacted or deleted by retention", ("mode",),
+                                  initial_labels=[(mode,) for mode in retention_modes])
+
+
+def expired_ids(db, cutoff : datetime, mode : str, after_id : int, batch_size : int):
+    table = models.FrameData
+    query = select(table.id).where(table.timestamp < cutoff, table.id > after_id)
+    if mode == "compact":
+        query = query.where(table.compacted_at.is_(None))
+    return db.execute(query.order_by(table.id).limit(batch_size)).scalars().all()
+
+
+def apply_retention(session_factory, days : float = retention_days, mode : str = retention_mode,
+                    batch_size : int = retention_batch_size, batch_pause : float = retention_batch_pause,
+                    stop : threading.Event = None) -> int:
+    """Compact or delete every record older than `days`, one batch per transaction. Returns the records processed."""
+    if mode not in retention_modes:
+        raise ValueError(f"Unknown retention mode : {mode}")
+    if days <= 0:
+        return 0
+
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    processed = 0
+    last_id = 0
+    while stop is None or not stop.is_set():
+        with session_factory() as db:
+            ids = expired_ids(db, cutoff, mode, last_id, max(1, batch_size))
+            if not ids:
+                break
+            last_id = ids[-1]
+
+            drop_legacy_rows(db, ids)
+            if mode == "compact":
+                db.execute(
+                    update(models.FrameData)
+                    .where(models.FrameData.id.in_(ids))
+                    .values(keypoints=None, keypoints_dtype=None, keypoints_shape=None, compacted_at=datetime.utcnow())
+                )
+            else:
+                db.execute(delete(models.FrameData).where(models.FrameData.id.in_(ids)))
+            db.commit()
+
+        processed += len(ids)
+        retention_records_total.inc(mode, amount=len(ids))
+        if batch_pause > 0:
+            time.sleep(batch_pause)
+
+    return processed
+
+
+class RetentionWorker:
+    """
+    Applies the retention policy every `interval` seconds on a background
+    thread. Every server worker runs one, but each run is skipped unless the
+    worker holds the database's retention lock, so one of them does the work.
+    """
+
+    def __init__(self, session_factory, days : float = retention_days, mode : str = retention_mode,
+                 interval : float = retention_interval):
+        self.session_factory = session_factory
+        self.days = days
+        self.mode = mode
+        self.interval = max(1.0, interval)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.days <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="retention-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout : float = 10.0):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                with self.session_factory() as db:
+                    engine = db.get_bind()
+                with database_lock(engine, "retention") as acquired:
+                    processed = apply_retention(self.session_factory, self.days, self.mode, stop=self._stop) if acquired else 0
+                if processed:
+                    print(f"Retention ({self.mode}) : {processed} records older than {self.days:g} days")
+            except Exception as e:
+                errors_total.inc("retention")
+                print(f"Error applying retention : {e}")
+            self._stop.wait(self.interval)
+
+
+if __name__ == "__main__":
+    from database import engine, SessionLocal
+    from landmark_storage import add_packed_columns
+    from prediction_stats import rebuild_hourly_stats
+
+    parser = argparse.ArgumentParser(description="Compact or delete old prediction records.")
+    parser.add_argument("--days", type=float, default=retention_days, help="Keep landmarks of records newer than this")
+    parser.add_argument("--mode", choices=retention_modes, default=retention_mode)
+    parser.add_argument("--batch-size", type=int, default=retention_batch_size, help="Records per transaction")
+    parser.add_argument("--rebuild-stats", action="store_true",
+                        help="Recompute the hourly aggregates from the stored records first (run while nothing is writing)")
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    add_packed_columns(engine)
+
+    if args.rebuild_stats:
+        with SessionLocal() as db:
+            print(f"Hourly aggregates rebuilt from {rebuild_hourly_stats(db)} records")
+
+    start_time = datetime.utcnow()
+    with database_lock(engine, "retention") as acquired:
+        if not acquired:
+            raise SystemExit("Retention is already running against this database")
+        processed = apply_retention(SessionLocal, args.days, args.mode, args.batch_size)
+    print(f"Retention ({args.mode}) finished : {processed} records, time taken : {datetime.utcnow() - start_time}")
@@ -17,6 +17,33 @@ let fpsInterval;
 let uploadedVideoFile = null;
 let currentMode = 'live'; // 'live' or 'upload'
 
+// Live frames are sent to /predict as packed float32 rows (see wire_format.py)
+// instead of nested JSON objects. Set to false to fall back to the JSON body.
+let useBinaryPayload = true;
+const NUM_KEYPOINTS = 33 * 4 + 468 * 3 + 21 * 3 + 21 * 3;
+const LANDMARK_PAYLOAD_MAGIC = [0x53, 0x4c, 0x4b, 0x31]; // "SLK1"
+const LANDMARK_PAYLOAD_HEADER_SIZE = 12;
+
+// Continuous recognition over /ws/recognize. Frames are streamed one at a time and
+// the server answers with a prediction every few frames; when the socket cannot be
+// opened, live mode falls back to the captured-frame POST to /predict.
+let recognitionSocket = null;
+let streamedFrames = 0;
+let lastLivePrediction = null;
+const NO_SIGN = 'no sign'; // the server's answer for windows without enough hands or motion (gating.py)
+
+// /predict and the video jobs prefix the label, e.g. "Model Predicted : no sign"
+function isNoSign(prediction) {
+    return prediction === NO_SIGN || prediction.endsWith(`: ${NO_SIGN}`);
+}
+const MAX_SOCKET_BUFFERED_BYTES = 64 * 1024; // drop frames instead of queueing behind a slow connection
+
+// The server resamples any number of frames to the model's length, so the POST
+// fallback captures 3 seconds at 10fps instead of every camera frame.
+const CAPTURE_FRAMES = 30;
+const CAPTURE_INTERVAL_MS = 100;
+let lastCaptureTime = 0;
+
 
 // Start camera (loads canvas and camera feed)
 async function startCamera() {
@@ -88,6 +115,7 @@ function stopCamera() {
     isPredicting = false;
     frameCount = 0;
     capturedFrames = [];
+    closeRecognitionSocket();
     // Reset UI controls
     const startCameraBtn = document.getElementById('startCameraBtn');
     if (startCameraBtn) {
@@ -135,33 +163,152 @@ function initializeMediaPipe() {
 }
 
 
-// Capture frame data for prediction (up to 60 frames)
-function captureFrameData(results) {
-    if (capturedFrames.length >= 60) {
-        return; // Already have enough frames
+// Write `count` landmarks into `row` starting at `offset`, zero-filling missing ones
+function writeLandmarks(row, offset, landmarks, count, withVisibility) {
+    const stride = withVisibility ? 4 : 3;
+    if (landmarks) {
+        const n = Math.min(count, landmarks.length);
+        for (let i = 0; i < n; i++) {
+            const lm = landmarks[i];
+            const base = offset + i * stride;
+            row[base] = lm.x;
+            row[base + 1] = lm.y;
+            row[base + 2] = lm.z || 0;
+            if (withVisibility) {
+                row[base + 3] = lm.visibility || 0;
+            }
+        }
     }
+    return offset + count * stride;
+}
 
-    // Build the exact landmark payload (matches temp.json format)
-    const frameData = {
-        frame_id: capturedFrames.length,
-        face_landmarks: results.faceLandmarks
-            ? results.faceLandmarks.map(lm => ({ x: lm.x, y: lm.y, z: lm.z || 0 }))
-            : [],
-        pose_landmarks: results.poseLandmarks
-            ? results.poseLandmarks.map(lm => ({ x: lm.x, y: lm.y, z: lm.z || 0, visibility: lm.visibility || 0 }))
-            : [],
-        left_hand_landmarks: results.leftHandLandmarks
-            ? results.leftHandLandmarks.map(lm => ({ x: lm.x, y: lm.y, z: lm.z || 0 }))
-            : [],
-        right_hand_landmarks: results.rightHandLandmarks
-            ? results.rightHandLandmarks.map(lm => ({ x: lm.x, y: lm.y, z: lm.z || 0 }))
-            : []
+// Flatten one MediaPipe result into a keypoint row (same layout as extract_keypoints)
+function landmarksToKeypoints(results) {
+    const row = new Float32Array(NUM_KEYPOINTS);
+    let offset = 0;
+    offset = writeLandmarks(row, offset, results.poseLandmarks, 33, true);
+    offset = writeLandmarks(row, offset, results.faceLandmarks, 468, false);
+    offset = writeLandmarks(row, offset, results.leftHandLandmarks, 21, false);
+    writeLandmarks(row, offset, results.rightHandLandmarks, 21, false);
+    return row;
+}
+
+// Pack keypoint rows into the binary /predict body: 12-byte header + little-endian float32 data
+function encodeLandmarkPayload(rows) {
+    const buffer = new ArrayBuffer(LANDMARK_PAYLOAD_HEADER_SIZE + rows.length * NUM_KEYPOINTS * 4);
+    const view = new DataView(buffer);
+    LANDMARK_PAYLOAD_MAGIC.forEach((byte, i) => view.setUint8(i, byte));
+    view.setUint32(4, rows.length, true);
+    view.setUint32(8, NUM_KEYPOINTS, true);
+
+    // Float32Array uses platform byte order, which is little-endian on every browser target we support
+    const body = new Float32Array(buffer, LANDMARK_PAYLOAD_HEADER_SIZE);
+    rows.forEach((row, i) => body.set(row, i * NUM_KEYPOINTS));
+    return buffer;
+}
+
+// Open the continuous recognition socket for this prediction session
+function openRecognitionSocket() {
+    if (!window.WebSocket) {
+        return;
+    }
+    const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws';
+    const socket = new WebSocket(`${protocol}://${window.location.host}/ws/recognize`);
+    socket.binaryType = 'arraybuffer';
+    socket.onmessage = (event) => handleRecognitionMessage(JSON.parse(event.data));
+    socket.onerror = (error) => console.error('Recognition socket error:', error);
+    socket.onclose = () => {
+        if (recognitionSocket === socket) {
+            recognitionSocket = null;
+        }
     };
 
-    capturedFrames.push(frameData);
+    recognitionSocket = socket;
+    streamedFrames = 0;
+    lastLivePrediction = null;
+}
+
+function closeRecognitionSocket() {
+    if (recognitionSocket) {
+        recognitionSocket.close();
+        recognitionSocket = null;
+    }
+}
+
+// Send one frame over the recognition socket, skipping it if the connection is backed up
+function streamFrame(results) {
+    if (recognitionSocket.bufferedAmount > MAX_SOCKET_BUFFERED_BYTES) {
+        return;
+    }
+    recognitionSocket.send(encodeLandmarkPayload([landmarksToKeypoints(results)]));
+    streamedFrames++;
+}
+
+// Show predictions from the recognition socket; history only records changes of sign
+function handleRecognitionMessage(message) {
+    if (message.type === 'error') {
+        console.error('Recognition error:', message.detail);
+        return;
+    }
+
+    const prediction = `Model Predicted : ${message.prediction}`;
+    showPrediction(prediction);
+    showPredictedOutputLive(prediction);
+
+    if (message.prediction !== lastLivePrediction) {
+        lastLivePrediction = message.prediction;
+        if (message.prediction === NO_SIGN) {
+            return;
+        }
+        totalPredictions++;
+        updateStats();
+        addToHistory(prediction);
+    }
+}
 
-    // Once we've collected exactly 60 frames, trigger a prediction
-    if (capturedFrames.length === 60) {
+// Capture frame data for prediction (up to CAPTURE_FRAMES frames, CAPTURE_INTERVAL_MS apart)
+function captureFrameData(results) {
+    if (recognitionSocket && recognitionSocket.readyState === WebSocket.OPEN) {
+        streamFrame(results);
+        return;
+    }
+
+    if (capturedFrames.length >= CAPTURE_FRAMES) {
+        return; // Already have enough frames
+    }
+
+    const now = performance.now();
+    if (now - lastCaptureTime < CAPTURE_INTERVAL_MS) {
+        return;
+    }
+    lastCaptureTime = now;
+
+    if (useBinaryPayload) {
+        capturedFrames.push(landmarksToKeypoints(results));
+    } else {
+        // Build the exact landmark payload (matches temp.json format)
+        const frameData = {
+            frame_id: capturedFrames.length,
+            timestamp: now / 1000,
+            face_landmarks: results.faceLandmarks
+                ? results.faceLandmarks.map(lm => ({ x: lm.x, y: lm.y, z: lm.z || 0 }))
+                : [],
+            pose_landmarks: results.poseLandmarks
+                ? results.poseLandmarks.map(lm => ({ x: lm.x, y: lm.y, z: lm.z || 0, visibility: lm.visibility || 0 }))
+                : [],
+            left_hand_landmarks: results.leftHandLandmarks
+                ? results.leftHandLandmarks.map(lm => ({ x: lm.x, y: lm.y, z: lm.z || 0 }))
+                : [],
+            right_hand_landmarks: results.rightHandLandmarks
+                ? results.rightHandLandmarks.map(lm => ({ x: lm.x, y: lm.y, z: lm.z || 0 }))
+                : []
+        };
+
+        capturedFrames.push(frameData);
+    }
+
+    // Once we've collected enough frames, trigger a prediction
+    if (capturedFrames.length === CAPTURE_FRAMES) {
         // Pause further capture while processing the current batch
         isPredicting = false;
         makeLivePrediction();
@@ -241,6 +388,8 @@ function startPrediction() {
 
     // Reset prediction-specific counters
     capturedFrames = [];
+
+    openRecognitionSocket();
     
     hideError();
 }
@@ -251,6 +400,7 @@ function startPrediction() {
 function stopPrediction() {
     isPredicting = false;
     capturedFrames = [];
+    closeRecognitionSocket();
 
     // Update button states - back to camera running state
     document.getElementById('startPredictionBtn').disabled = false;
@@ -265,7 +415,7 @@ function stopPrediction() {
     document.getElementById('frameCounter').textContent = 'Camera ready - Click Start Prediction to begin';
 }
 
-// **Make live prediction**: send filtered 30 frames → get result → auto-stop after completion
+// **Make live prediction**: send the captured frames → get result → auto-stop after completion
 async function makeLivePrediction() {
     const currentTime = Date.now();
     if (currentTime - lastPredictionTime < 1000) {
@@ -274,28 +424,28 @@ async function makeLivePrediction() {
     }
     lastPredictionTime = currentTime;
 
-    // **FILTER OUT ONLY EVEN-INDEXED FRAMES** (0, 2, 4, …, 58) to match temp.json's frame_data
-    const filteredFrames = capturedFrames.filter((_, idx) => idx % 2 === 0);
-    const predictionData = {
-        frame_data: filteredFrames
-    };
+    const request = useBinaryPayload
+        ? { contentType: 'application/x-landmarks', body: encodeLandmarkPayload(capturedFrames) }
+        : { contentType: 'application/json', body: JSON.stringify({ frame_data: capturedFrames }) };
 
     try {
         showLoading();
         const response = await fetch('/predict', {
             method: 'POST',
             headers: {
-                'Content-Type': 'application/json',
+                'Content-Type': request.contentType,
             },
-            body: JSON.stringify(predictionData)
+            body: request.body
         });
         const result = await response.json();
         if (response.ok) {
             showPrediction(result.prediction);
             showPredictedOutputLive(result.prediction);
-            totalPredictions++;
-            updateStats();
-            addToHistory(result.prediction);
+            if (!isNoSign(result.prediction)) {
+                totalPredictions++;
+                updateStats();
+                addToHistory(result.prediction);
+            }
             
             // Auto-stop prediction after successful result
             setTimeout(() => {
@@ -449,8 +599,10 @@ document.addEventListener('DOMContentLoaded', function() {
 // Update the frame counter display
 function updateFrameCounter() {
     const counter = document.getElementById('frameCounter');
-    if (isPredicting) {
-        counter.textContent = `Frames Captured: ${capturedFrames.length} / 60 (3 seconds at 20fps)`;
+    if (isPredicting && recognitionSocket) {
+        counter.textContent = `Frames Streamed: ${streamedFrames} (continuous recognition)`;
+    } else if (isPredicting) {
+        counter.textContent = `Frames Captured: ${capturedFrames.length} / ${CAPTURE_FRAMES} (3 seconds at 10fps)`;
     } else if (isRecording) {
         counter.textContent = 'Camera ready - Click Start Prediction to begin';
     } else if (currentMode === 'upload') {
@@ -621,6 +773,7 @@ function stopCamera() {
     isPredicting = false;
     frameCount = 0;
     capturedFrames = [];
+    closeRecognitionSocket();
     // Reset UI controls
     const startCameraBtn = document.getElementById('startCameraBtn');
     if (startCameraBtn) {
@@ -717,6 +870,44 @@ function cancelUploadVideo() {
     hidePredictedOutput();
 }
 
+// Wait for a background prediction job to finish: follow its server-sent
+// events, falling back to polling GET /jobs/{id} if the stream breaks
+function waitForJob(job) {
+    return new Promise((resolve, reject) => {
+        const poll = async () => {
+            try {
+                const response = await fetch(job.status_url);
+                const status = await response.json();
+                if (!response.ok || status.status === 'done' || status.status === 'failed') {
+                    resolve(response.ok ? status : { status: 'failed', error: status.detail });
+                } else {
+                    setTimeout(poll, 1000);
+                }
+            } catch (error) {
+                reject(error);
+            }
+        };
+
+        if (!window.EventSource) {
+            poll();
+            return;
+        }
+
+        const events = new EventSource(job.events_url);
+        events.addEventListener('status', (event) => {
+            const status = JSON.parse(event.data);
+            if (status.status === 'done' || status.status === 'failed') {
+                events.close();
+                resolve(status);
+            }
+        });
+        events.onerror = () => {
+            events.close();
+            poll();
+        };
+    });
+}
+
 // Analyze uploaded video
 async function analyzeUploadedVideo() {
     if (!uploadedVideoFile) {
@@ -726,23 +917,28 @@ async function analyzeUploadedVideo() {
     try {
         document.getElementById('uploadStatus').style.display = 'inline-flex';
         showLoading();
-        // Create FormData for file upload
-        const formData = new FormData();
-        formData.append('video', uploadedVideoFile);
-        const response = await fetch('/predict-video', {
+        // Stream the raw file to the job endpoint; the server answers as soon as it is stored
+        const submitResponse = await fetch(`/jobs/predict-video?filename=${encodeURIComponent(uploadedVideoFile.name)}`, {
             method: 'POST',
-            body: formData
+            headers: {
+                'Content-Type': uploadedVideoFile.type,
+            },
+            body: uploadedVideoFile
         });
-        const result = await response.json();
-        if (response.ok) {
+        const job = await submitResponse.json();
+        const status = submitResponse.ok ? await waitForJob(job) : { status: 'failed', error: job.detail };
+        if (status.status === 'done') {
+            const result = status.result;
             showPrediction(result.prediction);
             showPredictedOutput(result.prediction);
-            totalPredictions++;
-            updateStats();
-            addToHistory(result.prediction, 'upload');
+            if (!isNoSign(result.prediction)) {
+                totalPredictions++;
+                updateStats();
+                addToHistory(result.prediction, 'upload');
+            }
             document.getElementById('predictionSection').classList.add('show');
         } else {
-            alert(`Prediction failed: ${result.error || 'Unknown error'}`);
+            alert(`Prediction failed: ${status.error || 'Unknown error'}`);
             hidePredictedOutput();
         }
     } catch (error) {
@@ -0,0 +1,128 @@
+import asyncio
+import os
+
+import numpy as np
+from fastapi import WebSocket
+
+from wire_format import decode_landmark_payload
+
+
+recognition_stride = int(os.environ.get("RECOGNITION_STRIDE", "5"))
+
+
+class SlidingWindow:
+    """Fixed-size ring buffer of keypoint rows, preallocated once per session."""
+
+    def __init__(self, length : int, width : int):
+        self.length = length
+        self.width = width
+        self._buffer = np.zeros((length, width), dtype=np.float32)
+        self._next = 0
+        self.count = 0
+
+    @property
+    def full(self) -> bool:
+        return self.count >= self.length
+
+    def push(self, row : np.ndarray):
+        self._buffer[self._next] = row
+        self._next = (self._next + 1) % self.length
+        self.count += 1
+
+    def snapshot(self) -> np.ndarray:
+        """The buffered rows in arrival order, oldest first, as a new array."""
+        out = np.empty_like(self._buffer)
+        tail = self.length - self._next
+        out[:tail] = self._buffer[self._next:]
+        out[tail:] = self._buffer[:self._next]
+        return out
+
+
+class RecognitionSession:
+    """
+    Continuous recognition over one WebSocket connection.
+
+    Frames arrive one message at a time, either as binary landmark payloads
+    (see wire_format.py, usually one frame each) or as a JSON
+    single_frame_details object. Once the window is full, a prediction over the
+    latest `length` frames is made every `stride` new frames.
+
+    At most one prediction per connection is in flight. Windows that become
+    due meanwhile are coalesced into one follow-up prediction on the newest
+    frames, so a slow client or a busy model never piles up work.
+    """
+
+    def __init__(self, websocket : WebSocket, predict_fn, json_frame_fn, length : int, width : int, stride : int = recognition_stride):
+        self.websocket = websocket
+        self.predict_fn = predict_fn
+        self.json_frame_fn = json_frame_fn
+        self.window = SlidingWindow(length, width)
+        self.stride = max(1, stride)
+        self._since_last = 0
+        self._task = None
+        self._pending = False
+        self._send_lock = asyncio.Lock()
+
+    async def send(self, message : dict):
+        async with self._send_lock:
+            await self.websocket.send_json(message)
+
+    async def _parse(self, message : dict) -> np.ndarray:
+        if message.get("bytes") is not None:
+            rows = decode_landmark_payload(message["bytes"])
+        else:
+            rows = (await self.json_frame_fn(message.get("text") or "")).reshape(1, -1)
+
+        if rows.shape[1] != self.window.width:
+            raise ValueError(f"Expected {self.window.width} keypoints per frame, got {rows.shape[1]}")
+        return rows
+
+    async def run(self):
+        await self.websocket.accept()
+        try:
+            while True:
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+
+                try:
+                    rows = await self._parse(message)
+                except ValueError as e:
+                    await self.send({"type": "error", "detail": str(e)})
+                    continue
+
+                for row in rows:
+                    self.window.push(row)
+                self._since_last += len(rows)
+
+                if self.window.full and self._since_last >= self.stride:
+                    self._since_last = 0
+                    self._schedule()
+        finally:
+            if self._task is not None:
+                self._task.cancel()
+
+    def _schedule(self):
+        if self._task is not None and not self._task.done():
+            self._pending = True
+            return
+        self._task = asyncio.create_task(self._predict())
+
+    async def _predict(self):
+        while True:
+            frame = self.window.count
+            try:
+                prediction = await self.predict_fn(self.window.snapshot())
+                message = {"type": "prediction", "prediction": prediction, "frame": frame}
+            except Exception as e:
+                message = {"type": "error", "detail": str(e)}
+
+            try:
+                await self.send(message)
+            except Exception:
+                # The client went away; run() cleans up the session
+                return
+
+            if not self._pending:
+                return
+            self._pending = False
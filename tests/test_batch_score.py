@@ -0,0 +1,41 @@
+import os
+
+from batch_score import find_videos, pending_videos, CsvResults, result_columns
+
+
+def test_pending_videos_skips_done_and_failed():
+    completed = {"a": "done", "b": "failed"}
+    assert pending_videos(["a", "b", "c"], completed) == ["c"]
+
+
+def test_pending_videos_retry_failed_keeps_new_videos():
+    completed = {"a": "done", "b": "failed"}
+    assert pending_videos(["a", "b", "c"], completed, retry_failed=True) == ["b", "c"]
+
+
+def test_find_videos_directory_and_manifests(tmp_path):
+    (tmp_path / "clips" / "nested").mkdir(parents=True)
+    for name in ("clips/one.mp4", "clips/nested/two.MOV", "clips/notes.txt"):
+        (tmp_path / name).write_bytes(b"")
+    assert find_videos(str(tmp_path / "clips")) == [
+        os.path.join(str(tmp_path / "clips"), "nested", "two.MOV"),
+        os.path.join(str(tmp_path / "clips"), "one.mp4"),
+    ]
+
+    text_manifest = tmp_path / "videos.txt"
+    text_manifest.write_text("# comment\nx.mp4\n\ny.mp4\n")
+    assert find_videos(str(text_manifest)) == ["x.mp4", "y.mp4"]
+
+    csv_manifest = tmp_path / "videos.csv"
+    csv_manifest.write_text("path,label\nx.mp4,go\n,help\n")
+    assert find_videos(str(csv_manifest)) == ["x.mp4"]
+
+
+def test_csv_results_resume(tmp_path):
+    results = CsvResults(str(tmp_path / "predictions.csv"))
+    assert results.completed() == {}
+
+    row = dict.fromkeys(result_columns, "")
+    results.write([{**row, "path": "a", "status": "done"}])
+    results.write([{**row, "path": "b", "status": "failed"}])
+    assert results.completed() == {"a": "done", "b": "failed"}
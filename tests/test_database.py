@@ -0,0 +1,13 @@
+import database
+from database import pool_sizes
+
+
+def test_async_engine_shares_the_connection_budget(monkeypatch):
+    monkeypatch.setattr(database, "db_pool_size", 5)
+    monkeypatch.setattr(database, "db_max_overflow", 10)
+    monkeypatch.setattr(database, "db_background_pool_size", 2)
+
+    # aiosqlite is installed with the test dependencies
+    sync_sizes, async_sizes = pool_sizes("sqlite:///test.db", "auto")
+    assert sync_sizes == (2, 4) and async_sizes == (3, 6)
+    assert pool_sizes("sqlite:///test.db", "thread") == ((5, 10), None)
@@ -0,0 +1,120 @@
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import insert
+
+import models
+from dataset_export import export_dataset, read_manifest, manifest_files, lock_name, ExportInProgress
+from landmark_storage import pack_keypoints
+from landmarks import num_keypoints
+from locks import FileLock
+
+
+def store(sessions, count, frames=30, start=0):
+    now = datetime.utcnow() - timedelta(hours=1)
+    with sessions() as db:
+        db.execute(insert(models.FrameData), [
+            {"prediction_label": f"sign{start + i}", "timestamp": now + timedelta(seconds=start + i),
+             **pack_keypoints(np.full((frames, num_keypoints), start + i, dtype=np.float32))}
+            for i in range(count)
+        ])
+        db.commit()
+
+
+def exported_ids(output_dir):
+    manifest = read_manifest(output_dir)
+    return [int(i) for shard in manifest["shards"] for i in np.load(os.path.join(output_dir, f"{shard['name']}.ids.npy"))]
+
+
+def test_shards_roll_over_and_later_runs_only_add_new_records(sessions, tmp_path):
+    output_dir = str(tmp_path / "out")
+    store(sessions, 5)
+
+    summary = export_dataset(sessions, output_dir, shard_size=2, chunk_size=3)
+    assert summary["records"] == 5
+    assert [shard["records"] for shard in read_manifest(output_dir)["shards"]] == [2, 2, 1]
+
+    keypoints = np.load(os.path.join(output_dir, "shard-00001.keypoints.npy"), mmap_mode="r")
+    assert keypoints.shape == (2, 30, num_keypoints)
+    assert list(np.load(os.path.join(output_dir, "shard-00001.labels.npy"))) == ["sign2", "sign3"]
+
+    assert export_dataset(sessions, output_dir, shard_size=2)["records"] == 0
+    store(sessions, 3, start=5)
+    summary = export_dataset(sessions, output_dir, shard_size=2)
+    assert summary["records"] == 3 and summary["total_shards"] == 5
+    assert exported_ids(output_dir) == list(range(1, 9))
+
+
+def test_resume_after_an_interrupted_run(sessions, tmp_path, monkeypatch):
+    import dataset_export
+
+    output_dir = str(tmp_path / "out")
+    store(sessions, 4)
+    write_shard = dataset_export.write_shard
+    calls = []
+
+    def failing_write_shard(*args):
+        calls.append(1)
+        if len(calls) == 2:
+            raise OSError("disk full")
+        return write_shard(*args)
+
+    monkeypatch.setattr(dataset_export, "write_shard", failing_write_shard)
+    with pytest.raises(OSError):
+        export_dataset(sessions, output_dir, shard_size=2)
+    assert len(read_manifest(output_dir)["shards"]) == 1
+
+    monkeypatch.setattr(dataset_export, "write_shard", write_shard)
+    assert export_dataset(sessions, output_dir, shard_size=2)["records"] == 2
+    assert exported_ids(output_dir) == [1, 2, 3, 4]
+
+
+def test_undecodable_records_are_skipped_and_listed(sessions, tmp_path):
+    output_dir = str(tmp_path / "out")
+    store(sessions, 2)
+    with sessions() as db:
+        # A legacy record whose landmark rows are gone
+        db.execute(insert(models.FrameData), [{"prediction_label": "lost", "timestamp": datetime.utcnow() - timedelta(hours=1)}])
+        db.commit()
+    store(sessions, 1, frames=12, start=2)
+
+    summary = export_dataset(sessions, output_dir, shard_size=10)
+    assert summary["records"] == 3 and summary["skipped"] == 1
+    manifest = read_manifest(output_dir)
+    assert manifest["skipped_ids"] == [3]
+    labels = list(np.load(os.path.join(output_dir, "shard-00000.labels.npy")))
+    assert "lost" not in labels
+    # The short sequence is resampled to the model length
+    assert np.load(os.path.join(output_dir, "shard-00000.keypoints.npy")).shape == (3, 30, num_keypoints)
+
+
+def test_format_mismatch_needs_full(sessions, tmp_path):
+    output_dir = str(tmp_path / "out")
+    store(sessions, 2)
+    export_dataset(sessions, output_dir, fmt="npy")
+
+    with pytest.raises(ValueError):
+        export_dataset(sessions, output_dir, fmt="npz")
+
+    summary = export_dataset(sessions, output_dir, fmt="npz", full=True)
+    assert summary["records"] == 2
+    manifest = read_manifest(output_dir)
+    assert manifest["format"] == "npz" and manifest_files(manifest) == {"shard-00000.npz"}
+    with np.load(os.path.join(output_dir, "shard-00000.npz")) as arrays:
+        assert arrays["ids"].tolist() == [1, 2]
+
+
+def test_concurrent_export_is_refused(sessions, tmp_path):
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+    lock = FileLock(str(output_dir / lock_name))
+    assert lock.acquire()
+    try:
+        with pytest.raises(ExportInProgress):
+            export_dataset(sessions, str(output_dir))
+    finally:
+        lock.release()
+    assert not os.path.exists(output_dir / "manifest.json")
+    assert export_dataset(sessions, str(output_dir))["records"] == 0
@@ -0,0 +1,48 @@
+import numpy as np
+
+from gating import check_window, hand_presence, min_hand_frames, motion_energy
+from landmarks import num_keypoints, part_presence, pose_slice, right_hand_slice
+
+
+def window(frames=30, hand_frames=30, step=0.0):
+    keypoints = np.zeros((frames, num_keypoints), dtype=np.float32)
+    keypoints[:, pose_slice] = 0.5
+    keypoints[:hand_frames, right_hand_slice] = 0.5 + step * np.arange(hand_frames, dtype=np.float32)[:, np.newaxis]
+    return keypoints
+
+
+def test_min_hand_frames_rounds_up_without_float_error():
+    assert min_hand_frames(30, 0.2) == 6
+    assert min_hand_frames(31, 0.2) == 7
+    assert min_hand_frames(30, 0) == 0
+
+
+def test_hand_presence_and_motion():
+    keypoints = window(hand_frames=10, step=0.01)
+    assert hand_presence(part_presence(keypoints)).sum() == 10
+    assert motion_energy(window()) == 0.0
+    # Each x/y pair moves by 0.01 per frame
+    assert np.isclose(motion_energy(keypoints), 0.01 * np.sqrt(2), rtol=1e-3)
+    assert motion_energy(keypoints[:1]) == 0.0
+
+
+def check(keypoints, **kwargs):
+    return check_window(keypoints, part_presence(keypoints), **kwargs)
+
+
+def test_check_window():
+    assert check(window(hand_frames=5), min_hand_ratio=0.2, min_motion=0) == "no_hands"
+    assert check(window(hand_frames=6), min_hand_ratio=0.2, min_motion=0) is None
+    assert check(window(), min_hand_ratio=0.2, min_motion=0.001) == "no_motion"
+    assert check(window(step=0.01), min_hand_ratio=0.2, min_motion=0.001) is None
+
+
+def test_check_window_counts_hands_on_the_mask_before_resampling():
+    # Resampling bridged the gaps, so every resampled frame shows a hand
+    keypoints = window()
+    detected = part_presence(window(frames=20, hand_frames=0))
+    detected[::4, 3] = True
+
+    assert hand_presence(detected).sum() == 5
+    assert check_window(keypoints, detected, min_hand_ratio=0.3, min_motion=0) == "no_hands"
+    assert check_window(keypoints, detected, min_hand_ratio=0.25, min_motion=0) is None
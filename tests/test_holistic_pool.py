@@ -0,0 +1,72 @@
+import asyncio
+import time
+
+from holistic_pool import HolisticPool
+
+
+class FakeProcess:
+    def __init__(self, alive=True):
+        self.alive = alive
+        self.terminated = False
+
+    def is_alive(self):
+        return self.alive
+
+    def terminate(self):
+        self.terminated = True
+        self.alive = False
+
+
+class FakeExecutor:
+    def __init__(self, *processes):
+        self._processes = {pid: process for pid, process in enumerate(processes)}
+        self._broken = False
+        self.shutdowns = []
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shutdowns.append(cancel_futures)
+
+
+def make_pool(executor):
+    pool = HolisticPool(size=2)
+    pool._executor = executor
+    replacements = []
+    pool._new_executor = lambda: replacements.append(FakeExecutor(FakeProcess())) or replacements[-1]
+    return pool, replacements
+
+
+def test_busy_pool_that_makes_progress_is_healthy():
+    pool, replacements = make_pool(FakeExecutor(FakeProcess(), FakeProcess()))
+    pool._pending = pool.max_queue
+    pool._last_progress = time.monotonic()
+
+    assert asyncio.run(pool.health_check(timeout=30))["healthy"]
+    assert replacements == []
+
+
+def test_hung_pool_is_terminated_without_cancelling_queued_jobs():
+    processes = (FakeProcess(), FakeProcess())
+    executor = FakeExecutor(*processes)
+    pool, replacements = make_pool(executor)
+    pool._pending = 3
+    pool._last_progress = time.monotonic() - 60
+
+    assert not asyncio.run(pool.health_check(timeout=30))["healthy"]
+    assert all(process.terminated for process in processes)
+    assert executor.shutdowns == [False]
+    assert pool._executor is replacements[0]
+
+
+def test_dead_worker_replaces_the_pool():
+    executor = FakeExecutor(FakeProcess(), FakeProcess(alive=False))
+    pool, replacements = make_pool(executor)
+
+    assert not asyncio.run(pool.health_check())["healthy"]
+    assert pool._executor is replacements[0]
+    assert asyncio.run(pool.health_check())["healthy"]
+
+
+def test_idle_pool_is_never_hung():
+    pool, _ = make_pool(FakeExecutor(FakeProcess()))
+    pool._last_progress = time.monotonic() - 3600
+    assert asyncio.run(pool.health_check(timeout=30))["healthy"]
@@ -0,0 +1,66 @@
+import numpy as np
+
+import inference_backends
+from inference_backends import TFLiteBackend, batch_buckets
+
+
+class FakeInterpreter:
+    """Sums each sequence; records how often the tensors are re-allocated."""
+
+    def __init__(self, model_path=None, model_content=None, num_threads=None):
+        self.shape = [1, 2, 3]
+        self.allocations = 0
+        self.batches = []
+
+    def allocate_tensors(self):
+        self.allocations += 1
+
+    def resize_tensor_input(self, index, shape):
+        self.shape = list(shape)
+
+    def get_input_details(self):
+        return [{"index": 0, "shape": np.array(self.shape), "dtype": np.float32, "quantization": (0.0, 0)}]
+
+    def get_output_details(self):
+        return [{"index": 1}]
+
+    def set_tensor(self, index, value):
+        assert list(value.shape) == self.shape
+        self._input = value.copy()
+
+    def invoke(self):
+        self.batches.append(len(self._input))
+
+    def get_tensor(self, index):
+        return self._input.sum(axis=(1, 2))[:, np.newaxis]
+
+
+def make_backend(monkeypatch, buckets):
+    monkeypatch.setattr(inference_backends, "_tflite_interpreter_class", lambda: FakeInterpreter)
+    return TFLiteBackend(model_content=b"", buckets=buckets)
+
+
+def test_batch_buckets():
+    assert batch_buckets(32) == (1, 2, 4, 8, 16, 32)
+    assert batch_buckets(24) == (1, 2, 4, 8, 16, 24)
+    assert batch_buckets(1) == (1,)
+
+
+def test_batches_are_padded_to_a_bucket_and_sliced(monkeypatch):
+    backend = make_backend(monkeypatch, (1, 4, 8))
+    interpreter = backend.interpreter
+
+    for count in (3, 2, 4, 3):
+        batch = np.arange(count * 6, dtype=np.float32).reshape(count, 2, 3)
+        np.testing.assert_array_equal(backend.predict(batch), batch.sum(axis=(1, 2))[:, np.newaxis])
+
+    # One allocation at load, one for the bucket of 4, none for later batches that fit it
+    assert interpreter.allocations == 2
+    assert interpreter.batches == [4, 4, 4, 4]
+
+
+def test_batches_over_the_largest_bucket_run_in_chunks(monkeypatch):
+    backend = make_backend(monkeypatch, (1, 4))
+    batch = np.ones((9, 2, 3), dtype=np.float32)
+    assert backend.predict(batch).shape == (9, 1)
+    assert backend.interpreter.batches == [4, 4, 1]
@@ -0,0 +1,80 @@
+import asyncio
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from inference_engine import InferenceEngine, EngineStopped
+
+
+class FakeModel:
+    """Returns each row's sum, recording the batch sizes it was called with."""
+
+    def __init__(self):
+        self.batches = []
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, inputs):
+        self.batches.append(len(inputs))
+        self.entered.set()
+        self.release.wait(5)
+        return inputs.sum(axis=1)
+
+
+def test_concurrent_requests_share_a_batch():
+    model = FakeModel()
+    engine = InferenceEngine(model, max_batch_size=4, max_wait_ms=2000)
+
+    async def scenario():
+        start = time.monotonic()
+        outputs = await asyncio.gather(*(engine.submit(np.full(3, i, dtype=np.float32)) for i in range(4)))
+        return outputs, time.monotonic() - start
+
+    try:
+        outputs, elapsed = asyncio.run(scenario())
+    finally:
+        engine.stop()
+    assert [float(output) for output in outputs] == [0.0, 3.0, 6.0, 9.0]
+    assert model.batches == [4]
+    # A full batch goes at once, without waiting out max_wait_ms
+    assert elapsed < 1
+
+
+def test_partial_batch_is_flushed_after_max_wait():
+    model = FakeModel()
+    engine = InferenceEngine(model, max_batch_size=32, max_wait_ms=20)
+    try:
+        output = asyncio.run(engine.submit(np.ones(3, dtype=np.float32)))
+    finally:
+        engine.stop()
+    assert float(output) == 3.0
+    assert model.batches == [1]
+
+
+def test_stop_fails_queued_requests_and_refuses_new_ones():
+    model = FakeModel()
+    model.release.clear()
+    engine = InferenceEngine(model, max_batch_size=1, max_wait_ms=0)
+
+    async def scenario():
+        first = asyncio.ensure_future(engine.submit(np.ones(3, dtype=np.float32)))
+        await asyncio.to_thread(model.entered.wait, 5)
+        queued = [asyncio.ensure_future(engine.submit(np.ones(3, dtype=np.float32))) for _ in range(2)]
+        await asyncio.sleep(0.01)
+
+        # The first batch is stuck, so stop gives up waiting and fails the rest
+        await asyncio.to_thread(engine.stop, 0.1)
+        for future in queued:
+            with pytest.raises(EngineStopped):
+                await asyncio.wait_for(future, 1)
+        with pytest.raises(EngineStopped):
+            await engine.submit(np.ones(3, dtype=np.float32))
+
+        model.release.set()
+        return await asyncio.wait_for(first, 1)
+
+    assert float(asyncio.run(scenario())) == 3.0
+    assert model.batches == [1]
@@ -0,0 +1,95 @@
+import asyncio
+import time
+
+import models
+from jobs import Job, JobStore, interrupted_message
+from locks import FileLock
+
+
+def test_job_is_visible_to_another_store(sessions):
+    async def scenario():
+        worker = JobStore(session_factory=sessions, poll_interval=0.05)
+        other = JobStore(session_factory=sessions, poll_interval=0.05)
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+            return {"prediction": "go"}
+
+        job = await worker.submit(work, on_error=lambda e: (500, str(e)))
+        remote = await other.get(job.id)
+        assert remote is not None and not remote.finished
+
+        release.set()
+        while not remote.finished:
+            assert await other.wait_for_change(remote, remote.version, timeout=2)
+        assert remote.to_dict() == {"job_id": job.id, "status": "done", "result": {"prediction": "go"}}
+        assert await other.get("missing") is None
+
+    asyncio.run(scenario())
+
+
+def test_failed_job_reports_mapped_error(sessions):
+    async def scenario():
+        store = JobStore(session_factory=sessions)
+
+        async def work():
+            raise ValueError("bad video")
+
+        job = await store.submit(work, on_error=lambda e: (400, str(e)))
+        while not job.finished:
+            await store.wait_for_change(job, job.version, timeout=2)
+        return job.id, (await JobStore(session_factory=sessions).get(job.id)).to_dict()
+
+    job_id, message = asyncio.run(scenario())
+    assert message == {"job_id": job_id, "status": "failed", "error": "bad video", "status_code": 400}
+
+
+def test_shutdown_marks_unfinished_jobs_failed(sessions):
+    async def scenario():
+        store = JobStore(session_factory=sessions)
+        started = asyncio.Event()
+
+        async def work():
+            started.set()
+            await asyncio.Event().wait()
+
+        job = await store.submit(work, on_error=lambda e: (500, str(e)))
+        await started.wait()
+        await store.shutdown()
+        return job.to_dict(), (await JobStore(session_factory=sessions).get(job.id)).to_dict()
+
+    local, stored = asyncio.run(scenario())
+    assert local == stored
+    assert stored["status"] == "failed" and stored["status_code"] == 503 and stored["error"] == interrupted_message
+
+
+def test_jobs_left_behind_by_a_dead_worker_expire(sessions):
+    now = time.time()
+    stuck, recent = Job(), Job()
+    stuck.status = "running"
+    stuck.updated_at = now - 1000
+    recent.updated_at = now - 10
+    with sessions() as db:
+        db.add_all([stuck.to_record(), recent.to_record()])
+        db.commit()
+
+    async def scenario():
+        store = JobStore(session_factory=sessions, stuck_after=900)
+        return await store.expire_stuck(), await store.get(stuck.id), await store.get(recent.id)
+
+    expired, stuck_now, recent_now = asyncio.run(scenario())
+    assert expired == 1
+    assert stuck_now.status == "failed" and stuck_now.status_code == 503 and stuck_now.version == 1
+    assert recent_now.status == "queued"
+    with sessions() as db:
+        assert db.get(models.JobRecord, recent.id).version == 0
+
+
+def test_file_lock_is_exclusive(tmp_path):
+    first, second = FileLock(str(tmp_path / "x.lock")), FileLock(str(tmp_path / "x.lock"))
+    assert first.acquire()
+    assert not second.acquire()
+    first.release()
+    assert second.acquire()
+    second.release()
@@ -0,0 +1,26 @@
+import numpy as np
+from sqlalchemy import create_engine, text
+
+import models
+from landmark_storage import pack_keypoints, unpack_keypoints, missing_indexes, add_missing_indexes
+
+
+def test_pack_round_trip():
+    keypoints = np.random.default_rng(0).random((30, 1662)).astype(np.float64)
+    packed = pack_keypoints(keypoints)
+    assert packed["keypoints_shape"] == "30,1662"
+    unpacked = unpack_keypoints(packed["keypoints"], packed["keypoints_dtype"], packed["keypoints_shape"])
+    assert unpacked.dtype == np.float32
+    np.testing.assert_allclose(unpacked, keypoints.astype(np.float32))
+
+
+def test_indexes_missing_from_old_tables_are_created(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    models.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_frame_data_timestamp"))
+        conn.execute(text("DROP INDEX ix_frame_data_prediction_label"))
+
+    assert sorted(index.name for index in missing_indexes(engine)) == ["ix_frame_data_prediction_label", "ix_frame_data_timestamp"]
+    assert sorted(add_missing_indexes(engine)) == ["ix_frame_data_prediction_label", "ix_frame_data_timestamp"]
+    assert missing_indexes(engine) == []
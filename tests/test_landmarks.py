@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from BaseModels import frame_data
+from landmarks import KeypointSequence, fill_frame, keypoints_to_frames, num_keypoints, left_hand_slice, parts
+
+
+def frame_dict(frame_id, hand=True):
+    point = {"x": 0.5, "y": 0.25, "z": 0.0}
+    return {
+        "frame_id": frame_id,
+        "pose_landmarks": [dict(point, visibility=1.0)] * 33,
+        "face_landmarks": [],
+        "left_hand_landmarks": [point] * 21 if hand else [],
+        "right_hand_landmarks": [],
+        "timestamp": frame_id / 30,
+    }
+
+
+def test_from_frame_data_fills_keypoints_mask_and_timestamps():
+    sequence = KeypointSequence.from_frame_data(frame_data.model_validate({"frame_data": [frame_dict(0), frame_dict(1, hand=False)]}))
+    assert sequence.keypoints.shape == (2, num_keypoints)
+    assert sequence.presence.tolist() == [[True, False, True, False], [True, False, False, False]]
+    assert sequence.timestamps == [0, 1 / 30]
+    assert sequence.keypoints[0, left_hand_slice][:3].tolist() == [0.5, 0.25, 0.0]
+
+
+def test_fill_frame_reads_holistic_results():
+    point = SimpleNamespace(x=0.5, y=0.25, z=0.0, visibility=1.0)
+    results = SimpleNamespace(pose_landmarks=SimpleNamespace(landmark=[point] * 33), face_landmarks=None,
+                              left_hand_landmarks=None, right_hand_landmarks=SimpleNamespace(landmark=[point] * 21))
+    row = np.zeros(num_keypoints, dtype=np.float32)
+    presence = np.zeros(len(parts), dtype=bool)
+    fill_frame(results, row, presence)
+    assert presence.tolist() == [True, False, False, True]
+    assert row[:4].tolist() == [0.5, 0.25, 0.0, 1.0]
+
+
+def test_keypoints_to_frames_follows_the_mask():
+    keypoints = np.zeros((1, num_keypoints), dtype=np.float32)
+    frames = keypoints_to_frames(keypoints, np.array([[True, False, False, False]]))
+    assert len(frames[0]["pose_landmarks"]) == 33
+    assert frames[0]["left_hand_landmarks"] == []
+    assert keypoints_to_frames(keypoints)[0]["pose_landmarks"] == []
@@ -0,0 +1,94 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import metrics
+from metrics import CallbackMetric, Counter, Histogram
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(metrics, "_registry", [])
+    requests = Counter("test_requests_total", "Requests", ("route",))
+    latency = Histogram("test_latency_seconds", "Latency", buckets=(0.1, 1.0))
+    depth = CallbackMetric("test_queue_depth", "Queue depth", lambda: 3)
+    return requests, latency, depth
+
+
+def exited_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def write_worker(directory, pid, requests, latency_counts, latency_sum, depth):
+    with open(os.path.join(directory, f"{pid}-test.json"), "w") as f:
+        json.dump({"pid": pid, "metrics": {
+            "test_requests_total": [[["/predict"], requests]],
+            "test_latency_seconds": [[[], [latency_counts, latency_sum, sum(latency_counts)]]],
+            "test_queue_depth": [[[], depth]],
+        }}, f)
+
+
+def test_single_process_renders_its_own_values(registry, monkeypatch):
+    requests, latency, _ = registry
+    monkeypatch.setattr(metrics, "metrics_dir", "")
+    requests.inc("/predict", amount=2)
+    latency.observe(0.5)
+
+    text = metrics.render()
+
+    assert 'test_requests_total{route="/predict"} 2' in text
+    assert 'test_latency_seconds_bucket{le="1.0"} 1' in text
+    assert "test_queue_depth 3" in text
+
+
+def test_workers_are_summed_and_gauges_kept_per_live_worker(registry, tmp_path, monkeypatch):
+    requests, latency, _ = registry
+    monkeypatch.setattr(metrics, "metrics_dir", str(tmp_path))
+    requests.inc("/predict", amount=2)
+    latency.observe(0.05)
+    write_worker(tmp_path, os.getppid(), 5, [1, 1, 0], 0.6, 7)
+    exited = exited_pid()
+    write_worker(tmp_path, exited, 10, [0, 0, 2], 4.0, 9)
+
+    text = metrics.render()
+
+    assert 'test_requests_total{route="/predict"} 17' in text
+    assert 'test_latency_seconds_bucket{le="0.1"} 2' in text
+    assert 'test_latency_seconds_bucket{le="1.0"} 3' in text
+    assert 'test_latency_seconds_bucket{le="+Inf"} 5' in text
+    assert "test_latency_seconds_count 5" in text
+    assert f'test_queue_depth{{worker="{os.getpid()}"}} 3' in text
+    assert f'test_queue_depth{{worker="{os.getppid()}"}} 7' in text
+    assert f'worker="{exited}"' not in text
+
+
+def test_exited_workers_are_folded_and_still_counted(registry, tmp_path):
+    requests, _, _ = registry
+    write_worker(tmp_path, exited_pid(), 10, [0, 0, 2], 4.0, 9)
+    write_worker(tmp_path, exited_pid(), 4, [1, 0, 0], 0.01, 9)
+
+    for _ in range(2):
+        totals, gauges = metrics.collect(str(tmp_path))
+        assert totals["test_requests_total"] == {("/predict",): 14}
+        assert totals["test_latency_seconds"][()] == [[1, 0, 2], 4.01, 3]
+        assert gauges == {}
+
+    assert sorted(name for name in os.listdir(tmp_path) if name.endswith(".json")) == [metrics.dead_file_name]
+
+
+def test_publish_uses_a_file_per_process(registry, tmp_path):
+    requests, _, _ = registry
+    requests.inc("/predict")
+    metrics.publish(str(tmp_path))
+    requests.inc("/predict")
+    metrics.publish(str(tmp_path))
+
+    files = [name for name in os.listdir(tmp_path) if name.endswith(".json")]
+    assert len(files) == 1 and files[0].startswith(f"{os.getpid()}-")
+    totals, _ = metrics.collect(str(tmp_path))
+    assert totals["test_requests_total"] == {("/predict",): 2}
@@ -0,0 +1,75 @@
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import func, select
+
+import models
+import persistence
+from landmark_storage import load_row_keypoints, record_keypoints
+from landmarks import KeypointSequence, num_keypoints, left_hand_slice
+from persistence import PersistenceWorker, save_data_to_db
+
+
+def sample_sequence():
+    keypoints = np.zeros((3, num_keypoints), dtype=np.float32)
+    keypoints[:, :4] = 0.5
+    keypoints[1, left_hand_slice] = 0.25
+    presence = np.zeros((3, 4), dtype=bool)
+    presence[:, 0] = True
+    presence[1, 2] = True
+    return KeypointSequence(keypoints, presence)
+
+
+def test_packed_storage_round_trip(sessions):
+    sequence = sample_sequence()
+    with sessions() as db:
+        save_data_to_db(db, [(sequence, "go", datetime(2024, 1, 1, 10, 30))], "packed")
+        record = db.scalars(select(models.FrameData)).one()
+        np.testing.assert_array_equal(record_keypoints(record), sequence.keypoints)
+
+        stats = db.scalars(select(models.PredictionHourlyStats)).one()
+        assert (stats.prediction_label, stats.hour, stats.count) == ("go", datetime(2024, 1, 1, 10), 1)
+
+
+def test_row_storage_writes_only_the_parts_in_the_mask(sessions):
+    sequence = sample_sequence()
+    with sessions() as db:
+        save_data_to_db(db, [(sequence, "go", datetime.utcnow())], "rows")
+        assert db.scalar(select(func.count()).select_from(models.PoseLandmark)) == 3 * 33
+        assert db.scalar(select(func.count()).select_from(models.LeftHandLandmark)) == 21
+        assert db.scalar(select(func.count()).select_from(models.FaceLandmark)) == 0
+
+        record_id = db.scalar(select(models.FrameData.id))
+        np.testing.assert_array_equal(load_row_keypoints(db, [record_id])[record_id], sequence.keypoints)
+
+
+def stored_labels(sessions):
+    with sessions() as db:
+        return sorted(db.scalars(select(models.FrameData.prediction_label)).all())
+
+
+def test_failed_batch_is_retried_once(sessions, monkeypatch):
+    calls = []
+
+    def flaky_save(db, items, storage_mode):
+        calls.append(len(items))
+        if len(calls) == 1:
+            raise RuntimeError("connection reset")
+        save_data_to_db(db, items, storage_mode)
+
+    monkeypatch.setattr(persistence, "save_data_to_db", flaky_save)
+    worker = PersistenceWorker(sessions, "packed")
+    worker._write([(sample_sequence(), label, datetime.utcnow()) for label in ("a", "b")])
+
+    assert calls == [2, 2]
+    assert (worker.saved, worker.failed) == (2, 0)
+    assert stored_labels(sessions) == ["a", "b"]
+
+
+def test_bad_record_does_not_drop_the_rest_of_its_batch(sessions):
+    worker = PersistenceWorker(sessions, "packed")
+    # A label the database cannot bind
+    worker._write([(sample_sequence(), label, datetime.utcnow()) for label in ("a", object(), "c")])
+
+    assert (worker.saved, worker.failed) == (2, 1)
+    assert stored_labels(sessions) == ["a", "c"]
@@ -0,0 +1,158 @@
+import asyncio
+import os
+
+import numpy as np
+import pytest
+
+from landmarks import KeypointSequence
+from prediction_cache import PredictionCache, keypoints_key
+
+
+def test_keypoints_key_covers_shape_and_dtype():
+    keypoints = np.zeros((2, 3), dtype=np.float32)
+    assert keypoints_key(keypoints) == keypoints_key(keypoints.copy())
+    assert keypoints_key(keypoints) != keypoints_key(keypoints.reshape(3, 2))
+    assert keypoints_key(keypoints) != keypoints_key(keypoints.astype(np.float64))
+
+
+def test_concurrent_misses_compute_once():
+    cache = PredictionCache("test", 8, directory="")
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "hello"
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_compute("key", compute) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["hello"] * 5
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == 4
+    assert cache.stats()["inflight"] == 0
+
+
+def test_cancelled_leader_does_not_cancel_waiters():
+    cache = PredictionCache("test", 8, directory="")
+
+    async def run():
+        release = asyncio.Event()
+
+        async def compute():
+            await release.wait()
+            return "hello"
+
+        leader = asyncio.create_task(cache.get_or_compute("key", compute))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_compute("key", compute))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await waiter
+
+    assert asyncio.run(run()) == "hello"
+    assert cache.get("key") == (True, "hello")
+
+
+def test_leader_input_is_released_when_the_shared_computation_ends():
+    cache = PredictionCache("test", 8, directory="")
+    released = []
+
+    async def run():
+        finish = asyncio.Event()
+
+        async def compute():
+            await finish.wait()
+            # Still reading the leader's input after the leader has gone
+            assert "leader" not in released
+            return "hello"
+
+        leader = asyncio.create_task(cache.get_or_compute("key", compute, release=lambda: released.append("leader")))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_compute("key", compute, release=lambda: released.append("waiter")))
+        await asyncio.sleep(0)
+        # The waiter's own input is never read
+        assert released == ["waiter"]
+
+        leader.cancel()
+        await asyncio.sleep(0)
+        assert released == ["waiter"]
+        finish.set()
+        result = await waiter
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(run()) == "hello"
+    assert released == ["waiter", "leader"]
+
+    hit = []
+    asyncio.run(cache.get_or_compute("key", None, release=lambda: hit.append(True)))
+    assert hit == [True]
+
+
+def test_failure_reaches_every_waiter_and_is_not_cached():
+    cache = PredictionCache("test", 8, directory="")
+
+    async def compute():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_compute("key", compute) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert cache.get("key") == (False, None)
+
+
+def test_lru_eviction_and_ttl():
+    cache = PredictionCache("test", 2, directory="")
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1)
+
+    cache.put("d", 4, ttl=-1)
+    assert cache.get("d") == (False, None)
+    assert cache.stats()["expirations"] == 1
+
+
+def test_disk_store_keeps_labels_and_arrays_without_pickle(tmp_path):
+    cache = PredictionCache("test", 8, directory=str(tmp_path))
+    keypoints = np.arange(6, dtype=np.float32).reshape(2, 3)
+    cache._disk_put("label", "hello")
+    cache._disk_put("keypoints", keypoints)
+
+    assert sorted(os.listdir(tmp_path / "test")) == ["keypoints.npy", "label.txt"]
+    assert cache._disk_get("label")[:2] == (True, "hello")
+    found, value, remaining = cache._disk_get("keypoints")
+    assert found and remaining > 0
+    np.testing.assert_array_equal(value, keypoints)
+    assert not value.flags.writeable
+
+
+def test_disk_store_refuses_pickled_arrays(tmp_path):
+    cache = PredictionCache("test", 8, directory=str(tmp_path))
+    np.save(tmp_path / "test" / "bad.npy", np.array([{"a": 1}], dtype=object), allow_pickle=True)
+    assert cache._disk_get("bad") == (False, None, 0)
+
+
+def test_disk_store_keeps_keypoint_sequences(tmp_path):
+    cache = PredictionCache("test", 8, directory=str(tmp_path))
+    sequence = KeypointSequence(np.ones((2, 3), dtype=np.float32), np.array([[True, False], [False, True]]))
+    cache._disk_put("video", sequence)
+
+    assert os.listdir(tmp_path / "test") == ["video.npz"]
+    found, value, _ = cache._disk_get("video")
+    assert found
+    np.testing.assert_array_equal(value.keypoints, sequence.keypoints)
+    np.testing.assert_array_equal(value.presence, sequence.presence)
+    assert not value.presence.flags.writeable
@@ -0,0 +1,61 @@
+from datetime import datetime
+
+import numpy as np
+
+from landmarks import KeypointSequence, num_keypoints
+from persistence import save_data_to_db
+import records
+from records import load_page, load_record, delete_record, serialize_record, page_limit
+
+
+def store(sessions, labels, storage_mode):
+    items = []
+    for index, label in enumerate(labels):
+        keypoints = np.zeros((2, num_keypoints), dtype=np.float32)
+        keypoints[:, :4] = index + 1
+        items.append((KeypointSequence(keypoints), label, datetime(2024, 1, 1, 12)))
+    with sessions() as db:
+        save_data_to_db(db, items, storage_mode)
+
+
+def test_pages_mix_packed_and_row_records(sessions):
+    store(sessions, ["go", "help"], "packed")
+    store(sessions, ["take"], "rows")
+
+    with sessions() as db:
+        records, keypoints = load_page(db, after_id=0, limit=2)
+        assert [record.prediction_label for record in records] == ["go", "help"]
+
+        records, keypoints = load_page(db, after_id=records[-1].id, limit=2)
+        assert [record.prediction_label for record in records] == ["take"]
+        assert keypoints[records[0].id][:, 0].tolist() == [1, 1]
+
+        message = serialize_record(records[0], keypoints[records[0].id])
+        assert message["prediction_label"] == "take"
+        assert len(message["frames"]) == 2
+        assert message["frames"][0]["face_landmarks"] == []
+
+
+def test_summary_pages_skip_keypoints(sessions):
+    store(sessions, ["go"], "packed")
+    with sessions() as db:
+        records, keypoints = load_page(db, after_id=0, limit=10, summary=True)
+        assert keypoints == {}
+        assert "frames" not in serialize_record(records[0], summary=True)
+
+
+def test_pages_with_keypoints_are_capped(monkeypatch):
+    monkeypatch.setattr(records, "max_page_with_keypoints", 50)
+    assert page_limit(1000) == 50
+    assert page_limit(20) == 20
+    assert page_limit(1000, summary=True) == 1000
+
+
+def test_load_and_delete_one_record(sessions):
+    store(sessions, ["go"], "packed")
+    with sessions() as db:
+        record, keypoints = load_record(db, 1)
+        assert record.prediction_label == "go" and keypoints.shape == (2, num_keypoints)
+        assert delete_record(db, 1)
+        assert load_record(db, 1) == (None, None)
+        assert not delete_record(db, 1)
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from landmarks import num_keypoints, pose_slice, left_hand_slice, part_presence
+from resampling import resample_sequence, source_times
+
+
+def sequence(frames, hand_frames):
+    keypoints = np.zeros((frames, num_keypoints), dtype=np.float32)
+    keypoints[:, pose_slice] = np.arange(frames, dtype=np.float32)[:, np.newaxis] + 1
+    for frame in hand_frames:
+        keypoints[frame, left_hand_slice] = frame + 1
+    return keypoints
+
+
+def test_resamples_to_length_without_touching_input():
+    keypoints = sequence(10, range(10))
+    keypoints.setflags(write=False)
+    out = resample_sequence(keypoints, 4, normalization="none")
+    assert out.shape == (4, num_keypoints)
+    assert out[:, 0].tolist() == [1, 4, 7, 10]
+
+
+def test_short_gaps_are_bridged_and_long_gaps_stay_zero():
+    keypoints = sequence(10, [0, 1, 3, 9])
+    out_presence = np.empty((10, 4), dtype=bool)
+    out = resample_sequence(keypoints, 10, max_gap=1, normalization="none", out_presence=out_presence)
+
+    assert out[2, left_hand_slice][0] == pytest.approx(3)
+    assert out_presence[:, 2].tolist() == [True, True, True, True, False, False, False, False, False, True]
+    assert not out[5, left_hand_slice].any()
+    np.testing.assert_array_equal(out_presence, part_presence(out))
+
+
+def test_presence_mask_overrides_zero_check():
+    keypoints = sequence(4, range(4))
+    presence = part_presence(keypoints)
+    presence[1, 2] = False
+    out_presence = np.empty((4, 4), dtype=bool)
+    resample_sequence(keypoints, 4, max_gap=0, normalization="none", presence=presence, out_presence=out_presence)
+    assert out_presence[:, 2].tolist() == [True, False, True, True]
+
+
+def test_timestamps_must_match_and_not_decrease():
+    assert source_times(3).tolist() == [0, 1, 2]
+    with pytest.raises(ValueError):
+        source_times(3, [0, 1])
+    with pytest.raises(ValueError):
+        source_times(3, [0, 2, 1])
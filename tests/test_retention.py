@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import func, select
+
+import models
+from landmarks import KeypointSequence, num_keypoints
+from persistence import save_data_to_db
+from prediction_stats import load_stats, rebuild_hourly_stats
+from records import delete_record
+from retention import apply_retention
+
+
+def store(sessions, ages_in_days, storage_mode="packed", label="go"):
+    now = datetime.utcnow()
+    items = [(KeypointSequence(np.ones((2, num_keypoints), dtype=np.float32)), label, now - timedelta(days=age))
+             for age in ages_in_days]
+    with sessions() as db:
+        save_data_to_db(db, items, storage_mode)
+
+
+def count(sessions, table, *where):
+    with sessions() as db:
+        return db.scalar(select(func.count()).select_from(table).where(*where))
+
+
+def test_compact_drops_landmarks_of_old_records_only(sessions):
+    store(sessions, [40, 35, 1])
+    store(sessions, [50], storage_mode="rows")
+
+    assert apply_retention(sessions, days=30, mode="compact", batch_size=2, batch_pause=0) == 3
+    assert count(sessions, models.FrameData) == 4
+    assert count(sessions, models.FrameData, models.FrameData.keypoints.is_not(None)) == 1
+    assert count(sessions, models.FrameData, models.FrameData.compacted_at.is_not(None)) == 3
+    assert count(sessions, models.PoseLandmark) == 0
+
+    # Already compacted records are not picked up again
+    assert apply_retention(sessions, days=30, mode="compact", batch_pause=0) == 0
+
+
+def test_delete_keeps_the_hourly_counts(sessions):
+    store(sessions, [40, 1])
+    assert apply_retention(sessions, days=30, mode="delete", batch_pause=0) == 1
+    assert count(sessions, models.FrameData) == 1
+
+    with sessions() as db:
+        _, totals = load_stats(db, datetime.utcnow() - timedelta(days=60))
+    assert totals == {"go": 2}
+
+
+def test_retention_is_off_by_default_and_checks_the_mode(sessions):
+    assert apply_retention(sessions, days=0) == 0
+    with pytest.raises(ValueError):
+        apply_retention(sessions, days=1, mode="archive")
+
+
+def test_hourly_stats_can_be_rebuilt_from_records(sessions):
+    store(sessions, [0, 0], label="go")
+    store(sessions, [0], label="help")
+    with sessions() as db:
+        db.execute(models.PredictionHourlyStats.__table__.delete())
+        db.commit()
+        assert rebuild_hourly_stats(db) == 3
+        _, totals = load_stats(db, datetime.utcnow() - timedelta(days=1))
+        assert totals == {"go": 2, "help": 1}
+        _, totals = load_stats(db, datetime.utcnow() - timedelta(days=1), label="help")
+        assert totals == {"help": 1}
+
+
+def test_rebuild_keeps_the_counts_of_deleted_records(sessions):
+    store(sessions, [40, 40, 20, 1])
+    store(sessions, [1], label="help")
+    apply_retention(sessions, days=30, mode="delete", batch_pause=0)
+    with sessions() as db:
+        # Drifted counts for the hours still covered by records
+        db.execute(models.PredictionHourlyStats.__table__.update()
+                   .where(models.PredictionHourlyStats.hour > datetime.utcnow() - timedelta(days=10))
+                   .values(count=7))
+        db.commit()
+        assert rebuild_hourly_stats(db) == 3
+        _, totals = load_stats(db, datetime.utcnow() - timedelta(days=60))
+    assert totals == {"go": 4, "help": 1}
+
+
+def test_deleting_a_record_updates_the_hourly_counts(sessions):
+    store(sessions, [1, 1])
+    with sessions() as db:
+        first, second = db.scalars(select(models.FrameData.id)).all()
+        assert delete_record(db, first)
+        _, totals = load_stats(db, datetime.utcnow() - timedelta(days=2))
+        assert totals == {"go": 1}
+        assert delete_record(db, second)
+        assert count(sessions, models.PredictionHourlyStats) == 0
+        assert not delete_record(db, second)
@@ -0,0 +1,100 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+pytest.importorskip("fastapi")
+
+from streaming import RecognitionSession, SlidingWindow
+
+
+def test_sliding_window_keeps_the_latest_rows_in_order():
+    window = SlidingWindow(3, 2)
+    for value in range(2):
+        window.push(np.full(2, value))
+    assert not window.full
+
+    for value in range(2, 5):
+        window.push(np.full(2, value))
+    assert window.full and window.count == 5
+    # The buffer wrapped around: oldest of the last three first
+    assert window.snapshot()[:, 0].tolist() == [2, 3, 4]
+    window.push(np.full(2, 5))
+    assert window.snapshot()[:, 0].tolist() == [3, 4, 5]
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.incoming = asyncio.Queue()
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def receive(self):
+        return await self.incoming.get()
+
+    async def send_json(self, message):
+        self.sent.append(message)
+
+    def disconnect(self):
+        self.incoming.put_nowait({"type": "websocket.disconnect"})
+
+
+async def parse_frame(text):
+    return np.full(2, float(text), dtype=np.float32)
+
+
+async def send_frames(websocket, values):
+    for value in values:
+        websocket.incoming.put_nowait({"type": "websocket.receive", "text": str(value)})
+        await asyncio.sleep(0.01)
+
+
+def test_predictions_follow_the_stride_once_the_window_is_full():
+    async def scenario():
+        websocket = FakeWebSocket()
+        windows = []
+
+        async def predict(window):
+            windows.append(window[:, 0].tolist())
+            return "go"
+
+        session = RecognitionSession(websocket, predict, parse_frame, length=4, width=2, stride=2)
+        runner = asyncio.create_task(session.run())
+        await send_frames(websocket, range(9))
+        websocket.disconnect()
+        await runner
+        return windows, websocket.sent
+
+    windows, sent = asyncio.run(scenario())
+    assert windows == [[0, 1, 2, 3], [2, 3, 4, 5], [4, 5, 6, 7]]
+    assert [message["frame"] for message in sent] == [4, 6, 8]
+
+
+def test_windows_due_during_a_prediction_are_coalesced():
+    async def scenario():
+        websocket = FakeWebSocket()
+        windows = []
+        release = asyncio.Event()
+
+        async def predict(window):
+            windows.append(window[:, 0].tolist())
+            await release.wait()
+            return "go"
+
+        session = RecognitionSession(websocket, predict, parse_frame, length=4, width=2, stride=2)
+        runner = asyncio.create_task(session.run())
+        await send_frames(websocket, range(10))
+        # Two more windows became due while the first prediction was in flight
+        assert len(windows) == 1
+        release.set()
+        await asyncio.sleep(0.05)
+        websocket.disconnect()
+        await runner
+        return windows, websocket.sent
+
+    windows, sent = asyncio.run(scenario())
+    # One follow-up, on the newest frames
+    assert windows == [[0, 1, 2, 3], [6, 7, 8, 9]]
+    assert [message["frame"] for message in sent] == [4, 10]
@@ -0,0 +1,81 @@
+import sys
+import types
+
+import pytest
+
+import video_sampling
+from video_sampling import sample_frame_indices, read_sampled_frames
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+
+@pytest.fixture(autouse=True)
+def cv2_constants(monkeypatch):
+    # read_sampled_frames only takes CAP_PROP_POS_FRAMES from cv2; the capture itself is faked
+    if cv2 is None:
+        monkeypatch.setitem(sys.modules, "cv2", types.SimpleNamespace(CAP_PROP_POS_FRAMES=1))
+    monkeypatch.setattr(video_sampling, "seek_min_gap", 10)
+
+
+class FakeCapture:
+    """A clip of `frames` frames whose frame i is the number i."""
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.position = 0
+        self.grabs = 0
+        self.seeks = []
+
+    def set(self, prop, value):
+        self.seeks.append(value)
+        self.position = value
+        return True
+
+    def grab(self):
+        if self.position >= self.frames:
+            return False
+        self.position += 1
+        self.grabs += 1
+        return True
+
+    def retrieve(self):
+        return True, self.position - 1
+
+
+def test_uniform_sampling_spreads_over_the_clip():
+    assert sample_frame_indices(100, 30, 10, mode="uniform") == list(range(0, 100, 10))
+
+
+def test_time_sampling_keeps_the_sample_rate_around_the_middle(monkeypatch):
+    monkeypatch.setattr(video_sampling, "sample_fps", 10)
+    indices = sample_frame_indices(300, 30, 10, mode="time")
+    assert indices == list(range(136, 166, 3))
+    # Too short for 10 samples 3 frames apart: spread over the whole clip instead
+    assert sample_frame_indices(20, 30, 10, mode="time") == sample_frame_indices(20, 30, 10, mode="uniform")
+
+
+def test_clips_shorter_than_the_sample_count_give_every_frame():
+    assert sample_frame_indices(5, 30, 10) == [0, 1, 2, 3, 4]
+    assert sample_frame_indices(0, 30, 10) == []
+
+
+def test_close_indices_are_decoded_straight_through():
+    cap = FakeCapture(30)
+    assert list(read_sampled_frames(cap, [0, 2, 2, 5])) == [(0, 0), (1, 2), (2, 2), (3, 5)]
+    assert cap.seeks == []
+    assert cap.grabs == 6
+
+
+def test_distant_indices_are_reached_with_a_seek():
+    cap = FakeCapture(100)
+    assert list(read_sampled_frames(cap, [1, 50, 55])) == [(0, 1), (1, 50), (2, 55)]
+    assert cap.seeks == [50]
+    assert cap.grabs == 2 + 1 + 5
+
+
+def test_reading_stops_where_the_stream_ends():
+    cap = FakeCapture(8)
+    assert list(read_sampled_frames(cap, [2, 6, 9, 12])) == [(0, 2), (1, 6)]
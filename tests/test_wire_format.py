@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from wire_format import decode_landmark_payload, encode_landmark_payload, is_landmark_payload, payload_header
+
+
+def test_round_trip_is_a_read_only_view():
+    keypoints = np.arange(12, dtype=np.float32).reshape(3, 4)
+    decoded = decode_landmark_payload(encode_landmark_payload(keypoints))
+    np.testing.assert_array_equal(decoded, keypoints)
+    assert not decoded.flags.writeable
+
+
+def test_content_types():
+    assert is_landmark_payload("application/x-landmarks")
+    assert is_landmark_payload("Application/Octet-Stream; charset=binary")
+    assert not is_landmark_payload("application/json")
+
+
+@pytest.mark.parametrize("body", [
+    b"SLK1",
+    payload_header.pack(b"XXXX", 1, 1) + b"\0" * 4,
+    payload_header.pack(b"SLK1", 2, 2) + b"\0" * 12,
+])
+def test_malformed_payloads_are_rejected(body):
+    with pytest.raises(ValueError):
+        decode_landmark_payload(body)
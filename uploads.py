@@ -0,0 +1,42 @@
+import os
+import tempfile
+
+from fastapi import UploadFile
+
+
+max_upload_size = int(os.environ.get("MAX_UPLOAD_SIZE", str(50 * 1024 * 1024)))  # 50MB
+upload_chunk_size = 1024 * 1024
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+async def upload_file_chunks(upload : UploadFile):
+    while chunk := await upload.read(upload_chunk_size):
+        yield chunk
+
+
+async def save_chunks_to_temp(chunks, suffix : str = "", hasher=None) -> str:
+    """
+    Stream an async iterable of byte chunks into a temporary file and return
+    its path. Aborts with UploadTooLarge as soon as max_upload_size is crossed,
+    so at most one chunk is ever held in memory. Each chunk is also fed to
+    `hasher` (a hashlib object) when one is given.
+    """
+    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+    written = 0
+    try:
+        with temp_file:
+            async for chunk in chunks:
+                written += len(chunk)
+                if written > max_upload_size:
+                    raise UploadTooLarge(f"File too large. Maximum size is {max_upload_size // (1024 * 1024)}MB.")
+                if hasher is not None:
+                    hasher.update(chunk)
+                temp_file.write(chunk)
+    except BaseException:
+        os.unlink(temp_file.name)
+        raise
+
+    return temp_file.name
@@ -0,0 +1,78 @@
+import os
+
+
+# "uniform" spreads the samples evenly over the whole clip, "time" takes them
+# `1 / sample_fps` seconds apart from the middle of the clip, so the sampled
+# motion has the same speed whatever the source frame rate.
+sampling_mode = os.environ.get("VIDEO_SAMPLING_MODE", "uniform")
+sample_fps = float(os.environ.get("VIDEO_SAMPLE_FPS", "10"))
+
+# Gaps of at least this many frames are crossed with a CAP_PROP_POS_FRAMES seek
+# (decode restarts from the previous keyframe); shorter ones with grab(), which
+# demuxes and decodes but skips the colour conversion of retrieve().
+seek_min_gap = int(os.environ.get("VIDEO_SEEK_MIN_GAP", "90"))
+
+
+def sample_frame_indices(total_frames : int, fps : float, count : int, mode : str = sampling_mode) -> list:
+    """Sorted indices of the `count` frames to sample from a clip."""
+    if total_frames <= 0:
+        return []
+    if total_frames < count:
+        return list(range(total_frames))
+
+    if mode == "time" and fps > 0 and sample_fps > 0:
+        step = fps / sample_fps
+        span = step * (count - 1)
+        if span < total_frames:
+            start = (total_frames - 1 - span) / 2
+            return [min(total_frames - 1, int(round(start + i * step))) for i in range(count)]
+
+    return [int(i * total_frames / count) for i in range(count)]
+
+
+def read_sampled_frames(cap, frame_indices : list):
+    """
+    Yield (slot, frame) for every index in `frame_indices` of a cv2.VideoCapture,
+    decoding only what is needed to reach them. Stops early if the stream ends
+    before an index.
+    """
+    import cv2
+
+    position = 0   # index of the frame the next grab() returns
+    last_index = None
+    frame = None
+
+    for slot, index in enumerate(frame_indices):
+        if index == last_index:
+            yield slot, frame
+            continue
+
+        if index - position >= seek_min_gap:
+            if cap.set(cv2.CAP_PROP_POS_FRAMES, index):
+                position = index
+
+        while position < index:
+            if not cap.grab():
+                return
+            position += 1
+
+        if not cap.grab():
+            return
+        position += 1
+        ok, frame = cap.retrieve()
+        if not ok:
+            return
+
+        last_index = index
+        yield slot, frame
+
+
+def prepare_frame(frame, max_height : int, max_width : int):
+    """Downscale a BGR frame to fit max_height x max_width and convert it to RGB for MediaPipe."""
+    import cv2
+
+    height, width = frame.shape[:2]
+    scale = min(max_height / height, max_width / width)
+    if scale < 1:
+        frame = cv2.resize(frame, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
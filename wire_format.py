@@ -0,0 +1,52 @@
+import struct
+
+import numpy as np
+
+
+# Binary alternative to the JSON frame_data body on /predict.
+#
+#   offset 0   4 bytes   magic b"SLK1"
+#   offset 4   uint32    number of frames (T)
+#   offset 8   uint32    keypoints per frame (F, 1662 for the current model)
+#   offset 12  T * F little-endian float32 values, row major
+#
+# Each row uses the same layout as extract_keypoints: pose (x, y, z, visibility),
+# face, left hand, right hand (x, y, z), with missing parts zero-filled.
+
+landmark_content_types = ("application/x-landmarks", "application/octet-stream")
+
+payload_magic = b"SLK1"
+payload_header = struct.Struct("<4sII")
+payload_dtype = np.dtype("<f4")
+
+
+def is_landmark_payload(content_type: str) -> bool:
+    return content_type.split(";")[0].strip().lower() in landmark_content_types
+
+
+def decode_landmark_payload(body: bytes) -> np.ndarray:
+    """
+    Decode a binary landmark payload into a (T, F) float32 array.
+    The array is a read-only view over `body`, no copy is made.
+    """
+    if len(body) < payload_header.size:
+        raise ValueError("Landmark payload is too short")
+
+    magic, frames, features = payload_header.unpack_from(body)
+    if magic != payload_magic:
+        raise ValueError("Landmark payload has an invalid header")
+
+    count = frames * features
+    if len(body) != payload_header.size + count * payload_dtype.itemsize:
+        raise ValueError(f"Landmark payload size does not match header ({frames} x {features})")
+
+    return np.frombuffer(body, dtype=payload_dtype, count=count, offset=payload_header.size).reshape(frames, features)
+
+
+def encode_landmark_payload(keypoints: np.ndarray) -> bytes:
+    keypoints = np.ascontiguousarray(keypoints, dtype=payload_dtype)
+    if keypoints.ndim != 2:
+        raise ValueError(f"Expected a (frames, keypoints) array, got shape {keypoints.shape}")
+
+    frames, features = keypoints.shape
+    return payload_header.pack(payload_magic, frames, features) + keypoints.tobytes()